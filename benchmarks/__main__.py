@@ -0,0 +1,87 @@
+from typing import List
+import argparse
+import importlib
+import os
+import sys
+
+# The package lives under src/ and is not installed, so the benchmarks import it from the tree
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from . import harness
+
+SUITES: List[str] = ["bench_messages", "bench_peers", "bench_metainfo", "bench_trackers"]
+BASELINE_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+def baseline_path(name: str) -> str:
+    # Bare names refer to benchmarks/baselines/<name>.json; anything else is a path
+    if os.sep in name or name.endswith(".json"):
+        return name
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.1f} ns"
+
+def main(argv: List[str]) -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the bittorrent microbenchmarks")
+    parser.add_argument("patterns", nargs="*", help="glob patterns selecting benchmarks by name, e.g. 'messages.*'")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per repetition (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per benchmark (default: %(default)s)")
+    parser.add_argument("--json", metavar="FILE", help="write results to FILE as JSON")
+    parser.add_argument("--save", metavar="NAME", help="save results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare against a saved baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before a result counts as a regression (default: %(default)s)")
+    parser.add_argument("--metric", choices=("median", "min", "mean"), default="median", help="statistic to compare (default: %(default)s)")
+    args: argparse.Namespace = parser.parse_args(argv)
+    
+    for suite in SUITES:
+        importlib.import_module(f".{suite}", __package__)
+    
+    if args.list:
+        for name in harness.BENCHMARKS:
+            print(name)
+        return 0
+    
+    baseline = harness.load(baseline_path(args.compare)) if args.compare else None
+    
+    def report(result: harness.Result) -> None:
+        print(f"{result.name:<55} {format_time(result.median)} +- {format_time(result.stdev).strip():>10}  ({result.iterations} x {result.repeat})", flush=True)
+    
+    results: List[harness.Result] = harness.run(args.patterns, args.min_time, args.repeat, report)
+    if not results:
+        print("No benchmarks matched", file=sys.stderr)
+        return 2
+    
+    if args.json:
+        harness.save(args.json, results)
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        harness.save(baseline_path(args.save), results)
+    
+    if baseline is None:
+        return 0
+    
+    regressions: int = 0
+    print(f"\nCompared with {args.compare} ({args.metric}, threshold {args.threshold:.0%}):")
+    for comparison in harness.compare(baseline, results, args.metric):
+        status: str = ""
+        if comparison.ratio > 1 + args.threshold:
+            status = "REGRESSION"
+            regressions += 1
+        elif comparison.ratio < 1 - args.threshold:
+            status = "faster"
+        print(f"{comparison.name:<55} {format_time(comparison.baseline)} -> {format_time(comparison.current)}  {comparison.ratio:6.2f}x  {status}")
+    
+    missing: List[str] = sorted(set(baseline) - {result.name for result in results})
+    if missing and not args.patterns:
+        print(f"Not run (in baseline only): {', '.join(missing)}")
+    
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
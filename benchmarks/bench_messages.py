@@ -0,0 +1,77 @@
+from typing import Any, Iterator, List
+import os
+
+from bittorrent.messages import (
+    parse_message, MessageDecoder, MessageEncoder,
+    Handshake, KeepAlive, Choke, Unchoke, Interested, NotInterested,
+    Have, BitField, Request, Piece, Cancel, Port
+    )
+from bittorrent.enums import ProtocolStrings
+
+from .harness import benchmark
+
+BLOCK: bytes = os.urandom(1 << 14)
+
+MESSAGES: List[Any] = [
+    KeepAlive(),
+    Choke(),
+    Unchoke(),
+    Interested(),
+    NotInterested(),
+    Have(1234),
+    BitField(os.urandom(1 << 10)),
+    Request(12, 1 << 14, 1 << 14),
+    Piece(12, 1 << 14, BLOCK),
+    Cancel(12, 1 << 14, 1 << 14),
+    Port(6881)
+]
+
+def _register(message: Any) -> None:
+    name: str = type(message).__name__
+    encoded: bytes = message.to_bytes()
+    
+    @benchmark(f"messages.{name}.to_bytes")
+    def to_bytes() -> Iterator:
+        yield message.to_bytes
+    
+    @benchmark(f"messages.parse_message.{name}")
+    def parse() -> Iterator:
+        yield lambda: parse_message(encoded)
+    
+    if hasattr(type(message), "from_bytes"):
+        payload: memoryview = memoryview(encoded)[5:]
+        
+        @benchmark(f"messages.{name}.from_bytes")
+        def from_bytes() -> Iterator:
+            yield lambda: type(message).from_bytes(payload)
+
+for message in MESSAGES:
+    _register(message)
+
+@benchmark("messages.Handshake.to_bytes")
+def handshake_to_bytes() -> Iterator:
+    protocol: bytes = ProtocolStrings.BITTORRENT_PROTOCOL_V1.value
+    yield Handshake(len(protocol), protocol, bytes(8), os.urandom(20), os.urandom(20)).to_bytes
+
+@benchmark("messages.Handshake.from_bytes")
+def handshake_from_bytes() -> Iterator:
+    protocol: bytes = ProtocolStrings.BITTORRENT_PROTOCOL_V1.value
+    encoded: bytes = Handshake(len(protocol), protocol, bytes(8), os.urandom(20), os.urandom(20)).to_bytes()
+    yield lambda: Handshake.from_bytes(encoded)
+
+@benchmark("messages.MessageDecoder.stream_1MiB")
+def decoder_stream() -> Iterator:
+    # A download-heavy stream: mostly pieces with haves and requests mixed in
+    stream: bytes = b"".join(
+        message.to_bytes()
+        for _ in range(64)
+        for message in (Piece(1, 0, BLOCK), Have(7), Request(1, 0, 1 << 14), KeepAlive())
+        )
+    decoder: MessageDecoder = MessageDecoder(handshake=False)
+    yield lambda: decoder.decode(stream)
+
+@benchmark("messages.MessageEncoder.encode_requests_256")
+def encode_requests() -> Iterator:
+    encoder: MessageEncoder = MessageEncoder()
+    blocks = [(index // 16, (index % 16) << 14, 1 << 14) for index in range(256)]
+    yield lambda: encoder.encode_requests(blocks)
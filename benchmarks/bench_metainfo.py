@@ -0,0 +1,68 @@
+from typing import Any, Dict, Iterator
+import os
+
+from bittorrent.bencoding import BencodeReader
+from bittorrent.torrent import Torrent
+from bittorrent.utils import generate_info_hash
+
+from .harness import benchmark
+
+def encode(value: Any) -> bytes:
+    # Minimal canonical encoder so the generated fixtures do not depend on a bencode package
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, bytes):
+        return b"%d:%s" % (len(value), value)
+    if isinstance(value, list):
+        return b"l" + b"".join(map(encode, value)) + b"e"
+    return b"d" + b"".join(encode(key) + encode(value[key]) for key in sorted(value)) + b"e"
+
+def generate_info(num_files: int, num_pieces: int, piece_length: int = 1 << 18) -> Dict[bytes, Any]:
+    return {
+        b"name": b"benchmark",
+        b"piece length": piece_length,
+        b"pieces": os.urandom(20 * num_pieces),
+        b"files": [
+            {b"length": 1 + index * 17, b"path": [b"dir%d" % (index % 64), b"file%d.bin" % index]}
+            for index in range(num_files)
+            ]
+    }
+
+def generate_metainfo(num_files: int, num_pieces: int) -> bytes:
+    return encode({
+        b"announce": b"http://127.0.0.1:6969/announce",
+        b"announce-list": [[b"http://127.0.0.1:6969/announce"], [b"udp://127.0.0.1:6969"]],
+        b"info": generate_info(num_files, num_pieces)
+        })
+
+SIZES: Dict[str, tuple] = {
+    "small": (1, 256),
+    "large": (10000, 100000)
+}
+
+for label, (num_files, num_pieces) in SIZES.items():
+    @benchmark(f"metainfo.generate_info_hash.{label}")
+    def info_hash(num_files: int = num_files, num_pieces: int = num_pieces) -> Iterator:
+        info: Dict[bytes, Any] = generate_info(num_files, num_pieces)
+        yield lambda: generate_info_hash(info)
+    
+    @benchmark(f"metainfo.Torrent.load.{label}")
+    def load(num_files: int = num_files, num_pieces: int = num_pieces) -> Iterator:
+        data: bytes = generate_metainfo(num_files, num_pieces)
+        yield lambda: Torrent(data)
+    
+    @benchmark(f"metainfo.Torrent.load_files.{label}")
+    def load_files(num_files: int = num_files, num_pieces: int = num_pieces) -> Iterator:
+        # Loading plus the lazily decoded file list and total length
+        data: bytes = generate_metainfo(num_files, num_pieces)
+        
+        def run() -> None:
+            torrent: Torrent = Torrent(data)
+            torrent.files
+            torrent.total_length
+        yield run
+    
+    @benchmark(f"metainfo.BencodeReader.decode.{label}")
+    def decode(num_files: int = num_files, num_pieces: int = num_pieces) -> Iterator:
+        data: bytes = generate_metainfo(num_files, num_pieces)
+        yield lambda: BencodeReader(data).decode(0)
@@ -0,0 +1,37 @@
+from typing import Iterator, List, Tuple
+import random
+
+from bittorrent.utils import decode_compact_peers, encode_compact_peers
+from bittorrent.peer_store import PeerStore
+from bittorrent.enums import PeerSource
+
+from .harness import benchmark
+
+def _peers(count: int, ipv6: bool, seed: int = 0) -> List[Tuple[str, int]]:
+    rng: random.Random = random.Random(seed)
+    if ipv6:
+        return [(":".join(f"{rng.getrandbits(16):x}" for _ in range(8)), rng.randrange(1, 65536)) for _ in range(count)]
+    return [(".".join(str(rng.randrange(256)) for _ in range(4)), rng.randrange(1, 65536)) for _ in range(count)]
+
+for count in (50, 1000):
+    for ipv6 in (False, True):
+        family: str = "ipv6" if ipv6 else "ipv4"
+        
+        @benchmark(f"peers.decode_compact_peers.{family}.{count}")
+        def decode(count: int = count, ipv6: bool = ipv6) -> Iterator:
+            data: bytes = encode_compact_peers(_peers(count, ipv6), ipv6=ipv6)
+            yield lambda: decode_compact_peers(data, ipv6=ipv6)
+        
+        @benchmark(f"peers.encode_compact_peers.{family}.{count}")
+        def encode(count: int = count, ipv6: bool = ipv6) -> Iterator:
+            peers: List[Tuple[str, int]] = _peers(count, ipv6)
+            yield lambda: encode_compact_peers(peers, ipv6=ipv6)
+
+@benchmark("peers.PeerStore.add_compact.1000")
+def store_add_compact() -> Iterator:
+    data: bytes = encode_compact_peers(_peers(1000, False))
+    
+    def add() -> None:
+        # A fresh store each time measures inserts, not the already-known fast path
+        PeerStore().add_compact(data, PeerSource.TRACKER)
+    yield add
@@ -0,0 +1,67 @@
+from typing import Any, AsyncIterator, Tuple
+import asyncio
+import os
+
+from bittorrent.simulation import SimulatedTracker, TrackerConfig
+from bittorrent.trackers import TrackerHTTP, TrackerUDP, TrackerHTTPClient, UDPTrackerEndpoint, ConnectionIDCache
+
+from .harness import benchmark
+
+INFO_HASH: bytes = os.urandom(20)
+PEER_ID: bytes = b"-BM0001-" + os.urandom(12)
+NUM_PEERS: int = 50
+CONCURRENCY: int = 100
+
+def _tracker() -> SimulatedTracker:
+    # Fixed seed and no failure injection, so every run answers alike
+    return SimulatedTracker(TrackerConfig(swarm_size=NUM_PEERS, max_peers=NUM_PEERS, seed=0))
+
+def _http_announce(tracker: TrackerHTTP) -> Any:
+    return tracker.announce(INFO_HASH, PEER_ID, 6881, 0, 0, 1 << 30)
+
+def _udp_announce(tracker: TrackerUDP) -> Any:
+    return tracker.announce(INFO_HASH, PEER_ID, 6881, 0, 1 << 30, 0)
+
+@benchmark("trackers.TrackerHTTP.announce")
+async def http_announce() -> AsyncIterator:
+    server: SimulatedTracker = _tracker()
+    await server.start()
+    client: TrackerHTTPClient = TrackerHTTPClient()
+    tracker: TrackerHTTP = TrackerHTTP(server.http_url, client=client)
+    yield lambda: _http_announce(tracker)
+    await client.aclose()
+    await server.close()
+
+@benchmark(f"trackers.TrackerHTTP.announce_concurrent.{CONCURRENCY}")
+async def http_announce_concurrent() -> AsyncIterator:
+    server: SimulatedTracker = _tracker()
+    await server.start()
+    client: TrackerHTTPClient = TrackerHTTPClient()
+    trackers = [TrackerHTTP(server.http_url, client=client) for _ in range(CONCURRENCY)]
+    yield lambda: asyncio.gather(*(_http_announce(tracker) for tracker in trackers))
+    await client.aclose()
+    await server.close()
+
+@benchmark("trackers.TrackerUDP.announce")
+async def udp_announce() -> AsyncIterator:
+    server: SimulatedTracker = _tracker()
+    await server.start()
+    endpoint: UDPTrackerEndpoint = UDPTrackerEndpoint()
+    tracker: TrackerUDP = TrackerUDP((server.host, server.udp_port), timeout=5, retries=1, endpoint=endpoint, connection_ids=ConnectionIDCache())
+    await tracker.initialize()
+    yield lambda: _udp_announce(tracker)
+    endpoint.close()
+    await server.close()
+
+@benchmark(f"trackers.TrackerUDP.announce_concurrent.{CONCURRENCY}")
+async def udp_announce_concurrent() -> AsyncIterator:
+    server: SimulatedTracker = _tracker()
+    await server.start()
+    endpoint: UDPTrackerEndpoint = UDPTrackerEndpoint()
+    connection_ids: ConnectionIDCache = ConnectionIDCache()
+    address: Tuple[str, int] = (server.host, server.udp_port)
+    trackers = [TrackerUDP(address, timeout=5, retries=1, endpoint=endpoint, connection_ids=connection_ids) for _ in range(CONCURRENCY)]
+    await asyncio.gather(*(tracker.initialize() for tracker in trackers))
+    yield lambda: asyncio.gather(*(_udp_announce(tracker) for tracker in trackers))
+    endpoint.close()
+    await server.close()
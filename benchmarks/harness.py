@@ -0,0 +1,161 @@
+from typing import Any, Callable, Dict, List, Optional
+from dataclasses import dataclass, asdict
+import statistics
+import platform
+import inspect
+import asyncio
+import fnmatch
+import json
+import time
+import sys
+import gc
+
+@dataclass
+class Result:
+    name: str
+    # Seconds per operation
+    min: float
+    median: float
+    mean: float
+    stdev: float
+    iterations: int
+    repeat: int
+    
+    @property
+    def ops(self: "Result") -> float:
+        return 1 / self.median if self.median else float("inf")
+    
+    def to_dict(self: "Result") -> Dict[str, Any]:
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls: type, data: Dict[str, Any]) -> "Result":
+        return cls(**data)
+
+# name -> factory; a factory is a (sync or async) generator that does its setup, yields the
+# callable to time and tears down after the final yield
+BENCHMARKS: Dict[str, Callable[[], Any]] = {}
+
+def benchmark(name: str) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+    def register(factory: Callable[[], Any]) -> Callable[[], Any]:
+        if name in BENCHMARKS:
+            raise ValueError(f"Duplicate benchmark name: {name}")
+        BENCHMARKS[name] = factory
+        return factory
+    return register
+
+def _summarize(name: str, timings: List[float], iterations: int) -> Result:
+    per_op: List[float] = [timing / iterations for timing in timings]
+    return Result(
+        name,
+        min(per_op),
+        statistics.median(per_op),
+        statistics.fmean(per_op),
+        statistics.stdev(per_op) if len(per_op) > 1 else 0.0,
+        iterations,
+        len(per_op)
+        )
+
+def _time_sync(function: Callable[[], Any], iterations: int) -> float:
+    started: float = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return time.perf_counter() - started
+
+async def _time_async(function: Callable[[], Any], iterations: int) -> float:
+    started: float = time.perf_counter()
+    for _ in range(iterations):
+        await function()
+    return time.perf_counter() - started
+
+def _calibrate(timer: Callable[[int], float], min_time: float) -> int:
+    # Grow the loop count until one repetition takes at least min_time, as timeit.autorange does
+    iterations: int = 1
+    while True:
+        elapsed: float = timer(iterations)
+        if elapsed >= min_time:
+            return iterations
+        iterations = max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9) * 1.2))
+
+def run_sync(name: str, factory: Callable[[], Any], min_time: float, repeat: int) -> Result:
+    generator = factory()
+    function: Callable[[], Any] = next(generator)
+    try:
+        function()
+        iterations: int = _calibrate(lambda iterations: _time_sync(function, iterations), min_time)
+        timings: List[float] = []
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                timings.append(_time_sync(function, iterations))
+        finally:
+            gc.enable()
+        return _summarize(name, timings, iterations)
+    finally:
+        # Resumed rather than closed, so the teardown after the yield runs
+        next(generator, None)
+
+async def run_async(name: str, factory: Callable[[], Any], min_time: float, repeat: int) -> Result:
+    generator = factory()
+    function: Callable[[], Any] = await anext(generator)
+    try:
+        await function()
+        # Calibration cannot use the synchronous helper inside a running loop
+        iterations: int = 1
+        while (elapsed := await _time_async(function, iterations)) < min_time:
+            iterations = max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9) * 1.2))
+        
+        timings: List[float] = [await _time_async(function, iterations) for _ in range(repeat)]
+        return _summarize(name, timings, iterations)
+    finally:
+        await anext(generator, None)
+
+def run(patterns: Optional[List[str]] = None, min_time: Optional[float] = 0.2, repeat: Optional[int] = 5, on_result: Optional[Callable[[Result], None]] = None) -> List[Result]:
+    results: List[Result] = []
+    for name, factory in BENCHMARKS.items():
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        
+        if inspect.isasyncgenfunction(factory):
+            result: Result = asyncio.run(run_async(name, factory, min_time, repeat))
+        else:
+            result = run_sync(name, factory, min_time, repeat)
+        
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return results
+
+def metadata() -> Dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": time.time()
+    }
+
+def save(path: str, results: List[Result]) -> None:
+    with open(path, "w") as f:
+        json.dump({"meta": metadata(), "results": {result.name: result.to_dict() for result in results}}, f, indent=2, sort_keys=True)
+
+def load(path: str) -> Dict[str, Result]:
+    with open(path) as f:
+        return {name: Result.from_dict(data) for name, data in json.load(f)["results"].items()}
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: float
+    current: float
+    
+    @property
+    def ratio(self: "Comparison") -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+def compare(baseline: Dict[str, Result], results: List[Result], metric: Optional[str] = "median") -> List[Comparison]:
+    return [
+        Comparison(result.name, getattr(baseline[result.name], metric), getattr(result, metric))
+        for result in results if result.name in baseline
+        ]
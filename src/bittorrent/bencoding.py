@@ -0,0 +1,142 @@
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+from .exceptions import BencodeError
+
+Span = Tuple[int, int]
+
+class BencodeReader:
+    def __init__(self: "BencodeReader", data: Union[bytes, bytearray, memoryview]) -> None:
+        self.data: memoryview = memoryview(data).cast("B")
+        # bytes supports find/index without copying; slices of it are what decoded strings are made of
+        self._raw: bytes = data if isinstance(data, bytes) else bytes(data)
+    
+    def _string(self: "BencodeReader", offset: int) -> Span:
+        colon: int = self._raw.find(b":", offset)
+        if colon == -1:
+            raise BencodeError(f"Unterminated string length at {offset}")
+        try:
+            length: int = int(self._raw[offset:colon])
+        except ValueError:
+            raise BencodeError(f"Invalid string length at {offset}")
+        
+        end: int = colon + 1 + length
+        if length < 0 or end > len(self._raw):
+            raise BencodeError(f"String at {offset} runs past the end of the data")
+        return (colon + 1, end)
+    
+    def _integer(self: "BencodeReader", offset: int) -> Tuple[int, int]:
+        end: int = self._raw.find(b"e", offset)
+        if end == -1:
+            raise BencodeError(f"Unterminated integer at {offset}")
+        try:
+            return (int(self._raw[offset+1:end]), end + 1)
+        except ValueError:
+            raise BencodeError(f"Invalid integer at {offset}")
+    
+    def skip(self: "BencodeReader", offset: int) -> int:
+        # Walks a value without building it; containers are tracked by depth instead of recursion,
+        # and the token handling is inlined since this loop runs once per token of the info dictionary
+        raw: bytes = self._raw
+        find = raw.find
+        size: int = len(raw)
+        depth: int = 0
+        try:
+            while True:
+                token: int = raw[offset]
+                if token == 0x64 or token == 0x6c: # d, l
+                    depth += 1
+                    offset += 1
+                    continue
+                elif token == 0x65: # e
+                    depth -= 1
+                    offset += 1
+                    if depth < 0:
+                        raise BencodeError(f"Unexpected end marker at {offset - 1}")
+                elif token == 0x69: # i
+                    offset = find(b"e", offset) + 1
+                    if offset == 0:
+                        raise BencodeError("Unterminated integer")
+                else:
+                    colon: int = find(b":", offset)
+                    offset = colon + 1 + int(raw[offset:colon])
+                    if colon == -1 or offset <= colon or offset > size:
+                        raise BencodeError("String runs past the end of the data")
+                
+                if depth == 0:
+                    return offset
+        except BencodeError:
+            raise
+        except IndexError:
+            raise BencodeError("Unexpected end of data")
+        except ValueError:
+            raise BencodeError(f"Invalid string length at {offset}")
+    
+    def decode(self: "BencodeReader", offset: int = 0) -> Tuple[Any, int]:
+        raw: bytes = self._raw
+        if offset >= len(raw):
+            raise BencodeError("Unexpected end of data")
+        
+        token: int = raw[offset]
+        if token == 0x69: # i
+            return self._integer(offset)
+        elif token == 0x6c: # l
+            items: List[Any] = []
+            offset += 1
+            while raw[offset:offset+1] != b"e":
+                item, offset = self.decode(offset)
+                items.append(item)
+            return (items, offset + 1)
+        elif token == 0x64: # d
+            decoded: Dict[bytes, Any] = {}
+            offset += 1
+            while raw[offset:offset+1] != b"e":
+                start, end = self._string(offset)
+                decoded[raw[start:end]], offset = self.decode(end)
+            return (decoded, offset + 1)
+        
+        start, end = self._string(offset)
+        return (raw[start:end], end)
+    
+    def value(self: "BencodeReader", span: Span) -> Any:
+        return self.decode(span[0])[0]
+    
+    def string_bounds(self: "BencodeReader", span: Span) -> Span:
+        return self._string(span[0])
+    
+    def view(self: "BencodeReader", span: Span) -> memoryview:
+        # Zero-copy contents of a string value, e.g. the concatenated piece hashes
+        start, end = self._string(span[0])
+        return self.data[start:end]
+    
+    def raw(self: "BencodeReader", span: Span) -> memoryview:
+        return self.data[span[0]:span[1]]
+    
+    def dict_spans(self: "BencodeReader", offset: int = 0) -> Dict[bytes, Span]:
+        if self._raw[offset:offset+1] != b"d":
+            raise BencodeError(f"Expected a dictionary at {offset}")
+        
+        spans: Dict[bytes, Span] = {}
+        offset += 1
+        while self._raw[offset:offset+1] != b"e":
+            start, end = self._string(offset)
+            value_end: int = self.skip(end)
+            spans[self._raw[start:end]] = (end, value_end)
+            offset = value_end
+        return spans
+    
+    def list_spans(self: "BencodeReader", offset: int) -> Iterator[Span]:
+        if self._raw[offset:offset+1] != b"l":
+            raise BencodeError(f"Expected a list at {offset}")
+        
+        offset += 1
+        while self._raw[offset:offset+1] != b"e":
+            end: int = self.skip(offset)
+            yield (offset, end)
+            offset = end
+
+def decode(data: Union[bytes, bytearray, memoryview]) -> Any:
+    reader: BencodeReader = BencodeReader(data)
+    value, end = reader.decode(0)
+    if end != len(reader.data):
+        raise BencodeError(f"Trailing data after offset {end}")
+    return value
@@ -0,0 +1,119 @@
+from typing import Dict, List, Optional, Set
+import logging
+import asyncio
+import random
+
+from .exceptions import PeerError
+from .peer_connection import PeerConnection
+from .peer_manager import PeerManager
+
+logger = logging.getLogger(__name__)
+
+class Choker:
+    def __init__(
+        self: "Choker",
+        upload_slots: Optional[int] = 4,
+        regular_interval: Optional[float] = 10,
+        optimistic_interval: Optional[float] = 30,
+        snub_timeout: Optional[float] = 60,
+        new_peer_age: Optional[float] = 60
+        ) -> None:
+        # One slot per torrent is kept for the optimistic unchoke
+        self.upload_slots = upload_slots
+        self.regular_interval = regular_interval
+        self.optimistic_interval = optimistic_interval
+        self.snub_timeout = snub_timeout
+        self.new_peer_age = new_peer_age
+        
+        self.managers: List[PeerManager] = []
+        self.optimistic: Dict[PeerManager, PeerConnection] = {}
+        self._round: int = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    def add(self: "Choker", manager: PeerManager) -> None:
+        if manager not in self.managers:
+            self.managers.append(manager)
+        
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+    
+    def remove(self: "Choker", manager: PeerManager) -> None:
+        if manager in self.managers:
+            self.managers.remove(manager)
+        self.optimistic.pop(manager, None)
+    
+    def _rank(self: "Choker", manager: PeerManager, candidates: List[PeerConnection], now: float) -> List[PeerConnection]:
+        if manager.seeding:
+            # Seeds get nothing back, so they favour the peers they can push data to fastest
+            return sorted(candidates, key=lambda connection: connection.upload_meter.rate(now), reverse=True)
+        
+        # Tit-for-tat: reciprocate with the peers we download from fastest; snubbing peers
+        # lose their regular slot and can only come back through the optimistic unchoke
+        return sorted(
+            candidates,
+            key=lambda connection: (not connection.is_snubbing(now, self.snub_timeout), connection.download_meter.rate(now)),
+            reverse=True
+            )
+    
+    def _pick_optimistic(self: "Choker", candidates: List[PeerConnection], now: float) -> Optional[PeerConnection]:
+        if not candidates:
+            return None
+        
+        # Newly connected peers have nothing to offer yet, so they are three times as likely to be picked
+        weights: List[int] = [3 if now - connection.connected_at < self.new_peer_age else 1 for connection in candidates]
+        return random.choices(candidates, weights=weights)[0]
+    
+    def rechoke(self: "Choker", manager: PeerManager, rotate_optimistic: Optional[bool] = False) -> None:
+        now: float = asyncio.get_event_loop().time()
+        interested: List[PeerConnection] = [
+            connection for connection in manager.connections.values()
+            if connection.peer_interested and connection.transport is not None and not connection.transport.is_closing()
+            ]
+        
+        ranked: List[PeerConnection] = self._rank(manager, interested, now)
+        regular: List[PeerConnection] = [
+            connection for connection in ranked[:max(0, self.upload_slots - 1)]
+            if manager.seeding or not connection.is_snubbing(now, self.snub_timeout)
+            ]
+        unchoked: Set[PeerConnection] = set(regular)
+        
+        optimistic: Optional[PeerConnection] = self.optimistic.get(manager)
+        if rotate_optimistic or optimistic is None or optimistic not in interested or optimistic in unchoked:
+            optimistic = self._pick_optimistic([connection for connection in interested if connection not in unchoked], now)
+        if optimistic is not None:
+            self.optimistic[manager] = optimistic
+            unchoked.add(optimistic)
+        else:
+            self.optimistic.pop(manager, None)
+        
+        for connection in list(manager.connections.values()):
+            try:
+                if connection in unchoked:
+                    connection.unchoke()
+                else:
+                    connection.choke()
+            except PeerError:
+                pass
+    
+    async def _run(self: "Choker") -> None:
+        rounds_per_optimistic: int = max(1, round(self.optimistic_interval / self.regular_interval))
+        # A single sweep over every torrent replaces per-peer timers
+        while True:
+            rotate: bool = self._round % rounds_per_optimistic == 0
+            for manager in list(self.managers):
+                try:
+                    self.rechoke(manager, rotate)
+                except Exception as exc:
+                    logger.exception(exc)
+            
+            self._round += 1
+            await asyncio.sleep(self.regular_interval)
+    
+    async def close(self: "Choker") -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        
+        self.managers.clear()
+        self.optimistic.clear()
@@ -1,14 +1,259 @@
-from typing import List, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import asyncio
+import os
+
+import httpx
 
 from .torrent import Torrent
-from .trackers import TrackerManager
+from .trackers import AnnounceScheduler, TrackerHealthRegistry, TrackerManager, TrackerHTTP, TrackerUDP, TrackerHTTPClient, UDPTrackerEndpoint, ConnectionIDCache
+from .peer_manager import PeerManager
+from .choker import Choker
+from .piece_verifier import PieceVerifier
+from .resume import ResumeData, TrackerState
+from .metainfo_index import IndexEntry, MetainfoIndex
+from .storage import Storage
+from .dns_cache import DNSCache
+from .peer_store import PeerStore
+from .rate_limiter import RateLimiter, TokenBucket
+from .upload import BlockCache, Uploader
+from .disk_io import DiskWriter
+from .enums import PeerSource
+from .exceptions import TrackerError
+from .utils import encode_compact_peers, parse_url
 
 logger = logging.getLogger(__name__)
 
 class BitTorrent:
-    def __init__(self: "BitTorrent") -> None:
+    def __init__(
+        self: "BitTorrent",
+        max_half_open: Optional[int] = 50,
+        resume_dir: Optional[str] = None,
+        upload_rate: Optional[float] = 0,
+        download_rate: Optional[float] = 0
+        ) -> None:
         self.torrents: List[Torrent] = []
+        self.resume_dir = resume_dir
+        self.resume_data: Dict[bytes, ResumeData] = {}
+        # Opening maps the index; entries are only parsed when looked up
+        self.metainfo_index: Optional[MetainfoIndex] = MetainfoIndex(os.path.join(resume_dir, "metainfo.index")) if resume_dir else None
+        self.connect_semaphore: asyncio.Semaphore = asyncio.Semaphore(max_half_open)
+        self.verifier: PieceVerifier = PieceVerifier()
+        self.http_client: TrackerHTTPClient = TrackerHTTPClient()
+        self.udp_endpoint: UDPTrackerEndpoint = UDPTrackerEndpoint()
+        self.connection_ids: ConnectionIDCache = ConnectionIDCache()
+        self.dns_cache: DNSCache = DNSCache()
+        self.announce_scheduler: AnnounceScheduler = AnnounceScheduler()
+        self.tracker_health: TrackerHealthRegistry = TrackerHealthRegistry()
+        self.tracker_managers: Dict[bytes, TrackerManager] = {}
+        self.peer_stores: Dict[bytes, PeerStore] = {}
+        # Session-wide caps in bytes per second (0 is unlimited); torrents and peers get child buckets
+        self.upload_limiter: RateLimiter = RateLimiter(upload_rate)
+        self.download_limiter: RateLimiter = RateLimiter(download_rate)
+        self.bandwidth_buckets: Dict[bytes, Tuple[TokenBucket, TokenBucket]] = {}
+        self.choker: Choker = Choker()
+        # Disk reads for seeding and coalesced writes for downloads both run off the event loop
+        self.disk_executor: ThreadPoolExecutor = ThreadPoolExecutor(4, thread_name_prefix="disk-io")
+        self.block_cache: BlockCache = BlockCache()
+    
+    def add_torrent(self: "BitTorrent", file: Union[str, bytes]) -> Torrent:
+        torrent: Torrent = Torrent(file)
+        self.torrents.append(torrent)
+        
+        if self.resume_dir and (record := ResumeData.load(self.resume_dir, torrent.info_hash)):
+            self.resume_data[torrent.info_hash] = record
+        
+        if self.metainfo_index is not None and torrent.info_hash not in self.metainfo_index:
+            path: str = self.torrent_path(torrent.info_hash)
+            if not os.path.exists(path):
+                os.makedirs(self.resume_dir, exist_ok=True)
+                with open(f"{path}.tmp", "wb") as f:
+                    f.write(torrent.raw)
+                os.replace(f"{path}.tmp", path)
+            self.metainfo_index.add(IndexEntry.from_torrent(torrent))
+        return torrent
+    
+    def torrent_path(self: "BitTorrent", info_hash: bytes) -> str:
+        return os.path.join(self.resume_dir, f"{info_hash.hex()}.torrent")
+    
+    def indexed_torrents(self: "BitTorrent") -> List[bytes]:
+        return list(self.metainfo_index) if self.metainfo_index is not None else []
+    
+    def torrent_info(self: "BitTorrent", info_hash: bytes) -> Optional[IndexEntry]:
+        return self.metainfo_index.get(info_hash) if self.metainfo_index is not None else None
+    
+    def activate_torrent(self: "BitTorrent", info_hash: bytes) -> Torrent:
+        # Full metainfo is only read once a torrent is actually started
+        for torrent in self.torrents:
+            if torrent.info_hash == info_hash:
+                return torrent
+        return self.add_torrent(self.torrent_path(info_hash))
+    
+    def save_metainfo_index(self: "BitTorrent") -> None:
+        if self.metainfo_index is not None:
+            self.metainfo_index.save()
+    
+    async def check_torrent(self: "BitTorrent", torrent: Torrent, storage: Storage) -> bytearray:
+        record: Optional[ResumeData] = self.resume_data.get(torrent.info_hash)
+        if record is not None and record.matches(storage):
+            logger.debug(f"Resume record valid for {torrent.name}, skipping recheck")
+            return bytearray(record.pieces)
+        
+        return (await self.verifier.recheck(storage)).have
+    
+    def save_resume_data(
+        self: "BitTorrent",
+        storage: Storage,
+        pieces: bytes,
+        trackers: Optional[Dict[bytes, TrackerState]] = None
+        ) -> None:
+        if not self.resume_dir:
+            return
+        
+        if trackers is None:
+            trackers = self.tracker_states(storage.torrent)
+        record: ResumeData = ResumeData.from_storage(storage, pieces, trackers)
+        record.save(self.resume_dir)
+        self.resume_data[record.info_hash] = record
+    
+    def tracker_states(self: "BitTorrent", torrent: Torrent) -> Dict[bytes, TrackerState]:
+        if (manager := self.tracker_managers.get(torrent.info_hash)) is None:
+            return {}
+        
+        # Only trackers that have answered this session have anything worth keeping
+        return {
+            url: TrackerState(
+                tracker.interval,
+                getattr(tracker, "tracker_id", None) or b"",
+                tracker.peers if isinstance(tracker.peers, bytes) else encode_compact_peers(tracker.peers)
+                )
+            for url, tracker in manager.trackers.items() if tracker.interval is not None
+        }
+    
+    def peer_store(self: "BitTorrent", torrent: Torrent) -> PeerStore:
+        # Trackers and the peer manager of one torrent share a store, so every source dedupes together
+        if (store := self.peer_stores.get(torrent.info_hash)) is None:
+            store = self.peer_stores[torrent.info_hash] = PeerStore()
+            if (record := self.resume_data.get(torrent.info_hash)) is not None:
+                for state in record.trackers.values():
+                    store.add_compact(state.peers, PeerSource.RESUME)
+        return store
+    
+    def torrent_buckets(self: "BitTorrent", torrent: Torrent) -> Tuple[TokenBucket, TokenBucket]:
+        if (buckets := self.bandwidth_buckets.get(torrent.info_hash)) is None:
+            buckets = self.bandwidth_buckets[torrent.info_hash] = (self.upload_limiter.bucket(), self.download_limiter.bucket())
+        return buckets
+    
+    def set_rate_limits(
+        self: "BitTorrent",
+        upload_rate: Optional[float] = None,
+        download_rate: Optional[float] = None,
+        torrent: Optional[Torrent] = None
+        ) -> None:
+        upload_bucket, download_bucket = self.torrent_buckets(torrent) if torrent is not None else (self.upload_limiter.root, self.download_limiter.root)
+        if upload_rate is not None:
+            self.upload_limiter.set_rate(upload_bucket, upload_rate)
+        if download_rate is not None:
+            self.download_limiter.set_rate(download_bucket, download_rate)
+    
+    def create_uploader(self: "BitTorrent", storage: Storage, have: bytearray, **kwargs) -> Uploader:
+        return Uploader(
+            storage,
+            self.block_cache,
+            lambda index: bool(have[index >> 3] & (0x80 >> (index & 7))),
+            executor=self.disk_executor,
+            **kwargs
+            )
+    
+    def create_disk_writer(self: "BitTorrent", storage: Storage, **kwargs) -> DiskWriter:
+        return DiskWriter(storage, self.verifier, executor=self.disk_executor, **kwargs)
+    
+    def create_peer_manager(self: "BitTorrent", torrent: Torrent, **kwargs) -> PeerManager:
+        upload_bucket, download_bucket = self.torrent_buckets(torrent)
+        manager: PeerManager = PeerManager(
+            torrent,
+            connect_semaphore=self.connect_semaphore,
+            resolver=self.dns_cache,
+            peer_store=self.peer_store(torrent),
+            upload_limiter=self.upload_limiter,
+            download_limiter=self.download_limiter,
+            upload_bucket=upload_bucket,
+            download_bucket=download_bucket,
+            on_close=self.choker.remove,
+            **kwargs
+            )
+        self.choker.add(manager)
+        return manager
+    
+    def create_tracker_manager(self: "BitTorrent", torrent: Torrent, port: int, **kwargs) -> TrackerManager:
+        manager: TrackerManager = TrackerManager(
+            torrent,
+            port,
+            http_client=self.http_client,
+            udp_endpoint=self.udp_endpoint,
+            connection_ids=self.connection_ids,
+            tracker_semaphore=self.announce_scheduler.tracker_semaphore,
+            tracker_health=self.tracker_health,
+            resolver=self.dns_cache,
+            peer_store=self.peer_store(torrent),
+            **kwargs
+            )
+        if (record := self.resume_data.get(torrent.info_hash)) is not None:
+            for url, state in record.trackers.items():
+                manager.restore(url, state.interval, state.tracker_id)
+        return manager
+    
+    def start_announcing(self: "BitTorrent", torrent: Torrent, port: int, delay: Optional[float] = 0, **kwargs) -> TrackerManager:
+        if (manager := self.tracker_managers.get(torrent.info_hash)) is None:
+            manager = self.tracker_managers[torrent.info_hash] = self.create_tracker_manager(torrent, port, event="started", **kwargs)
+            self.announce_scheduler.schedule(manager, delay)
+        return manager
+    
+    def stop_announcing(self: "BitTorrent", torrent: Torrent) -> None:
+        if (manager := self.tracker_managers.pop(torrent.info_hash, None)) is not None:
+            self.announce_scheduler.remove(manager)
+    
+    async def scrape(self: "BitTorrent", torrents: Optional[Iterable[Torrent]] = None) -> Dict[bytes, Dict[str, int]]:
+        # One scrape per tracker covers every torrent announcing to it
+        by_tracker: Dict[bytes, List[bytes]] = {}
+        for torrent in (self.torrents if torrents is None else torrents):
+            urls: List[bytes] = [url for tier in torrent.announce_list for url in tier] if torrent.announce_list else [torrent.announce]
+            for url in dict.fromkeys(urls):
+                by_tracker.setdefault(url, []).append(torrent.info_hash)
+        
+        async def scrape_tracker(url: bytes, info_hashes: List[bytes]) -> Dict[bytes, Dict[str, int]]:
+            try:
+                scheme, endpoint = parse_url(url)
+                if scheme == "udp":
+                    tracker: TrackerUDP = TrackerUDP(endpoint, endpoint=self.udp_endpoint, connection_ids=self.connection_ids, resolver=self.dns_cache)
+                    await tracker.initialize()
+                    return await tracker.scrape(info_hashes)
+                return await TrackerHTTP(endpoint, client=self.http_client).scrape(info_hashes)
+            except (TrackerError, ValueError, OSError, httpx.HTTPError) as exc:
+                logger.debug(f"Scrape of {url} failed: {exc}")
+                return {}
+        
+        results: Dict[bytes, Dict[str, int]] = {}
+        for stats in await asyncio.gather(*(scrape_tracker(url, info_hashes) for url, info_hashes in by_tracker.items())):
+            # Trackers of one torrent each see part of the swarm, so the largest count is kept
+            for info_hash, counts in stats.items():
+                if (merged := results.get(info_hash)) is None:
+                    results[info_hash] = dict(counts)
+                else:
+                    for name, count in counts.items():
+                        merged[name] = max(merged.get(name, 0), count)
+        return results
     
-    def add_torrent(self: "BitTorrent", file: Union[str, bytes]) -> None:
-        self.torrents.append(Torrent(file))
+    async def close(self: "BitTorrent") -> None:
+        await self.choker.close()
+        self.upload_limiter.close()
+        self.download_limiter.close()
+        if self.metainfo_index is not None:
+            self.metainfo_index.save()
+            self.metainfo_index.close()
+        await self.announce_scheduler.close()
+        await self.verifier.close()
+        self.disk_executor.shutdown(wait=False)
+        await self.http_client.aclose()
+        self.udp_endpoint.close()
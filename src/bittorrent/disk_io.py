@@ -0,0 +1,255 @@
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import asyncio
+
+from .piece_verifier import PieceVerifier
+from .storage import Storage
+
+logger = logging.getLogger(__name__)
+
+class PieceBuffer:
+    __slots__ = ("index", "size", "data", "blocks", "remaining", "spilled", "writes")
+    
+    def __init__(self: "PieceBuffer", index: int, size: int) -> None:
+        self.index = index
+        self.size = size
+        self.data: Optional[bytearray] = bytearray(size)
+        # begin -> length of every block received so far
+        self.blocks: Dict[int, int] = {}
+        self.remaining = size
+        # Spilled pieces went to disk before verification to free memory
+        self.spilled: bool = False
+        self.writes: List[asyncio.Future] = []
+    
+    def runs(self: "PieceBuffer") -> List[Tuple[int, memoryview]]:
+        # Adjacent blocks merged into contiguous ranges of the buffer, in (begin, view) order
+        runs: List[List[int]] = []
+        for begin in sorted(self.blocks):
+            if runs and runs[-1][1] == begin:
+                runs[-1][1] += self.blocks[begin]
+            else:
+                runs.append([begin, begin + self.blocks[begin]])
+        
+        data: memoryview = memoryview(self.data)
+        return [(begin, data[begin:end]) for begin, end in runs]
+
+class _Write:
+    __slots__ = ("start", "buffer", "future")
+    
+    def __init__(self: "_Write", start: int, buffer: Union[bytes, bytearray, memoryview], future: asyncio.Future) -> None:
+        self.start = start
+        self.buffer = buffer
+        self.future = future
+
+class DiskWriter:
+    def __init__(
+        self: "DiskWriter",
+        storage: Storage,
+        verifier: PieceVerifier,
+        executor: Optional[ThreadPoolExecutor] = None,
+        max_cache: Optional[int] = 32 << 20,
+        low_water: Optional[int] = None,
+        max_batch: Optional[int] = 4 << 20,
+        has_piece: Optional[Callable[[int], bool]] = None,
+        on_piece: Optional[Callable[[int, bool], None]] = None,
+        on_backpressure: Optional[Callable[[bool], None]] = None
+        ) -> None:
+        self.storage = storage
+        self.verifier = verifier
+        self.executor = executor
+        # Bytes of piece buffers and queued writes held in memory before peers are paused
+        self.max_cache = max_cache
+        self.low_water = low_water if low_water is not None else max_cache * 3 // 4
+        self.max_batch = max_batch
+        # Pieces owned before this writer saw them, e.g. from a recheck or resume record
+        self.has_piece = has_piece
+        self.on_piece = on_piece
+        self.on_backpressure = on_backpressure
+        
+        # Partial pieces, oldest first, so memory pressure spills the ones least likely to finish soon
+        self.pieces: "OrderedDict[int, PieceBuffer]" = OrderedDict()
+        self.queue: List[_Write] = []
+        self.size: int = 0
+        self.held: int = 0
+        self.congested: bool = False
+        self.verifying: Set[int] = set()
+        self.completed: Set[int] = set()
+        
+        self._finishing: Set[asyncio.Task] = set()
+        self._idle: asyncio.Event = asyncio.Event()
+        self._idle.set()
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    def piece_size(self: "DiskWriter", index: int) -> int:
+        torrent = self.storage.torrent
+        return min(torrent.piece_length, torrent.total_length - index * torrent.piece_length)
+    
+    def write(self: "DiskWriter", index: int, begin: int, data: Union[bytes, memoryview]) -> bool:
+        # Returns False for blocks that were not taken (duplicates, out of range, piece already complete)
+        length: int = len(data)
+        if not 0 <= index < self.storage.torrent.num_pieces or index in self.verifying:
+            return False
+        # A late block for a verified piece would otherwise start a buffer that never completes,
+        # and spilling it could overwrite good data with unverified bytes
+        if index in self.completed or (self.has_piece is not None and self.has_piece(index)):
+            return False
+        if begin < 0 or not length or begin + length > self.piece_size(index):
+            return False
+        
+        if (piece := self.pieces.get(index)) is None:
+            piece = self.pieces[index] = PieceBuffer(index, self.piece_size(index))
+            self.size += piece.size
+            self.held += piece.size
+        if begin in piece.blocks:
+            return False
+        
+        piece.blocks[begin] = length
+        piece.remaining -= length
+        if piece.spilled:
+            # Received blocks are views into the connection's read buffer, so they are copied to wait
+            piece.writes.append(self._enqueue(index * self.storage.torrent.piece_length + begin, bytes(data)))
+        else:
+            piece.data[begin:begin+length] = data
+        
+        if piece.remaining <= 0:
+            del self.pieces[index]
+            if not piece.spilled:
+                self.held -= piece.size
+            self.verifying.add(index)
+            task: asyncio.Task = asyncio.ensure_future(self._finish(piece))
+            self._finishing.add(task)
+            task.add_done_callback(self._finishing.discard)
+        elif self.size > self.max_cache:
+            self._spill()
+        
+        self._update_pressure()
+        return True
+    
+    def _spill(self: "DiskWriter") -> None:
+        for piece in list(self.pieces.values()):
+            if self.held <= self.max_cache // 2:
+                break
+            if piece.spilled:
+                continue
+            
+            piece.spilled = True
+            start: int = piece.index * self.storage.torrent.piece_length
+            for begin, view in piece.runs():
+                piece.writes.append(self._enqueue(start + begin, view))
+            self.held -= piece.size
+            self.size -= piece.size
+            piece.data = None
+            logger.debug(f"Spilled partial piece {piece.index} to disk")
+    
+    def _enqueue(self: "DiskWriter", start: int, buffer: Union[bytes, bytearray, memoryview]) -> asyncio.Future:
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.queue.append(_Write(start, buffer, future))
+        self.size += len(buffer)
+        self._idle.clear()
+        self._wakeup.set()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return future
+    
+    def _update_pressure(self: "DiskWriter") -> None:
+        # Hysteresis between max_cache and low_water so peers are not toggled on every block
+        if not self.congested and self.size > self.max_cache:
+            self.congested = True
+        elif self.congested and self.size <= self.low_water:
+            self.congested = False
+        else:
+            return
+        
+        if self.on_backpressure:
+            self.on_backpressure(self.congested)
+    
+    async def _finish(self: "DiskWriter", piece: PieceBuffer) -> None:
+        torrent = self.storage.torrent
+        start: int = piece.index * torrent.piece_length
+        expected: bytes = torrent.pieces[piece.index*20:piece.index*20+20]
+        valid: bool = False
+        try:
+            if piece.spilled:
+                await asyncio.gather(*piece.writes)
+                valid = await self.verifier.verify(expected, self.storage.read_views(piece.index, 0, piece.size))
+            else:
+                # Verify, then flush: data that fails its hash never reaches the disk
+                valid = await self.verifier.verify(expected, [piece.data])
+                self.size -= piece.size
+                if valid:
+                    await self._enqueue(start, piece.data)
+                else:
+                    self._update_pressure()
+        except OSError as exc:
+            logger.error(f"Writing piece {piece.index} failed: {exc}")
+            valid = False
+        finally:
+            self.verifying.discard(piece.index)
+        if valid:
+            self.completed.add(piece.index)
+        
+        # Reported only once the data is on disk, so uploads of the piece can read it back
+        if self.on_piece:
+            self.on_piece(piece.index, valid)
+    
+    def _batches(self: "DiskWriter", writes: List[_Write]) -> List[List[_Write]]:
+        writes.sort(key=lambda write: write.start)
+        batches: List[List[_Write]] = []
+        end: int = -1
+        size: int = 0
+        for write in writes:
+            if batches and write.start == end and size + len(write.buffer) <= self.max_batch:
+                batches[-1].append(write)
+                size += len(write.buffer)
+            else:
+                batches.append([write])
+                size = len(write.buffer)
+            end = write.start + len(write.buffer)
+        return batches
+    
+    async def _run(self: "DiskWriter") -> None:
+        # A single writer keeps the disk sequential; whatever queues up during one write
+        # is sorted and merged into the next round of vectored writes
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            
+            writes, self.queue = self.queue, []
+            for batch in self._batches(writes):
+                size: int = sum(len(write.buffer) for write in batch)
+                try:
+                    await loop.run_in_executor(self.executor, self.storage.pwritev, batch[0].start, [write.buffer for write in batch])
+                except OSError as exc:
+                    for write in batch:
+                        if not write.future.done():
+                            write.future.set_exception(exc)
+                else:
+                    for write in batch:
+                        if not write.future.done():
+                            write.future.set_result(None)
+                finally:
+                    self.size -= size
+                    self._update_pressure()
+            
+            if not self.queue:
+                self._idle.set()
+    
+    async def flush(self: "DiskWriter") -> None:
+        while self._finishing or not self._idle.is_set():
+            await asyncio.gather(*self._finishing, return_exceptions=True)
+            await self._idle.wait()
+    
+    async def close(self: "DiskWriter") -> None:
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        
+        # Unfinished pieces are dropped; their blocks are requested again next session
+        self.pieces.clear()
+        self.size = self.held = 0
@@ -0,0 +1,91 @@
+from typing import Dict, List, Optional, Tuple
+import ipaddress
+import logging
+import asyncio
+import socket
+
+logger = logging.getLogger(__name__)
+
+class DNSCache:
+    def __init__(
+        self: "DNSCache",
+        ttl: Optional[float] = 300,
+        negative_ttl: Optional[float] = 60,
+        prefer: Optional[int] = None,
+        max_entries: Optional[int] = 4096
+        ) -> None:
+        # getaddrinfo does not expose record TTLs, so every answer lives for the same fixed ttl
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # socket.AF_INET or socket.AF_INET6 sorts that family first; None keeps the resolver's order
+        self.prefer = prefer
+        self.max_entries = max_entries
+        
+        # host -> (addresses, expiry); an empty list is a cached failure
+        self.entries: Dict[str, Tuple[List[str], float]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    def __len__(self: "DNSCache") -> int:
+        return len(self.entries)
+    
+    def invalidate(self: "DNSCache", host: str) -> None:
+        self.entries.pop(host, None)
+    
+    def _order(self: "DNSCache", addresses: List[str]) -> List[str]:
+        if self.prefer is None:
+            return addresses
+        
+        preferred_v6: bool = self.prefer == socket.AF_INET6
+        return sorted(addresses, key=lambda address: (":" in address) != preferred_v6)
+    
+    def _store(self: "DNSCache", host: str, addresses: List[str], ttl: float) -> None:
+        if len(self.entries) >= self.max_entries:
+            # Expired entries go first; failing that, the oldest insertion is dropped
+            now: float = asyncio.get_event_loop().time()
+            for stale in [name for name, (_, expiry) in self.entries.items() if expiry <= now]:
+                del self.entries[stale]
+            if len(self.entries) >= self.max_entries:
+                del self.entries[next(iter(self.entries))]
+        
+        self.entries[host] = (addresses, asyncio.get_event_loop().time() + ttl)
+    
+    def _lookup(self: "DNSCache", host: str) -> asyncio.Future:
+        # Single flight: concurrent announces to one tracker host share one getaddrinfo call
+        if (future := self._inflight.get(host)) is not None:
+            return future
+        
+        async def lookup() -> List[str]:
+            try:
+                infos = await asyncio.get_event_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            except socket.gaierror as exc:
+                logger.debug(f"Could not resolve {host}: {exc}")
+                self._store(host, [], self.negative_ttl)
+                return []
+            finally:
+                self._inflight.pop(host, None)
+            
+            addresses: List[str] = list(dict.fromkeys(info[4][0] for info in infos))
+            self._store(host, addresses, self.ttl if addresses else self.negative_ttl)
+            return addresses
+        
+        future = self._inflight[host] = asyncio.ensure_future(lookup())
+        return future
+    
+    async def resolve_all(self: "DNSCache", host: str) -> List[str]:
+        try:
+            return [str(ipaddress.ip_address(host))]
+        except ValueError:
+            pass
+        
+        entry: Optional[Tuple[List[str], float]] = self.entries.get(host)
+        if entry is not None and entry[1] > asyncio.get_event_loop().time():
+            addresses: List[str] = entry[0]
+        else:
+            addresses = await asyncio.shield(self._lookup(host))
+        
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, f"Could not resolve {host}")
+        return self._order(addresses)
+    
+    async def resolve(self: "DNSCache", host: str, port: int) -> Tuple[str, int]:
+        return ((await self.resolve_all(host))[0], port)
@@ -1,8 +1,10 @@
-from enum import Enum, IntEnum
+from enum import Enum, IntEnum, IntFlag
 
 class ActionType(IntEnum):
     CONNECT: int = 0
     ANNOUNCE: int = 1
+    SCRAPE: int = 2
+    ERROR: int = 3
 
 class HTTPEventType(Enum):
     STARTED: str = "started"
@@ -18,5 +20,12 @@ class EventType:
     HTTP: HTTPEventType = HTTPEventType
     UDP: UDPEventType = UDPEventType
 
+class PeerSource(IntFlag):
+    TRACKER: int = 1
+    PEX: int = 2
+    DHT: int = 4
+    INCOMING: int = 8
+    RESUME: int = 16
+
 class ProtocolStrings(Enum):
     BITTORRENT_PROTOCOL_V1: bytes = b"BitTorrent protocol"
\ No newline at end of file
@@ -1,2 +1,11 @@
 class TrackerError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class ProtocolError(Exception):
+    pass
+
+class PeerError(Exception):
+    pass
+
+class BencodeError(ValueError):
+    pass
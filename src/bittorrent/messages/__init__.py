@@ -1,4 +1,6 @@
 from .message_parser import parse_message
+from .message_decoder import MessageDecoder
+from .message_encoder import MessageEncoder
 from .handshake import Handshake
 from .keep_alive import KeepAlive
 from .choke import Choke
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import ClassVar, Type, Union
 from dataclasses import dataclass, field
 import struct
 
@@ -9,14 +9,15 @@ class BitField:
     message_length: int = field(init=False)
     message_id: int = 5
     
-    MESSAGE_FMT: str = ">IB"
+    MESSAGE_FMT: ClassVar[str] = ">IB"
+    MESSAGE_STRUCT: ClassVar[struct.Struct] = struct.Struct(MESSAGE_FMT)
     
     def __post_init__(self: "BitField") -> None:
         self.message_length = 1 + len(self.bitfield)
     
     def to_bytes(self: "BitField") -> bytes:
-        return struct.pack(self.MESSAGE_FMT, self.message_length, self.message_id) + self.bitfield
+        return self.MESSAGE_STRUCT.pack(self.message_length, self.message_id) + self.bitfield
     
     @classmethod
-    def from_bytes(cls: Type["BitField"], payload: bytes) -> "BitField":
-        return cls(payload)
\ No newline at end of file
+    def from_bytes(cls: Type["BitField"], payload: Union[bytes, memoryview]) -> "BitField":
+        return cls(bytes(payload))
\ No newline at end of file
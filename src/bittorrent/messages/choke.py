@@ -1,3 +1,4 @@
+from typing import ClassVar
 from dataclasses import dataclass
 import struct
 
@@ -6,7 +7,12 @@ class Choke:
     message_length: int = 1
     message_id: int = 0
     
-    MESSAGE_FMT: str = ">IB"
+    MESSAGE_FMT: ClassVar[str] = ">IB"
+    MESSAGE_STRUCT: ClassVar[struct.Struct] = struct.Struct(MESSAGE_FMT)
     
     def to_bytes(self: "Choke") -> bytes:
-        return struct.pack(self.MESSAGE_FMT, self.message_length, self.message_id)
\ No newline at end of file
+        return self.MESSAGE_STRUCT.pack(self.message_length, self.message_id)
+    
+    def pack_into(self: "Choke", buffer: bytearray, offset: int = 0) -> int:
+        self.MESSAGE_STRUCT.pack_into(buffer, offset, self.message_length, self.message_id)
+        return self.MESSAGE_STRUCT.size
\ No newline at end of file
@@ -1,7 +1,14 @@
-from typing import Type
+from typing import Type, Union
 from dataclasses import dataclass, field
+from functools import lru_cache
 import struct
 
+from ..exceptions import ProtocolError
+
+@lru_cache(maxsize=None)
+def handshake_struct(pstrlen: int) -> struct.Struct:
+    return struct.Struct(f"B{pstrlen}s8s20s20s")
+
 @dataclass
 class Handshake:
     pstrlen: int
@@ -13,11 +20,10 @@ class Handshake:
     MESSAGE_FMT: str = field(init=False)
     
     def __post_init__(self: "Handshake") -> None:
-        self.MESSAGE_FMT = f"B{self.pstrlen}s8s20s20s"
+        self.MESSAGE_FMT = handshake_struct(self.pstrlen).format
     
     def to_bytes(self: "Handshake") -> bytes:
-        return struct.pack(
-            self.MESSAGE_FMT,
+        return handshake_struct(self.pstrlen).pack(
             self.pstrlen,
             self.pstr,
             self.reserved,
@@ -26,6 +32,7 @@ class Handshake:
             )
     
     @classmethod
-    def from_bytes(cls: Type["Handshake"], payload: bytes) -> "Handshake":
-        pstrlen: int = struct.unpack(">B", payload[:1])[0]
-        return cls(pstrlen, *struct.unpack(f"{pstrlen}s8s20s20s", payload[1:]))
\ No newline at end of file
+    def from_bytes(cls: Type["Handshake"], payload: Union[bytes, memoryview]) -> "Handshake":
+        if not payload or len(payload) != 49 + payload[0]:
+            raise ProtocolError(f"Handshake is {len(payload)} bytes, expected {49 + payload[0] if payload else 49}")
+        return cls(*handshake_struct(payload[0]).unpack(payload))
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import ClassVar, Type, Union
 from dataclasses import dataclass
 import struct
 
@@ -6,15 +6,21 @@ import struct
 class Have:
     index: int
     
-    message_length: int = 1
+    message_length: int = 5
     message_id: int = 4
     
-    MESSAGE_FMT: str = ">IBI"
-    PAYLOAD_FMT: str = ">I"
+    MESSAGE_FMT: ClassVar[str] = ">IBI"
+    PAYLOAD_FMT: ClassVar[str] = ">I"
+    MESSAGE_STRUCT: ClassVar[struct.Struct] = struct.Struct(MESSAGE_FMT)
+    PAYLOAD_STRUCT: ClassVar[struct.Struct] = struct.Struct(PAYLOAD_FMT)
     
     def to_bytes(self: "Have") -> bytes:
-        return struct.pack(self.MESSAGE_FMT, self.message_length, self.message_id, self.index)
+        return self.MESSAGE_STRUCT.pack(self.message_length, self.message_id, self.index)
+    
+    def pack_into(self: "Have", buffer: bytearray, offset: int = 0) -> int:
+        self.MESSAGE_STRUCT.pack_into(buffer, offset, self.message_length, self.message_id, self.index)
+        return self.MESSAGE_STRUCT.size
     
     @classmethod
-    def from_bytes(cls: Type["Have"], payload: bytes) -> "Have":
-        return cls(*struct.unpack(cls.PAYLOAD_FMT, payload))
\ No newline at end of file
+    def from_bytes(cls: Type["Have"], payload: Union[bytes, memoryview]) -> "Have":
+        return cls(*cls.PAYLOAD_STRUCT.unpack(payload))
\ No newline at end of file
@@ -1,13 +1,17 @@
-from typing import Type
 from dataclasses import dataclass
+from typing import ClassVar
 import struct
 
 @dataclass
 class KeepAlive:
     message_length: int = 0
     
-    MESSAGE_FMT: str = ">I"
-    PAYLOAD_FMT: str = ">I"
+    MESSAGE_FMT: ClassVar[str] = ">I"
+    MESSAGE_STRUCT: ClassVar[struct.Struct] = struct.Struct(MESSAGE_FMT)
     
     def to_bytes(self: "KeepAlive") -> bytes:
-        return struct.pack(self.MESSAGE_FMT, self.message_length)
\ No newline at end of file
+        return self.MESSAGE_STRUCT.pack(self.message_length)
+    
+    def pack_into(self: "KeepAlive", buffer: bytearray, offset: int = 0) -> int:
+        self.MESSAGE_STRUCT.pack_into(buffer, offset, self.message_length)
+        return self.MESSAGE_STRUCT.size
\ No newline at end of file
@@ -0,0 +1,112 @@
+from typing import Any, Iterator, List, Optional, Union
+import logging
+import struct
+
+from ..exceptions import ProtocolError
+from .handshake import Handshake
+from .keep_alive import KeepAlive
+from .message_parser import message_id_mapper, decode_payload
+
+logger = logging.getLogger(__name__)
+
+LENGTH_PREFIX: struct.Struct = struct.Struct(">I")
+
+# Piece.block is a memoryview into the decoder buffer and stays valid only until
+# the next feed()/get_buffer() call; write or copy blocks before feeding more data.
+class MessageDecoder:
+    def __init__(
+        self: "MessageDecoder",
+        handshake: Optional[bool] = True,
+        buffer_size: Optional[int] = 1 << 18,
+        max_message_length: Optional[int] = 1 << 21
+        ) -> None:
+        self.expect_handshake = handshake
+        self.max_message_length = max_message_length
+        
+        self.buffer: bytearray = bytearray(buffer_size)
+        self._view: memoryview = memoryview(self.buffer)
+        self._start: int = 0
+        self._end: int = 0
+    
+    def __len__(self: "MessageDecoder") -> int:
+        return self._end - self._start
+    
+    def __iter__(self: "MessageDecoder") -> Iterator[Any]:
+        return iter(self.decode_available())
+    
+    def _reserve(self: "MessageDecoder", size: int) -> None:
+        if len(self.buffer) - self._end >= size:
+            return
+        
+        pending: int = self._end - self._start
+        if pending + size <= len(self.buffer):
+            # memoryview assignment uses memmove, so overlapping ranges are safe
+            self._view[:pending] = self._view[self._start:self._end]
+        else:
+            # Never resize in place: exported block views would make bytearray raise BufferError
+            buffer: bytearray = bytearray(max(len(self.buffer) * 2, pending + size))
+            buffer[:pending] = self._view[self._start:self._end]
+            self.buffer = buffer
+            self._view = memoryview(buffer)
+        
+        self._start, self._end = (0, pending)
+    
+    def get_buffer(self: "MessageDecoder", sizehint: Optional[int] = -1) -> memoryview:
+        self._reserve(max(sizehint, 1 << 16))
+        return self._view[self._end:]
+    
+    def buffer_updated(self: "MessageDecoder", nbytes: int) -> None:
+        self._end += nbytes
+    
+    def feed(self: "MessageDecoder", data: Union[bytes, bytearray, memoryview]) -> None:
+        size: int = len(data)
+        self._reserve(size)
+        self._view[self._end:self._end+size] = data
+        self._end += size
+    
+    def decode(self: "MessageDecoder", data: Union[bytes, bytearray, memoryview]) -> List[Any]:
+        self.feed(data)
+        return self.decode_available()
+    
+    def decode_available(self: "MessageDecoder") -> List[Any]:
+        messages: List[Any] = []
+        view: memoryview = self._view
+        start: int = self._start
+        end: int = self._end
+        
+        if self.expect_handshake:
+            if start == end or end - start < 49 + view[start]:
+                return messages
+            
+            size: int = 49 + view[start]
+            messages.append(Handshake.from_bytes(view[start:start+size]))
+            start += size
+            self.expect_handshake = False
+        
+        unpack_from = LENGTH_PREFIX.unpack_from
+        max_message_length: int = self.max_message_length
+        while end - start >= 4:
+            length: int = unpack_from(view, start)[0]
+            if length == 0:
+                messages.append(KeepAlive())
+                start += 4
+                continue
+            elif length > max_message_length:
+                raise ProtocolError(f"Message length ({length}) exceeds the maximum allowed length ({max_message_length})")
+            elif end - start - 4 < length:
+                break
+            
+            message_id: int = view[start+4]
+            if message_id in message_id_mapper:
+                messages.append(decode_payload(message_id, view[start+5:start+4+length]))
+            else:
+                logger.debug(f"Skipping unsupported message id: {message_id}")
+            
+            start += 4 + length
+        
+        if start == end:
+            self._start, self._end = (0, 0)
+        else:
+            self._start = start
+        
+        return messages
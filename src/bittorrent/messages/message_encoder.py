@@ -0,0 +1,68 @@
+from typing import Iterable, List, Sequence, Tuple, Union
+import struct
+
+from .have import Have
+from .request import Request
+from .cancel import Cancel
+from .piece import Piece
+
+BlockSpec = Tuple[int, int, int]
+
+# Every batch gets a fresh buffer: a backpressured transport queues the object it was given
+# rather than a copy (Python 3.12+), so a shared buffer would be overwritten before it is sent.
+class MessageEncoder:
+    def encode(self: "MessageEncoder", messages: Sequence[Union[Have, Request, Cancel]]) -> bytearray:
+        size: int = sum(message.MESSAGE_STRUCT.size for message in messages)
+        buffer: bytearray = bytearray(size)
+        
+        offset: int = 0
+        for message in messages:
+            offset += message.pack_into(buffer, offset)
+        
+        return buffer
+    
+    def _encode_blocks(self: "MessageEncoder", message_struct: struct.Struct, message_id: int, blocks: Sequence[BlockSpec]) -> bytearray:
+        size: int = message_struct.size
+        buffer: bytearray = bytearray(size * len(blocks))
+        
+        pack_into = message_struct.pack_into
+        offset: int = 0
+        for index, begin, length in blocks:
+            pack_into(buffer, offset, 13, message_id, index, begin, length)
+            offset += size
+        
+        return buffer
+    
+    def encode_requests(self: "MessageEncoder", blocks: Sequence[BlockSpec]) -> bytearray:
+        return self._encode_blocks(Request.MESSAGE_STRUCT, Request.message_id, blocks)
+    
+    def encode_cancels(self: "MessageEncoder", blocks: Sequence[BlockSpec]) -> bytearray:
+        return self._encode_blocks(Cancel.MESSAGE_STRUCT, Cancel.message_id, blocks)
+    
+    def encode_haves(self: "MessageEncoder", indices: Sequence[int]) -> bytearray:
+        size: int = Have.MESSAGE_STRUCT.size
+        buffer: bytearray = bytearray(size * len(indices))
+        
+        pack_into = Have.MESSAGE_STRUCT.pack_into
+        offset: int = 0
+        for index in indices:
+            pack_into(buffer, offset, 5, Have.message_id, index)
+            offset += size
+        
+        return buffer
+    
+    def piece_buffers(self: "MessageEncoder", pieces: Iterable[Piece]) -> List[Union[bytes, memoryview]]:
+        pieces = list(pieces)
+        size: int = Piece.HEADER_STRUCT.size
+        # Headers get their own buffer: the block payloads are queued alongside them, never copied
+        headers: memoryview = memoryview(bytearray(size * len(pieces)))
+        
+        buffers: List[Union[bytes, memoryview]] = []
+        offset: int = 0
+        for piece in pieces:
+            piece.pack_header_into(headers, offset)
+            buffers.append(headers[offset:offset+size])
+            buffers.append(piece.block)
+            offset += size
+        
+        return buffers
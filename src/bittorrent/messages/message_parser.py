@@ -1,6 +1,8 @@
-from typing import Any, Dict, Type
+from typing import Any, Dict, Type, Union
 import struct
 
+from ..exceptions import ProtocolError
+
 from .handshake import Handshake
 from .keep_alive import KeepAlive
 from .choke import Choke
@@ -27,12 +29,31 @@ message_id_mapper: Dict[int, Type] = {
     9: Port
 }
 
-def parse_message(message: bytes) -> Type[Any]:
-    message_length: int = struct.unpack(">I", message[:4])[0]
+# Exact payload sizes; Piece only has a minimum and BitField is checked against the torrent later
+payload_lengths: Dict[int, int] = {0: 0, 1: 0, 2: 0, 3: 0, 4: 4, 6: 12, 8: 12, 9: 2}
+
+def decode_payload(message_id: int, payload: Union[bytes, memoryview]) -> Any:
+    message_class: Type[Any] = message_id_mapper.get(message_id)
+    if message_class is None:
+        raise ProtocolError(f"Unknown message id: {message_id}")
+    
+    size: int = len(payload)
+    if (expected := payload_lengths.get(message_id)) is not None and size != expected:
+        raise ProtocolError(f"{message_class.__name__} payload is {size} bytes, expected {expected}")
+    elif message_id == 7 and size < 8:
+        raise ProtocolError(f"Piece payload is {size} bytes, expected at least 8")
+    
+    return message_class.from_bytes(payload) if hasattr(message_class, "from_bytes") else message_class()
+
+def parse_message(message: Union[bytes, memoryview]) -> Any:
+    if len(message) < 4:
+        raise ProtocolError(f"Message is {len(message)} bytes, shorter than its length prefix")
+    
+    message_length: int = struct.unpack_from(">I", message)[0]
     if message_length == 0:
         return KeepAlive()
+    elif len(message) < 4 + message_length:
+        raise ProtocolError(f"Message is truncated: {len(message) - 4} of {message_length} bytes")
     
-    message_id: int = struct.unpack(">B", message[4:5])[0]
-    message_class: Type[Any] = message_id_mapper[message_id]
-    
-    return message_class.from_bytes(payload) if (payload := message[5:]) and hasattr(message_class, "from_bytes") else message_class()
\ No newline at end of file
+    view: memoryview = memoryview(message)
+    return decode_payload(view[4], view[5:4+message_length])
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Type
+from typing import ClassVar, List, Type, Union
 from dataclasses import dataclass, field
 import struct
 
@@ -6,20 +6,33 @@ import struct
 class Piece:
     index: int
     begin: int
-    block: bytes
+    block: Union[bytes, memoryview]
     
     message_length: int = field(init=False)
     message_id: int = 7
     
-    MESSAGE_FMT: str = ">IBIII"
-    PAYLOAD_FMT: str = ">III"
+    HEADER_FMT: ClassVar[str] = ">IBII"
+    PAYLOAD_FMT: ClassVar[str] = ">II"
+    HEADER_STRUCT: ClassVar[struct.Struct] = struct.Struct(HEADER_FMT)
+    PAYLOAD_STRUCT: ClassVar[struct.Struct] = struct.Struct(PAYLOAD_FMT)
     
     def __post_init__(self: "Piece") -> None:
         self.message_length = 9 + len(self.block)
     
+    def header(self: "Piece") -> bytes:
+        return self.HEADER_STRUCT.pack(self.message_length, self.message_id, self.index, self.begin)
+    
+    def pack_header_into(self: "Piece", buffer: bytearray, offset: int = 0) -> int:
+        self.HEADER_STRUCT.pack_into(buffer, offset, self.message_length, self.message_id, self.index, self.begin)
+        return self.HEADER_STRUCT.size
+    
+    def to_buffers(self: "Piece") -> List[Union[bytes, memoryview]]:
+        return [self.header(), self.block]
+    
     def to_bytes(self: "Piece") -> bytes:
-        return struct.pack(self.MESSAGE_FMT, self.message_length, self.message_id, self.index, self.begin, self.block)
+        return b"".join(self.to_buffers())
     
     @classmethod
-    def from_bytes(cls: Type["Piece"], payload: bytes) -> "Piece":
-        return cls(*struct.unpack(cls.PAYLOAD_FMT, payload))
\ No newline at end of file
+    def from_bytes(cls: Type["Piece"], payload: Union[bytes, memoryview]) -> "Piece":
+        # Slicing a memoryview payload keeps the block zero-copy
+        return cls(*cls.PAYLOAD_STRUCT.unpack_from(payload), payload[8:])
\ No newline at end of file
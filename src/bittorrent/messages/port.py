@@ -1,4 +1,4 @@
-from typing import Type
+from typing import ClassVar, Type, Union
 from dataclasses import dataclass
 import struct
 
@@ -9,12 +9,18 @@ class Port:
     message_length: int = 3
     message_id: int = 9
     
-    MESSAGE_FMT: str = ">IBH"
-    PAYLOAD_FMT: str = ">H"
+    MESSAGE_FMT: ClassVar[str] = ">IBH"
+    PAYLOAD_FMT: ClassVar[str] = ">H"
+    MESSAGE_STRUCT: ClassVar[struct.Struct] = struct.Struct(MESSAGE_FMT)
+    PAYLOAD_STRUCT: ClassVar[struct.Struct] = struct.Struct(PAYLOAD_FMT)
     
     def to_bytes(self: "Port") -> bytes:
-        return struct.pack(self.MESSAGE_FMT, self.message_length, self.message_id, self.index, self.begin, self.length)
+        return self.MESSAGE_STRUCT.pack(self.message_length, self.message_id, self.listen_port)
+    
+    def pack_into(self: "Port", buffer: bytearray, offset: int = 0) -> int:
+        self.MESSAGE_STRUCT.pack_into(buffer, offset, self.message_length, self.message_id, self.listen_port)
+        return self.MESSAGE_STRUCT.size
     
     @classmethod
-    def from_bytes(cls: Type["Port"], payload: bytes) -> "Port":
-        return cls(*struct.unpack(cls.PAYLOAD_FMT, payload))
\ No newline at end of file
+    def from_bytes(cls: Type["Port"], payload: Union[bytes, memoryview]) -> "Port":
+        return cls(*cls.PAYLOAD_STRUCT.unpack(payload))
\ No newline at end of file
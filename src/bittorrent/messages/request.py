@@ -1,4 +1,4 @@
-from typing import Type
+from typing import ClassVar, Type, Union
 from dataclasses import dataclass
 import struct
 
@@ -8,15 +8,21 @@ class Request:
     begin: int
     length: int
     
-    message_length: int = 1
+    message_length: int = 13
     message_id: int = 6
     
-    MESSAGE_FMT: str = ">IBIII"
-    PAYLOAD_FMT: str = ">III"
+    MESSAGE_FMT: ClassVar[str] = ">IBIII"
+    PAYLOAD_FMT: ClassVar[str] = ">III"
+    MESSAGE_STRUCT: ClassVar[struct.Struct] = struct.Struct(MESSAGE_FMT)
+    PAYLOAD_STRUCT: ClassVar[struct.Struct] = struct.Struct(PAYLOAD_FMT)
     
     def to_bytes(self: "Request") -> bytes:
-        return struct.pack(self.MESSAGE_FMT, self.message_length, self.message_id, self.index, self.begin, self.length)
+        return self.MESSAGE_STRUCT.pack(self.message_length, self.message_id, self.index, self.begin, self.length)
+    
+    def pack_into(self: "Request", buffer: bytearray, offset: int = 0) -> int:
+        self.MESSAGE_STRUCT.pack_into(buffer, offset, self.message_length, self.message_id, self.index, self.begin, self.length)
+        return self.MESSAGE_STRUCT.size
     
     @classmethod
-    def from_bytes(cls: Type["Request"], payload: bytes) -> "Request":
-        return cls(*struct.unpack(cls.PAYLOAD_FMT, payload))
\ No newline at end of file
+    def from_bytes(cls: Type["Request"], payload: Union[bytes, memoryview]) -> "Request":
+        return cls(*cls.PAYLOAD_STRUCT.unpack(payload))
\ No newline at end of file
@@ -0,0 +1,234 @@
+from typing import IO, ClassVar, Dict, Iterator, List, Optional, Set, Tuple, Type
+from dataclasses import dataclass, field
+import logging
+import struct
+import mmap
+import os
+
+from .torrent import Torrent
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class IndexEntry:
+    info_hash: bytes
+    name: str
+    piece_length: int
+    num_pieces: int
+    total_length: int
+    # Offset of the concatenated piece hashes inside the stored .torrent file
+    pieces_offset: int
+    files: List[Tuple[Tuple[str, ...], int]] = field(default_factory=list)
+    announce_list: List[List[bytes]] = field(default_factory=list)
+    
+    ENTRY_STRUCT: ClassVar[struct.Struct] = struct.Struct(">IIQQHI")
+    # File length and number of path components; each component then carries its own length
+    FILE_STRUCT: ClassVar[struct.Struct] = struct.Struct(">QH")
+    COUNT_STRUCT: ClassVar[struct.Struct] = struct.Struct(">H")
+    
+    @classmethod
+    def from_torrent(cls: Type["IndexEntry"], torrent: Torrent) -> "IndexEntry":
+        return cls(
+            torrent.info_hash,
+            torrent.name,
+            torrent.piece_length,
+            torrent.num_pieces,
+            torrent.total_length,
+            torrent.pieces_offset,
+            list(torrent.files),
+            [list(tier) for tier in (torrent.announce_list or [[torrent.announce]])]
+            )
+    
+    def to_bytes(self: "IndexEntry") -> bytes:
+        name: bytes = self.name.encode()
+        parts: List[bytes] = [
+            self.ENTRY_STRUCT.pack(self.piece_length, self.num_pieces, self.total_length, self.pieces_offset, len(name), len(self.files)),
+            name
+            ]
+        
+        for path, length in self.files:
+            # Length-prefixed rather than joined, since a decoded path part may itself contain NUL or "/"
+            parts.append(self.FILE_STRUCT.pack(length, len(path)))
+            for part in path:
+                encoded: bytes = part.encode()
+                parts.append(self.COUNT_STRUCT.pack(len(encoded)))
+                parts.append(encoded)
+        
+        parts.append(self.COUNT_STRUCT.pack(len(self.announce_list)))
+        for tier in self.announce_list:
+            parts.append(self.COUNT_STRUCT.pack(len(tier)))
+            for url in tier:
+                parts.append(self.COUNT_STRUCT.pack(len(url)))
+                parts.append(url)
+        
+        return b"".join(parts)
+    
+    @classmethod
+    def from_bytes(cls: Type["IndexEntry"], info_hash: bytes, payload: memoryview) -> "IndexEntry":
+        piece_length, num_pieces, total_length, pieces_offset, name_length, file_count = cls.ENTRY_STRUCT.unpack_from(payload)
+        offset: int = cls.ENTRY_STRUCT.size
+        name: str = bytes(payload[offset:offset+name_length]).decode()
+        offset += name_length
+        
+        def read_count() -> int:
+            nonlocal offset
+            count: int = cls.COUNT_STRUCT.unpack_from(payload, offset)[0]
+            offset += cls.COUNT_STRUCT.size
+            return count
+        
+        files: List[Tuple[Tuple[str, ...], int]] = []
+        for _ in range(file_count):
+            length, path_count = cls.FILE_STRUCT.unpack_from(payload, offset)
+            offset += cls.FILE_STRUCT.size
+            path: List[str] = []
+            for _ in range(path_count):
+                part_length: int = read_count()
+                path.append(bytes(payload[offset:offset+part_length]).decode())
+                offset += part_length
+            files.append((tuple(path), length))
+        
+        announce_list: List[List[bytes]] = []
+        for _ in range(read_count()):
+            tier: List[bytes] = []
+            for _ in range(read_count()):
+                url_length: int = read_count()
+                tier.append(bytes(payload[offset:offset+url_length]))
+                offset += url_length
+            announce_list.append(tier)
+        
+        return cls(info_hash, name, piece_length, num_pieces, total_length, pieces_offset, files, announce_list)
+    
+    def piece_hash(self: "IndexEntry", torrent_path: str, index: int) -> bytes:
+        with open(torrent_path, "rb") as f:
+            f.seek(self.pieces_offset + index * 20)
+            return f.read(20)
+
+class MetainfoIndex:
+    MAGIC: ClassVar[bytes] = b"BTMI"
+    VERSION: ClassVar[int] = 2
+    HEADER_STRUCT: ClassVar[struct.Struct] = struct.Struct(">4sBI")
+    # Records are sorted by info-hash so lookups bisect the mapped table without loading it
+    RECORD_STRUCT: ClassVar[struct.Struct] = struct.Struct(">20sQI")
+    
+    def __init__(self: "MetainfoIndex", path: str) -> None:
+        self.path = path
+        self.pending: Dict[bytes, IndexEntry] = {}
+        self.removed: Set[bytes] = set()
+        
+        self._file: Optional[IO[bytes]] = None
+        self._map: Optional[mmap.mmap] = None
+        self._count: int = 0
+        self._open()
+    
+    def _open(self: "MetainfoIndex") -> None:
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        
+        try:
+            if os.fstat(self._file.fileno()).st_size < self.HEADER_STRUCT.size:
+                raise ValueError("Truncated index")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count = self.HEADER_STRUCT.unpack_from(self._map)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError("Not a metainfo index or unsupported version")
+            if self.HEADER_STRUCT.size + count * self.RECORD_STRUCT.size > len(self._map):
+                raise ValueError("Truncated index")
+            self._count = count
+        except ValueError as exc:
+            logger.warning(f"Ignoring corrupt metainfo index {self.path}: {exc}")
+            self.close()
+    
+    def close(self: "MetainfoIndex") -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._count = 0
+    
+    def _record(self: "MetainfoIndex", position: int) -> Tuple[bytes, int, int]:
+        return self.RECORD_STRUCT.unpack_from(self._map, self.HEADER_STRUCT.size + position * self.RECORD_STRUCT.size)
+    
+    def _find(self: "MetainfoIndex", info_hash: bytes) -> Optional[Tuple[int, int]]:
+        low, high = 0, self._count
+        while low < high:
+            middle: int = (low + high) // 2
+            key, offset, length = self._record(middle)
+            if key < info_hash:
+                low = middle + 1
+            elif key > info_hash:
+                high = middle
+            else:
+                return (offset, length)
+        return None
+    
+    def _stored(self: "MetainfoIndex") -> Iterator[bytes]:
+        for position in range(self._count):
+            yield self._record(position)[0]
+    
+    def __len__(self: "MetainfoIndex") -> int:
+        return sum(1 for _ in self)
+    
+    def __iter__(self: "MetainfoIndex") -> Iterator[bytes]:
+        for info_hash in self._stored():
+            if info_hash not in self.pending and info_hash not in self.removed:
+                yield info_hash
+        yield from self.pending
+    
+    def __contains__(self: "MetainfoIndex", info_hash: bytes) -> bool:
+        if info_hash in self.pending:
+            return True
+        return info_hash not in self.removed and self._map is not None and self._find(info_hash) is not None
+    
+    def get(self: "MetainfoIndex", info_hash: bytes) -> Optional[IndexEntry]:
+        if (entry := self.pending.get(info_hash)) is not None:
+            return entry
+        if info_hash in self.removed or self._map is None or (found := self._find(info_hash)) is None:
+            return None
+        
+        offset, length = found
+        with memoryview(self._map) as view:
+            return IndexEntry.from_bytes(info_hash, view[offset:offset+length])
+    
+    def add(self: "MetainfoIndex", entry: IndexEntry) -> None:
+        self.removed.discard(entry.info_hash)
+        self.pending[entry.info_hash] = entry
+    
+    def remove(self: "MetainfoIndex", info_hash: bytes) -> None:
+        self.pending.pop(info_hash, None)
+        self.removed.add(info_hash)
+    
+    def save(self: "MetainfoIndex") -> None:
+        if not self.pending and not self.removed:
+            return
+        
+        # Unchanged entries are copied as raw bytes from the old mapping, never re-parsed
+        blobs: Dict[bytes, bytes] = {}
+        if self._map is not None:
+            for position in range(self._count):
+                info_hash, offset, length = self._record(position)
+                if info_hash not in self.pending and info_hash not in self.removed:
+                    blobs[info_hash] = self._map[offset:offset+length]
+        for info_hash, entry in self.pending.items():
+            blobs[info_hash] = entry.to_bytes()
+        
+        keys: List[bytes] = sorted(blobs)
+        offset = self.HEADER_STRUCT.size + len(keys) * self.RECORD_STRUCT.size
+        parts: List[bytes] = [self.HEADER_STRUCT.pack(self.MAGIC, self.VERSION, len(keys))]
+        for info_hash in keys:
+            parts.append(self.RECORD_STRUCT.pack(info_hash, offset, len(blobs[info_hash])))
+            offset += len(blobs[info_hash])
+        parts.extend(blobs[info_hash] for info_hash in keys)
+        
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.tmp", "wb") as f:
+            f.writelines(parts)
+        
+        self.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        self.pending.clear()
+        self.removed.clear()
+        self._open()
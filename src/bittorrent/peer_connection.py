@@ -0,0 +1,289 @@
+from typing import IO, Any, Callable, List, Optional, Sequence, Tuple, Union
+import logging
+import asyncio
+
+from .enums import ProtocolStrings
+from .exceptions import PeerError, ProtocolError
+from .messages import (
+    MessageDecoder,
+    MessageEncoder,
+    Handshake,
+    KeepAlive,
+    Choke,
+    Unchoke,
+    Interested,
+    NotInterested,
+    Have,
+    BitField,
+    Piece
+)
+from .peer import Peer
+from .rate_limiter import RateLimiter, TokenBucket
+from .rate_meter import RateMeter
+
+logger = logging.getLogger(__name__)
+
+class PeerConnection(asyncio.BufferedProtocol):
+    def __init__(
+        self: "PeerConnection",
+        peer: Peer,
+        info_hash: bytes,
+        peer_id: bytes,
+        on_message: Optional[Callable[["PeerConnection", Any], None]] = None,
+        on_close: Optional[Callable[["PeerConnection"], None]] = None,
+        upload_limiter: Optional[RateLimiter] = None,
+        download_limiter: Optional[RateLimiter] = None,
+        upload_bucket: Optional[TokenBucket] = None,
+        download_bucket: Optional[TokenBucket] = None
+        ) -> None:
+        self.peer = peer
+        self.info_hash = info_hash
+        self.peer_id = peer_id
+        self.on_message = on_message
+        self.on_close = on_close
+        # Per-peer buckets, children of the torrent's buckets in the session limiters
+        self.upload_limiter = upload_limiter
+        self.download_limiter = download_limiter
+        self.upload_bucket = upload_bucket if upload_bucket is not None or upload_limiter is None else upload_limiter.bucket()
+        self.download_bucket = download_bucket if download_bucket is not None or download_limiter is None else download_limiter.bucket()
+        self._resume_reading: Optional[asyncio.TimerHandle] = None
+        # Set while the disk writer is behind; reading stays paused regardless of rate limits
+        self.disk_paused: bool = False
+        # Writes made while sendfile owns the socket are held here and flushed afterwards
+        self._deferred: Optional[List[bytes]] = None
+        
+        self.loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        self.transport: Optional[asyncio.Transport] = None
+        self.decoder: MessageDecoder = MessageDecoder(handshake=True)
+        self.encoder: MessageEncoder = MessageEncoder()
+        
+        self.handshake: asyncio.Future = self.loop.create_future()
+        self.closed: asyncio.Future = self.loop.create_future()
+        self.remote_peer_id: Optional[bytes] = None
+        
+        self.am_choking: bool = True
+        self.am_interested: bool = False
+        self.peer_choking: bool = True
+        self.peer_interested: bool = False
+        self.bitfield: Optional[bytearray] = None
+        
+        self.last_received: float = self.loop.time()
+        self.last_sent: float = self.last_received
+        self.connected_at: float = self.last_received
+        self.last_piece: float = self.last_received
+        self.download_meter: RateMeter = RateMeter()
+        self.upload_meter: RateMeter = RateMeter()
+    
+    @property
+    def key(self: "PeerConnection") -> Tuple[str, int]:
+        return (self.peer.ip, self.peer.port)
+    
+    def connection_made(self: "PeerConnection", transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.write(Handshake(
+            len(ProtocolStrings.BITTORRENT_PROTOCOL_V1.value),
+            ProtocolStrings.BITTORRENT_PROTOCOL_V1.value,
+            bytes(8),
+            self.info_hash,
+            self.peer_id
+            ).to_bytes())
+    
+    def get_buffer(self: "PeerConnection", sizehint: int) -> memoryview:
+        return self.decoder.get_buffer(sizehint)
+    
+    def buffer_updated(self: "PeerConnection", nbytes: int) -> None:
+        self.decoder.buffer_updated(nbytes)
+        self.last_received = self.loop.time()
+        self.download_meter.add(nbytes, self.last_received)
+        if self.download_limiter is not None:
+            self._throttle_download(nbytes)
+        
+        try:
+            messages: List[Any] = self.decoder.decode_available()
+        except ProtocolError as exc:
+            self.close(exc)
+            return
+        
+        for message in messages:
+            self._handle_message(message)
+            if self.transport is None or self.transport.is_closing():
+                break
+    
+    def _throttle_download(self: "PeerConnection", nbytes: int) -> None:
+        # Received data is charged after the fact; while any bucket up the chain is in debt
+        # the socket stops being read, so TCP flow control slows the sender down
+        self.download_limiter.consume(self.download_bucket, self.download_limiter.wire_size(nbytes))
+        if self._resume_reading is None and self.download_limiter.available(self.download_bucket) < 0:
+            self.transport.pause_reading()
+            self._resume_reading = self.loop.call_later(self.download_limiter.tick, self._check_download_quota)
+    
+    def _check_download_quota(self: "PeerConnection") -> None:
+        self._resume_reading = None
+        if self.transport is None or self.transport.is_closing():
+            return
+        
+        if self.download_limiter.available(self.download_bucket) < 0:
+            self._resume_reading = self.loop.call_later(self.download_limiter.tick, self._check_download_quota)
+        elif not self.disk_paused:
+            self.transport.resume_reading()
+    
+    def pause_for_disk(self: "PeerConnection", paused: bool) -> None:
+        self.disk_paused = paused
+        if self.transport is None or self.transport.is_closing():
+            return
+        
+        if paused:
+            self.transport.pause_reading()
+        elif self._resume_reading is None:
+            self.transport.resume_reading()
+    
+    def connection_lost(self: "PeerConnection", exc: Optional[Exception]) -> None:
+        self.transport = None
+        if self._resume_reading is not None:
+            self._resume_reading.cancel()
+            self._resume_reading = None
+        self._fail_handshake(ConnectionError(f"Connection lost before handshake: {exc}"))
+        if not self.closed.done():
+            self.closed.set_result(exc)
+        
+        if self.on_close:
+            self.on_close(self)
+    
+    def _fail_handshake(self: "PeerConnection", exc: Exception) -> None:
+        if not self.handshake.done():
+            self.handshake.set_exception(exc)
+            # Nobody may be awaiting the handshake if the connect already timed out
+            self.handshake.exception()
+    
+    def _handle_handshake(self: "PeerConnection", message: Handshake) -> None:
+        if message.pstr != ProtocolStrings.BITTORRENT_PROTOCOL_V1.value:
+            raise PeerError(f"Unsupported protocol: {message.pstr}")
+        if message.info_hash != self.info_hash:
+            raise PeerError("info_hash does not match")
+        if message.peer_id == self.peer_id:
+            raise PeerError("Connected to ourselves")
+        
+        self.remote_peer_id = message.peer_id
+        self.handshake.set_result(message)
+    
+    def _handle_message(self: "PeerConnection", message: Any) -> None:
+        message_type: type = type(message)
+        if message_type is Handshake:
+            try:
+                self._handle_handshake(message)
+            except PeerError as exc:
+                self.close(exc)
+                return
+        elif not self.handshake.done():
+            self.close(PeerError("Message received before handshake"))
+            return
+        elif message_type is Piece:
+            self.last_piece = self.last_received
+        elif message_type is Choke:
+            self.peer_choking = True
+        elif message_type is Unchoke:
+            self.peer_choking = False
+        elif message_type is Interested:
+            self.peer_interested = True
+        elif message_type is NotInterested:
+            self.peer_interested = False
+        elif message_type is BitField:
+            self.bitfield = bytearray(message.bitfield)
+        elif message_type is Have:
+            if self.bitfield is not None and message.index >> 3 < len(self.bitfield):
+                self.bitfield[message.index >> 3] |= 0x80 >> (message.index & 7)
+        
+        if self.on_message:
+            self.on_message(self, message)
+    
+    def write(self: "PeerConnection", data: Union[bytes, memoryview]) -> None:
+        if self.transport is None:
+            raise PeerError("Connection is closed")
+        
+        if self._deferred is not None:
+            # Views may point into buffers their owner reuses, so anything that has to wait is copied
+            self._deferred.append(bytes(data))
+        else:
+            self.transport.write(data)
+        self.last_sent = self.loop.time()
+        self.upload_meter.add(len(data), self.last_sent)
+    
+    def writelines(self: "PeerConnection", buffers: Sequence[Union[bytes, memoryview]]) -> None:
+        if self.transport is None:
+            raise PeerError("Connection is closed")
+        
+        if self._deferred is not None:
+            self._deferred.extend(bytes(buffer) for buffer in buffers)
+        else:
+            self.transport.writelines(buffers)
+        self.last_sent = self.loop.time()
+        self.upload_meter.add(sum(len(buffer) for buffer in buffers), self.last_sent)
+    
+    async def sendfile(self: "PeerConnection", file: IO[bytes], offset: int, count: int) -> None:
+        if self.transport is None:
+            raise PeerError("Connection is closed")
+        
+        # The kernel copies file pages straight to the socket; asyncio.SendfileNotAvailableError
+        # is left to the caller, which falls back to writing mapped views
+        self._deferred = []
+        try:
+            await self.loop.sendfile(self.transport, file, offset, count, fallback=False)
+        finally:
+            deferred, self._deferred = self._deferred, None
+            if deferred and self.transport is not None and not self.transport.is_closing():
+                self.transport.writelines(deferred)
+        
+        self.last_sent = self.loop.time()
+        self.upload_meter.add(count, self.last_sent)
+    
+    def send(self: "PeerConnection", message: Any) -> None:
+        self.write(message.to_bytes())
+    
+    def send_requests(self: "PeerConnection", blocks: Sequence[Tuple[int, int, int]]) -> None:
+        self.write(self.encoder.encode_requests(blocks))
+    
+    def send_cancels(self: "PeerConnection", blocks: Sequence[Tuple[int, int, int]]) -> None:
+        self.write(self.encoder.encode_cancels(blocks))
+    
+    def send_haves(self: "PeerConnection", indices: Sequence[int]) -> None:
+        self.write(self.encoder.encode_haves(indices))
+    
+    def choke(self: "PeerConnection") -> None:
+        if not self.am_choking:
+            self.am_choking = True
+            self.send(Choke())
+    
+    def unchoke(self: "PeerConnection") -> None:
+        if self.am_choking:
+            self.am_choking = False
+            self.send(Unchoke())
+    
+    def interested(self: "PeerConnection") -> None:
+        if not self.am_interested:
+            self.am_interested = True
+            self.send(Interested())
+    
+    def not_interested(self: "PeerConnection") -> None:
+        if self.am_interested:
+            self.am_interested = False
+            self.send(NotInterested())
+    
+    def is_snubbing(self: "PeerConnection", now: float, timeout: float) -> bool:
+        # Interested in the peer, yet no block from it for a whole timeout
+        return self.am_interested and now - max(self.last_piece, self.connected_at) > timeout
+    
+    def keep_alive(self: "PeerConnection", now: float, interval: float, idle_timeout: float) -> bool:
+        if now - self.last_received > idle_timeout:
+            self.close(PeerError("Idle timeout"))
+            return False
+        if now - self.last_sent >= interval:
+            self.send(KeepAlive())
+        
+        return True
+    
+    def close(self: "PeerConnection", exc: Optional[Exception] = None) -> None:
+        if exc is not None:
+            logger.debug(f"Closing connection to {self.peer}: {exc}")
+            self._fail_handshake(exc)
+        if self.transport is not None:
+            self.transport.close()
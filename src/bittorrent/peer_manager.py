@@ -0,0 +1,323 @@
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Set, Tuple, Union
+from collections import deque
+import logging
+import asyncio
+
+from .disk_io import DiskWriter
+from .dns_cache import DNSCache
+from .enums import PeerSource
+from .exceptions import PeerError
+from .messages import BitField, Choke, Have, Piece, Unchoke
+from .peer import Peer
+from .peer_connection import PeerConnection
+from .peer_store import PeerRecord, PeerStore
+from .piece_picker import PiecePicker
+from .rate_limiter import RateLimiter, TokenBucket
+from .request_pipeline import RequestPipeline
+from .torrent import Torrent
+from .upload import Uploader
+
+logger = logging.getLogger(__name__)
+
+class PeerManager:
+    def __init__(
+        self: "PeerManager",
+        torrent: Torrent,
+        connect_semaphore: Optional[asyncio.Semaphore] = None,
+        max_connections: Optional[int] = 50,
+        connect_timeout: Optional[float] = 5,
+        handshake_timeout: Optional[float] = 10,
+        keep_alive_interval: Optional[float] = 120,
+        idle_timeout: Optional[float] = 180,
+        max_failures: Optional[int] = 3,
+        on_message: Optional[Callable[[PeerConnection, Any], None]] = None,
+        on_close: Optional[Callable[["PeerManager"], None]] = None,
+        resolver: Optional[DNSCache] = None,
+        peer_store: Optional[PeerStore] = None,
+        upload_limiter: Optional[RateLimiter] = None,
+        download_limiter: Optional[RateLimiter] = None,
+        upload_bucket: Optional[TokenBucket] = None,
+        download_bucket: Optional[TokenBucket] = None,
+        uploader: Optional[Uploader] = None,
+        disk: Optional[DiskWriter] = None,
+        picker: Optional[PiecePicker] = None,
+        request_check_interval: Optional[float] = 1
+        ) -> None:
+        self.torrent = torrent
+        # Shared across torrents by the session to cap half-open connections globally
+        self.connect_semaphore = connect_semaphore or asyncio.Semaphore(20)
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.handshake_timeout = handshake_timeout
+        self.keep_alive_interval = keep_alive_interval
+        self.idle_timeout = idle_timeout
+        self.max_failures = max_failures
+        self.on_message = on_message
+        self.on_close = on_close
+        self.resolver = resolver
+        self.upload_limiter = upload_limiter
+        self.download_limiter = download_limiter
+        self.upload_bucket = upload_bucket
+        self.download_bucket = download_bucket
+        self.uploader = uploader
+        self.disk = disk
+        if disk is not None:
+            disk.on_backpressure = self._on_disk_backpressure
+        # With a picker the manager drives downloading: interest, request pipelines and Have broadcasts
+        self.picker = picker
+        self.request_check_interval = request_check_interval
+        if disk is not None and picker is not None:
+            self._on_disk_piece: Optional[Callable[[int, bool], None]] = disk.on_piece
+            disk.on_piece = self._on_piece_written
+            if disk.has_piece is None:
+                disk.has_piece = picker.has_piece
+        
+        self.candidates: Deque[Peer] = deque()
+        # Every peer ever seen, with failure counts and scores; shared with the tracker manager
+        self.peers: PeerStore = peer_store if peer_store is not None else PeerStore()
+        self.banned: Set[Tuple[str, int]] = set()
+        self.connecting: Dict[Tuple[str, int], asyncio.Task] = {}
+        self.connections: Dict[Tuple[str, int], PeerConnection] = {}
+        self.pipelines: Dict[Tuple[str, int], RequestPipeline] = {}
+        # Switches the choker to seed-mode ranking once every piece is on disk
+        self.seeding: bool = False
+        self.closing: bool = False
+        
+        self._keep_alive_task: Optional[asyncio.Task] = None
+        self._request_task: Optional[asyncio.Task] = None
+    
+    def start(self: "PeerManager") -> None:
+        if self._keep_alive_task is None:
+            self._keep_alive_task = asyncio.create_task(self._keep_alive_loop())
+        if self.picker is not None and self._request_task is None:
+            self._request_task = asyncio.create_task(self._request_loop())
+    
+    async def close(self: "PeerManager") -> None:
+        # Cancelled connects and closed connections both refill from candidates; nothing may start now
+        self.closing = True
+        self.candidates.clear()
+        if self.on_close:
+            self.on_close(self)
+        if self._keep_alive_task is not None:
+            self._keep_alive_task.cancel()
+            self._keep_alive_task = None
+        if self._request_task is not None:
+            self._request_task.cancel()
+            self._request_task = None
+        
+        for task in list(self.connecting.values()):
+            task.cancel()
+        for connection in list(self.connections.values()):
+            connection.close()
+        
+        await asyncio.gather(*self.connecting.values(), return_exceptions=True)
+    
+    def add_peers(self: "PeerManager", peers: Iterable[Union[Peer, Tuple[str, int]]], source: Optional[PeerSource] = PeerSource.TRACKER) -> None:
+        for peer in peers:
+            if not isinstance(peer, Peer):
+                peer = Peer(*peer)
+            self.peers.add(peer, source)
+            
+            # None only when the store is full and could not take the peer
+            record: Optional[PeerRecord] = self.peers.get(peer)
+            if record is None or record.queued or (peer.ip, peer.port) in self.banned:
+                continue
+            
+            record.queued = True
+            self.candidates.append(peer)
+        
+        self._fill()
+    
+    def _fill(self: "PeerManager") -> None:
+        if self.closing:
+            return
+        
+        while self.candidates and len(self.connections) + len(self.connecting) < self.max_connections:
+            peer: Peer = self.candidates.popleft()
+            key: Tuple[str, int] = (peer.ip, peer.port)
+            if key in self.connections or key in self.connecting or key in self.banned:
+                continue
+            
+            self.connecting[key] = asyncio.create_task(self._connect(peer))
+    
+    async def _connect(self: "PeerManager", peer: Peer) -> Optional[PeerConnection]:
+        key: Tuple[str, int] = (peer.ip, peer.port)
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        connection: Optional[PeerConnection] = None
+        try:
+            # Peers from dictionary-model tracker responses may give a hostname instead of an address
+            host: str = (await self.resolver.resolve(peer.ip, peer.port))[0] if self.resolver is not None else peer.ip
+            async with self.connect_semaphore:
+                _, connection = await asyncio.wait_for(
+                    loop.create_connection(
+                        lambda: PeerConnection(
+                            peer,
+                            self.torrent.info_hash,
+                            self.torrent.peer_id,
+                            on_message=self._on_message,
+                            on_close=self._on_close,
+                            upload_limiter=self.upload_limiter,
+                            download_limiter=self.download_limiter,
+                            upload_bucket=self.upload_limiter.bucket(parent=self.upload_bucket) if self.upload_limiter else None,
+                            download_bucket=self.download_limiter.bucket(parent=self.download_bucket) if self.download_limiter else None
+                            ),
+                        host,
+                        peer.port
+                        ),
+                    timeout=self.connect_timeout
+                    )
+                await asyncio.wait_for(asyncio.shield(connection.handshake), timeout=self.handshake_timeout)
+            
+            if connection.transport is None:
+                raise ConnectionError("Connection closed after handshake")
+            
+            self.peers.record_success(key)
+            self.connections[key] = connection
+            if self.disk is not None and self.disk.congested:
+                connection.pause_for_disk(True)
+            return connection
+        except (OSError, asyncio.TimeoutError, PeerError) as exc:
+            logger.debug(f"Connection to {peer} failed: {exc!r}")
+            
+            # A failed handshake check means a bad peer, not a transient error
+            if isinstance(exc, PeerError):
+                self.banned.add(key)
+            elif self.peers.record_failure(key) >= self.max_failures:
+                self.banned.add(key)
+            elif (record := self.peers.get(key)) is not None:
+                # Queued again when a tracker or other source next reports it
+                record.queued = False
+            return None
+        finally:
+            # Also covers cancellation by close() mid-handshake, which none of the handlers above see
+            if connection is not None and self.connections.get(key) is not connection:
+                connection.close()
+            self.connecting.pop(key, None)
+            self._fill()
+    
+    def _on_message(self: "PeerManager", connection: PeerConnection, message: Any) -> None:
+        # Requests and cancels are served here so callers only see the download side
+        if self.uploader is not None:
+            self.uploader.handle(connection, message)
+        if self.disk is not None and type(message) is Piece:
+            self.disk.write(message.index, message.begin, message.block)
+        if self.picker is not None:
+            try:
+                self._handle_download(connection, message)
+            except PeerError as exc:
+                connection.close(exc)
+        if self.on_message:
+            self.on_message(connection, message)
+    
+    def _pipeline(self: "PeerManager", connection: PeerConnection) -> RequestPipeline:
+        # Created on first message, since the bitfield can arrive in the same read as the handshake
+        if (pipeline := self.pipelines.get(connection.key)) is None or pipeline.connection is not connection:
+            pipeline = self.pipelines[connection.key] = RequestPipeline(connection, self.picker)
+        return pipeline
+    
+    def _handle_download(self: "PeerManager", connection: PeerConnection, message: Any) -> None:
+        pipeline: RequestPipeline = self._pipeline(connection)
+        message_type: type = type(message)
+        if message_type is Piece:
+            for peer, cancel in pipeline.on_block(message.index, message.begin):
+                if (other := self.pipelines.get(peer)) is not None:
+                    other.on_cancel(cancel.index, cancel.begin)
+                    other.connection.send_cancels([(cancel.index, cancel.begin, cancel.length)])
+            pipeline.fill()
+        elif message_type is Unchoke:
+            pipeline.fill()
+        elif message_type is Choke:
+            pipeline.on_choke()
+            self._fill_requests()
+        elif message_type is BitField:
+            self.picker.peer_bitfield(connection.key, message)
+            self._update_interest(connection)
+            pipeline.fill()
+        elif message_type is Have:
+            self.picker.peer_have(connection.key, message)
+            if not connection.am_interested and message.index < self.picker.num_pieces and not self.picker.has_piece(message.index):
+                connection.interested()
+            pipeline.fill()
+    
+    def _update_interest(self: "PeerManager", connection: PeerConnection) -> None:
+        bits: Optional[bytearray] = self.picker.peers.get(connection.key)
+        if bits is None:
+            # Seeds are stored without a bitfield
+            wanted: bool = self.picker.num_have < self.picker.num_pieces
+        else:
+            wanted = any(theirs & ~ours for theirs, ours in zip(bits, self.picker.have))
+        
+        if wanted:
+            connection.interested()
+        else:
+            connection.not_interested()
+    
+    def _fill_requests(self: "PeerManager") -> None:
+        # Blocks freed by a choke, timeout or disconnect go to whichever peers have room
+        for pipeline in list(self.pipelines.values()):
+            try:
+                pipeline.fill()
+            except PeerError as exc:
+                pipeline.connection.close(exc)
+    
+    def _on_piece_written(self: "PeerManager", index: int, valid: bool) -> None:
+        if valid:
+            self.picker.piece_completed(index)
+            for connection in list(self.connections.values()):
+                try:
+                    connection.send_haves([index])
+                    if connection.am_interested:
+                        self._update_interest(connection)
+                except PeerError:
+                    pass
+            self.seeding = self.picker.num_have == self.picker.num_pieces
+        else:
+            logger.debug(f"Piece {index} failed hash check")
+            self.picker.piece_failed(index)
+        
+        self._fill_requests()
+        if self._on_disk_piece:
+            self._on_disk_piece(index, valid)
+    
+    async def _request_loop(self: "PeerManager") -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.request_check_interval)
+            
+            now: float = loop.time()
+            for pipeline in list(self.pipelines.values()):
+                pipeline.check_timeouts(now)
+            # Also lets pipelines whose depth grew since their last block top up
+            self._fill_requests()
+    
+    def _on_disk_backpressure(self: "PeerManager", congested: bool) -> None:
+        # Unread data then backs up into the kernel and TCP slows every peer down
+        for connection in self.connections.values():
+            connection.pause_for_disk(congested)
+    
+    def _on_close(self: "PeerManager", connection: PeerConnection) -> None:
+        if self.uploader is not None:
+            self.uploader.remove(connection)
+        if self.picker is not None and (pipeline := self.pipelines.get(connection.key)) is not None and pipeline.connection is connection:
+            del self.pipelines[connection.key]
+            pipeline.close()
+            self._fill_requests()
+        if self.connections.get(connection.key) is connection:
+            del self.connections[connection.key]
+            # Queued again when a tracker or other source next reports it
+            if connection.key not in self.banned and (record := self.peers.get(connection.key)) is not None:
+                record.queued = False
+            self._fill()
+    
+    async def _keep_alive_loop(self: "PeerManager") -> None:
+        # One sweep per manager instead of a timer per connection
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(min(self.keep_alive_interval, self.idle_timeout) / 4)
+            
+            now: float = loop.time()
+            for connection in list(self.connections.values()):
+                try:
+                    connection.keep_alive(now, self.keep_alive_interval, self.idle_timeout)
+                except PeerError:
+                    pass
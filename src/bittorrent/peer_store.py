@@ -0,0 +1,145 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import logging
+import asyncio
+import heapq
+import socket
+
+from .enums import PeerSource
+from .peer import Peer
+from .utils import compact_peer_keys
+
+logger = logging.getLogger(__name__)
+
+def pack_peer(ip: str, port: int) -> bytes:
+    # Same layout as the compact tracker formats, so compact responses can be keyed without decoding
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            return socket.inet_pton(family, ip) + port.to_bytes(2, "big")
+        except OSError:
+            continue
+    return ip.encode() + port.to_bytes(2, "big")
+
+class PeerRecord:
+    __slots__ = ("key", "host", "source", "last_seen", "failures", "score", "queued")
+    
+    def __init__(self: "PeerRecord", key: bytes, source: PeerSource, now: float, host: Optional[str] = None) -> None:
+        self.key = key
+        # Only set for peers given by hostname; addresses are decoded from the key on demand
+        self.host = host
+        self.source = source
+        self.last_seen = now
+        self.failures: int = 0
+        self.score: int = 0
+        # Set once the peer manager has taken the peer; cleared after a transient connect failure
+        self.queued: bool = False
+    
+    def __repr__(self: "PeerRecord") -> str:
+        return f"PeerRecord({self.ip!r}, {self.port}, source={self.source!r}, failures={self.failures}, score={self.score})"
+    
+    @property
+    def ip(self: "PeerRecord") -> str:
+        if self.host is not None:
+            return self.host
+        return socket.inet_ntop(socket.AF_INET if len(self.key) == 6 else socket.AF_INET6, self.key[:-2])
+    
+    @property
+    def port(self: "PeerRecord") -> int:
+        return int.from_bytes(self.key[-2:], "big")
+    
+    @property
+    def addr(self: "PeerRecord") -> Tuple[str, int]:
+        return (self.ip, self.port)
+
+class PeerStore:
+    def __init__(self: "PeerStore", max_peers: Optional[int] = 50000, expiry: Optional[float] = 3600) -> None:
+        self.max_peers = max_peers
+        self.expiry = expiry
+        
+        # packed (ip, port) -> record, deduplicating every peer source in O(1)
+        self.peers: Dict[bytes, PeerRecord] = {}
+        self._next_expire: float = 0.0
+    
+    def __len__(self: "PeerStore") -> int:
+        return len(self.peers)
+    
+    def __iter__(self: "PeerStore") -> Iterator[PeerRecord]:
+        return iter(list(self.peers.values()))
+    
+    def __contains__(self: "PeerStore", peer: Union[Peer, Tuple[str, int]]) -> bool:
+        return self._key(peer) in self.peers
+    
+    @staticmethod
+    def _key(peer: Union[Peer, Tuple[str, int]]) -> bytes:
+        ip, port = (peer.ip, peer.port) if isinstance(peer, Peer) else peer
+        return pack_peer(ip, port)
+    
+    def _insert(self: "PeerStore", key: bytes, source: PeerSource, now: float, host: Optional[str] = None) -> Optional[PeerRecord]:
+        if (record := self.peers.get(key)) is not None:
+            record.source |= source
+            record.last_seen = now
+            return None
+        
+        if len(self.peers) >= self.max_peers:
+            # A full store sweeps at most once per tenth of the expiry, not on every rejected insert
+            if now < self._next_expire or not self.expire(now):
+                return None
+        
+        record = self.peers[key] = PeerRecord(key, source, now, host)
+        return record
+    
+    def add(self: "PeerStore", peer: Union[Peer, Tuple[str, int]], source: Optional[PeerSource] = PeerSource.TRACKER) -> Optional[PeerRecord]:
+        ip, port = (peer.ip, peer.port) if isinstance(peer, Peer) else peer
+        key: bytes = pack_peer(ip, port)
+        host: Optional[str] = ip if len(key) not in (6, 18) else None
+        return self._insert(key, source, asyncio.get_event_loop().time(), host)
+    
+    def add_many(self: "PeerStore", peers: Iterable[Union[Peer, Tuple[str, int]]], source: Optional[PeerSource] = PeerSource.TRACKER) -> List[PeerRecord]:
+        return [record for peer in peers if (record := self.add(peer, source)) is not None]
+    
+    def add_compact(self: "PeerStore", data: bytes, source: Optional[PeerSource] = PeerSource.TRACKER, ipv6: Optional[bool] = False) -> List[PeerRecord]:
+        now: float = asyncio.get_event_loop().time()
+        return [record for key in compact_peer_keys(data, ipv6) if (record := self._insert(key, source, now)) is not None]
+    
+    def to_compact(self: "PeerStore", records: Optional[Iterable[PeerRecord]] = None) -> Tuple[bytes, bytes]:
+        # Keys already are compact entries, so serving PEX or a tracker response is a join per family
+        records = self.peers.values() if records is None else records
+        peers: List[bytes] = []
+        peers6: List[bytes] = []
+        for record in records:
+            if record.host is None:
+                (peers if len(record.key) == 6 else peers6).append(record.key)
+        return (b"".join(peers), b"".join(peers6))
+    
+    def get(self: "PeerStore", peer: Union[Peer, Tuple[str, int]]) -> Optional[PeerRecord]:
+        return self.peers.get(self._key(peer))
+    
+    def remove(self: "PeerStore", peer: Union[Peer, Tuple[str, int]]) -> None:
+        self.peers.pop(self._key(peer), None)
+    
+    def record_success(self: "PeerStore", peer: Union[Peer, Tuple[str, int]]) -> None:
+        if (record := self.get(peer)) is not None:
+            record.failures = 0
+            record.score += 1
+            record.last_seen = asyncio.get_event_loop().time()
+    
+    def record_failure(self: "PeerStore", peer: Union[Peer, Tuple[str, int]]) -> int:
+        if (record := self.get(peer)) is None:
+            return 0
+        
+        record.failures += 1
+        record.score -= 1
+        return record.failures
+    
+    def expire(self: "PeerStore", now: Optional[float] = None) -> int:
+        cutoff: float = (now if now is not None else asyncio.get_event_loop().time()) - self.expiry
+        self._next_expire = cutoff + self.expiry * 1.1
+        stale: List[bytes] = [key for key, record in self.peers.items() if record.last_seen < cutoff]
+        for key in stale:
+            del self.peers[key]
+        
+        if stale:
+            logger.debug(f"Expired {len(stale)} stale peers")
+        return len(stale)
+    
+    def candidates(self: "PeerStore", count: int) -> List[PeerRecord]:
+        return heapq.nlargest(count, self.peers.values(), key=lambda record: (record.score, -record.failures, record.last_seen))
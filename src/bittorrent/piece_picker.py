@@ -0,0 +1,364 @@
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+from array import array
+from itertools import chain
+import random
+
+from .messages import BitField, Have, Cancel
+
+BLOCK_SIZE: int = 1 << 14
+
+BLOCK_FREE: int = 0
+BLOCK_REQUESTED: int = 1
+BLOCK_RECEIVED: int = 2
+
+BlockSpec = Tuple[int, int, int]
+
+# _position of pieces that are not in the pick order (owned or being downloaded)
+ABSENT: int = 0xFFFFFFFF
+
+SET_BITS: List[Tuple[int, ...]] = [tuple(bit for bit in range(8) if byte & (0x80 >> bit)) for byte in range(256)]
+
+class DownloadingPiece:
+    __slots__ = ("index", "size", "states", "requesters", "free", "received")
+    
+    def __init__(self: "DownloadingPiece", index: int, size: int, block_size: int) -> None:
+        self.index = index
+        self.size = size
+        self.states: bytearray = bytearray(-(-size // block_size))
+        self.requesters: Dict[int, List[Hashable]] = {}
+        self.free: int = len(self.states)
+        self.received: int = 0
+    
+    @property
+    def finished(self: "DownloadingPiece") -> bool:
+        return self.received == len(self.states)
+
+class PiecePicker:
+    def __init__(
+        self: "PiecePicker",
+        num_pieces: int,
+        piece_length: int,
+        total_length: int,
+        block_size: Optional[int] = BLOCK_SIZE
+        ) -> None:
+        self.num_pieces = num_pieces
+        self.piece_length = piece_length
+        self.total_length = total_length
+        self.block_size = block_size
+        
+        self.have: bytearray = bytearray(-(-num_pieces // 8))
+        self.num_have: int = 0
+        
+        # Pickable pieces sorted by availability: bucket k spans order[bucket_start[k]:bucket_start[k+1]].
+        # Have/BitField updates move a piece to the edge of its bucket in O(1); pieces leave the
+        # order when they start downloading or complete, in O(buckets), so picks never scan them.
+        self.availability: array = array("I", bytes(4 * num_pieces))
+        self._order: array = array("I")
+        self._position: array = array("I", bytes(4 * num_pieces))
+        self._bucket_start: List[int] = []
+        
+        # Seeds have every piece, so they are counted once instead of per piece
+        self.seeds: int = 0
+        self.peers: Dict[Hashable, Optional[bytearray]] = {}
+        self.downloading: Dict[int, DownloadingPiece] = {}
+        self._peer_requests: Dict[Hashable, Set[Tuple[int, int]]] = {}
+        self._free_blocks: int = 0
+        self._build()
+    
+    def piece_size(self: "PiecePicker", index: int) -> int:
+        if index == self.num_pieces - 1:
+            return self.total_length - self.piece_length * index
+        return self.piece_length
+    
+    def has_piece(self: "PiecePicker", index: int) -> bool:
+        return bool(self.have[index >> 3] & (0x80 >> (index & 7)))
+    
+    @property
+    def endgame(self: "PiecePicker") -> bool:
+        return self._free_blocks == 0 and self.num_have + len(self.downloading) == self.num_pieces
+    
+    def _build(self: "PiecePicker") -> None:
+        # Shuffle so ties within a bucket start out in random order
+        order: List[int] = list(range(self.num_pieces))
+        random.shuffle(order)
+        self._order = array("I", order)
+        for offset, index in enumerate(order):
+            self._position[index] = offset
+        self._bucket_start = [0, self.num_pieces]
+    
+    def _increment(self: "PiecePicker", index: int) -> None:
+        availability: int = self.availability[index]
+        self.availability[index] = availability + 1
+        if self._position[index] == ABSENT:
+            return
+        
+        if availability + 2 == len(self._bucket_start):
+            self._bucket_start.append(len(self._order))
+        
+        last: int = self._bucket_start[availability+1] - 1
+        self._swap(self._position[index], last)
+        self._bucket_start[availability+1] = last
+    
+    def _decrement(self: "PiecePicker", index: int) -> None:
+        availability: int = self.availability[index]
+        self.availability[index] = availability - 1
+        if self._position[index] == ABSENT:
+            return
+        
+        first: int = self._bucket_start[availability]
+        self._swap(self._position[index], first)
+        self._bucket_start[availability] = first + 1
+    
+    def _swap(self: "PiecePicker", a: int, b: int) -> None:
+        order: array = self._order
+        index_a, index_b = order[a], order[b]
+        order[a], order[b] = index_b, index_a
+        self._position[index_a], self._position[index_b] = b, a
+    
+    def _remove(self: "PiecePicker", index: int) -> None:
+        if (position := self._position[index]) == ABSENT:
+            return
+        
+        # Walk the piece to the end of the array one bucket at a time, shrinking each bucket it leaves
+        starts: List[int] = self._bucket_start
+        for bucket in range(self.availability[index], len(starts) - 1):
+            last: int = starts[bucket+1] - 1
+            self._swap(position, last)
+            position = last
+            starts[bucket+1] = last
+        
+        self._order.pop()
+        self._position[index] = ABSENT
+    
+    def _insert(self: "PiecePicker", index: int) -> None:
+        if self._position[index] != ABSENT:
+            return
+        
+        starts: List[int] = self._bucket_start
+        availability: int = self.availability[index]
+        while len(starts) < availability + 2:
+            starts.append(len(self._order))
+        
+        # Enter at the end of the top bucket, then sink to the piece's own bucket
+        position: int = len(self._order)
+        self._order.append(index)
+        self._position[index] = position
+        starts[-1] = len(self._order)
+        for bucket in range(len(starts) - 2, availability, -1):
+            first: int = starts[bucket]
+            self._swap(position, first)
+            position = first
+            starts[bucket] = first + 1
+    
+    def _update_availability(self: "PiecePicker", bits: bytearray, delta: int) -> None:
+        update = self._increment if delta > 0 else self._decrement
+        for byte_index, byte in enumerate(bits):
+            if byte:
+                base: int = byte_index << 3
+                for bit in SET_BITS[byte]:
+                    update(base + bit)
+    
+    def _is_seed_bitfield(self: "PiecePicker", bits: bytes) -> bool:
+        full, rest = divmod(self.num_pieces, 8)
+        if bits[:full].count(0xff) != full:
+            return False
+        
+        mask: int = (0xff << (8 - rest)) & 0xff
+        return not rest or bits[full] & mask == mask
+    
+    def add_peer(self: "PiecePicker", peer: Hashable) -> None:
+        if peer not in self.peers:
+            self.peers[peer] = bytearray(len(self.have))
+            self._peer_requests[peer] = set()
+    
+    def peer_bitfield(self: "PiecePicker", peer: Hashable, message: BitField) -> None:
+        self.remove_peer(peer)
+        self._peer_requests[peer] = set()
+        
+        if len(message.bitfield) >= len(self.have) and self._is_seed_bitfield(message.bitfield):
+            self.peers[peer] = None
+            self.seeds += 1
+            return
+        
+        bits: bytearray = bytearray(message.bitfield[:len(self.have)].ljust(len(self.have), b"\x00"))
+        if (rest := self.num_pieces % 8):
+            # Spare bits past the last piece must not count as availability
+            bits[-1] &= (0xff << (8 - rest)) & 0xff
+        
+        self.peers[peer] = bits
+        self._update_availability(bits, 1)
+    
+    def peer_have(self: "PiecePicker", peer: Hashable, message: Have) -> None:
+        self.add_peer(peer)
+        bits: Optional[bytearray] = self.peers[peer]
+        index: int = message.index
+        if bits is None or index >= self.num_pieces or bits[index >> 3] & (0x80 >> (index & 7)):
+            return
+        
+        bits[index >> 3] |= 0x80 >> (index & 7)
+        self._increment(index)
+    
+    def remove_peer(self: "PiecePicker", peer: Hashable) -> None:
+        if peer not in self.peers:
+            return
+        
+        for index, block in list(self._peer_requests.pop(peer, ())):
+            self.abort_request(peer, index, block * self.block_size)
+        
+        bits: Optional[bytearray] = self.peers.pop(peer)
+        if bits is None:
+            self.seeds -= 1
+            return
+        
+        self._update_availability(bits, -1)
+    
+    def _take_blocks(self: "PiecePicker", peer: Hashable, piece: DownloadingPiece, count: int, blocks: List[BlockSpec]) -> None:
+        states: bytearray = piece.states
+        requests: Set[Tuple[int, int]] = self._peer_requests[peer]
+        block: int = states.find(BLOCK_FREE)
+        while block != -1 and len(blocks) < count:
+            begin: int = block * self.block_size
+            states[block] = BLOCK_REQUESTED
+            piece.requesters[block] = [peer]
+            piece.free -= 1
+            self._free_blocks -= 1
+            requests.add((piece.index, block))
+            blocks.append((piece.index, begin, min(self.block_size, piece.size - begin)))
+            block = states.find(BLOCK_FREE, block + 1)
+    
+    def _start_piece(self: "PiecePicker", index: int) -> DownloadingPiece:
+        piece: DownloadingPiece = DownloadingPiece(index, self.piece_size(index), self.block_size)
+        self.downloading[index] = piece
+        self._free_blocks += piece.free
+        self._remove(index)
+        return piece
+    
+    def pick_blocks(self: "PiecePicker", peer: Hashable, count: int) -> List[BlockSpec]:
+        self.add_peer(peer)
+        bits: Optional[bytearray] = self.peers[peer]
+        blocks: List[BlockSpec] = []
+        
+        # Finish partially downloaded pieces first, least remaining work first
+        partial: List[DownloadingPiece] = sorted(
+            (piece for piece in self.downloading.values() if piece.free and (bits is None or bits[piece.index >> 3] & (0x80 >> (piece.index & 7)))),
+            key=lambda piece: piece.free
+            )
+        for piece in partial:
+            self._take_blocks(peer, piece, count, blocks)
+            if len(blocks) >= count:
+                return blocks
+        
+        for index in self._rarest(bits, count - len(blocks)):
+            self._take_blocks(peer, self._start_piece(index), count, blocks)
+        if len(blocks) >= count:
+            return blocks
+        
+        if not blocks and self.endgame:
+            self._pick_endgame_blocks(peer, bits, count, blocks)
+        
+        return blocks
+    
+    def _rarest(self: "PiecePicker", bits: Optional[bytearray], wanted: int) -> List[int]:
+        # Chosen before any is started, since starting a piece reorders the array being scanned
+        order: array = self._order
+        starts: List[int] = self._bucket_start
+        chosen: List[int] = []
+        # Pieces nobody but seeds has stay in bucket 0, which only a seed can serve
+        for availability in range(0 if bits is None else 1, len(starts) - 1):
+            start, end = starts[availability], starts[availability+1]
+            if start == end:
+                continue
+            
+            pivot: int = random.randrange(start, end)
+            for position in chain(range(pivot, end), range(start, pivot)):
+                index: int = order[position]
+                if bits is not None and not bits[index >> 3] & (0x80 >> (index & 7)):
+                    continue
+                
+                chosen.append(index)
+                wanted -= -(-self.piece_size(index) // self.block_size)
+                if wanted <= 0:
+                    return chosen
+        return chosen
+    
+    def _pick_endgame_blocks(self: "PiecePicker", peer: Hashable, bits: Optional[bytearray], count: int, blocks: List[BlockSpec]) -> None:
+        requests: Set[Tuple[int, int]] = self._peer_requests[peer]
+        for piece in self.downloading.values():
+            if bits is not None and not bits[piece.index >> 3] & (0x80 >> (piece.index & 7)):
+                continue
+            
+            for block, requesters in piece.requesters.items():
+                if piece.states[block] != BLOCK_REQUESTED or peer in requesters:
+                    continue
+                
+                begin: int = block * self.block_size
+                requesters.append(peer)
+                requests.add((piece.index, block))
+                blocks.append((piece.index, begin, min(self.block_size, piece.size - begin)))
+                if len(blocks) >= count:
+                    return
+    
+    def abort_request(self: "PiecePicker", peer: Hashable, index: int, begin: int) -> None:
+        block: int = begin // self.block_size
+        if (requests := self._peer_requests.get(peer)) is not None:
+            requests.discard((index, block))
+        
+        piece: Optional[DownloadingPiece] = self.downloading.get(index)
+        if piece is None or peer not in (requesters := piece.requesters.get(block, ())):
+            return
+        
+        requesters.remove(peer)
+        if not requesters:
+            del piece.requesters[block]
+            if piece.states[block] == BLOCK_REQUESTED:
+                piece.states[block] = BLOCK_FREE
+                piece.free += 1
+                self._free_blocks += 1
+    
+    def block_received(self: "PiecePicker", peer: Hashable, index: int, begin: int) -> List[Tuple[Hashable, Cancel]]:
+        block: int = begin // self.block_size
+        if (requests := self._peer_requests.get(peer)) is not None:
+            requests.discard((index, block))
+        
+        piece: Optional[DownloadingPiece] = self.downloading.get(index)
+        if piece is None or block >= len(piece.states) or piece.states[block] == BLOCK_RECEIVED:
+            return []
+        
+        if piece.states[block] == BLOCK_FREE:
+            piece.free -= 1
+            self._free_blocks -= 1
+        piece.states[block] = BLOCK_RECEIVED
+        piece.received += 1
+        
+        # In endgame the same block may be outstanding at several peers
+        cancels: List[Tuple[Hashable, Cancel]] = []
+        length: int = min(self.block_size, piece.size - begin)
+        for requester in piece.requesters.pop(block, ()):
+            if requester != peer:
+                self._peer_requests.get(requester, set()).discard((index, block))
+                cancels.append((requester, Cancel(index, begin, length)))
+        
+        return cancels
+    
+    def is_piece_downloaded(self: "PiecePicker", index: int) -> bool:
+        piece: Optional[DownloadingPiece] = self.downloading.get(index)
+        return piece is not None and piece.finished
+    
+    def piece_completed(self: "PiecePicker", index: int) -> None:
+        if (piece := self.downloading.pop(index, None)) is not None:
+            self._free_blocks -= piece.free
+        if not self.has_piece(index):
+            self.have[index >> 3] |= 0x80 >> (index & 7)
+            self.num_have += 1
+            self._remove(index)
+    
+    def piece_failed(self: "PiecePicker", index: int) -> None:
+        if (piece := self.downloading.pop(index, None)) is None:
+            return
+        
+        self._free_blocks -= piece.free
+        for block, requesters in piece.requesters.items():
+            for peer in requesters:
+                self._peer_requests.get(peer, set()).discard((index, block))
+        # Downloaded again from scratch, at its current rarity
+        self._insert(index)
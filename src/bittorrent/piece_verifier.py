@@ -0,0 +1,122 @@
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import asyncio
+import hashlib
+import os
+
+from .storage import Storage
+
+logger = logging.getLogger(__name__)
+
+Buffers = Sequence[Union[bytes, memoryview]]
+
+def sha1_digest(buffers: Buffers) -> bytes:
+    # hashlib releases the GIL while hashing large buffers, so threads scale with cores
+    digest = hashlib.sha1()
+    for buffer in buffers:
+        digest.update(buffer)
+    return digest.digest()
+
+@dataclass
+class RecheckProgress:
+    total: int
+    checked: int = 0
+    valid: int = 0
+    have: bytearray = field(default_factory=bytearray)
+    
+    @property
+    def done(self: "RecheckProgress") -> bool:
+        return self.checked == self.total
+    
+    @property
+    def fraction(self: "RecheckProgress") -> float:
+        return self.checked / self.total if self.total else 1.0
+
+class PieceVerifier:
+    def __init__(self: "PieceVerifier", max_workers: Optional[int] = None, max_pending: Optional[int] = None) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 4
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="piece-verifier")
+        
+        self.queue: Optional[asyncio.Queue[Tuple[bytes, Buffers, asyncio.Future]]] = None
+        self._workers: List[asyncio.Task] = []
+    
+    def _start(self: "PieceVerifier") -> None:
+        if not self._workers:
+            self.queue = asyncio.Queue(self.max_pending)
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+    
+    async def _worker(self: "PieceVerifier") -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        while True:
+            expected, buffers, future = await self.queue.get()
+            try:
+                if not future.done():
+                    digest: bytes = await loop.run_in_executor(self.executor, sha1_digest, buffers)
+                    if not future.done():
+                        future.set_result(digest == expected)
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            finally:
+                self.queue.task_done()
+    
+    async def submit(self: "PieceVerifier", expected: bytes, buffers: Buffers) -> asyncio.Future:
+        # Waits while the queue is full, which throttles both live downloads and rechecks
+        self._start()
+        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        await self.queue.put((expected, buffers, future))
+        return future
+    
+    async def verify(self: "PieceVerifier", expected: bytes, buffers: Buffers) -> bool:
+        return await (await self.submit(expected, buffers))
+    
+    async def recheck(
+        self: "PieceVerifier",
+        storage: Storage,
+        progress: Optional[RecheckProgress] = None,
+        on_progress: Optional[Callable[[RecheckProgress], None]] = None
+        ) -> RecheckProgress:
+        torrent = storage.torrent
+        if progress is None:
+            progress = RecheckProgress(torrent.num_pieces)
+        progress.have = bytearray(-(-torrent.num_pieces // 8))
+        
+        def on_done(index: int, future: asyncio.Future) -> None:
+            progress.checked += 1
+            if not future.cancelled() and future.exception() is None and future.result():
+                progress.valid += 1
+                progress.have[index >> 3] |= 0x80 >> (index & 7)
+            if on_progress:
+                on_progress(progress)
+        
+        futures: List[asyncio.Future] = []
+        for index in range(torrent.num_pieces):
+            begin: int = index * torrent.piece_length
+            length: int = min(torrent.piece_length, torrent.total_length - begin)
+            try:
+                views: List[memoryview] = storage.read_views(index, 0, length)
+            except (OSError, ValueError) as exc:
+                # Missing files cannot be opened and truncated ones cannot be mapped: the piece is simply not there
+                logger.debug(f"Piece {index} unreadable during recheck: {exc}")
+                progress.checked += 1
+                if on_progress:
+                    on_progress(progress)
+                continue
+            
+            future: asyncio.Future = await self.submit(torrent.pieces[index*20:index*20+20], views)
+            future.add_done_callback(lambda future, index=index: on_done(index, future))
+            futures.append(future)
+        
+        await asyncio.gather(*futures, return_exceptions=True)
+        return progress
+    
+    async def close(self: "PieceVerifier") -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        
+        self._workers = []
+        self.executor.shutdown(wait=False)
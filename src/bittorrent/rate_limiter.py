@@ -0,0 +1,163 @@
+from typing import Deque, List, Optional
+from collections import deque
+import logging
+import asyncio
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "last", "parent")
+    
+    def __init__(self: "TokenBucket", rate: float, burst: Optional[float], parent: Optional["TokenBucket"], now: float) -> None:
+        # A rate of 0 means unlimited; the bucket then only passes requests through to its parent
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.tokens: float = self.burst
+        self.last = now
+        self.parent = parent
+    
+    def refill(self: "TokenBucket", now: float) -> None:
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + self.rate * (now - self.last))
+        self.last = now
+    
+    def chain(self: "TokenBucket") -> List["TokenBucket"]:
+        buckets: List[TokenBucket] = []
+        bucket: Optional[TokenBucket] = self
+        while bucket is not None:
+            buckets.append(bucket)
+            bucket = bucket.parent
+        return buckets
+
+class _Waiter:
+    __slots__ = ("bucket", "amount", "minimum", "granted", "future")
+    
+    def __init__(self: "_Waiter", bucket: TokenBucket, amount: int, minimum: int, future: asyncio.Future) -> None:
+        self.bucket = bucket
+        self.amount = amount
+        self.minimum = minimum
+        self.granted: int = 0
+        self.future = future
+
+class RateLimiter:
+    def __init__(
+        self: "RateLimiter",
+        rate: Optional[float] = 0,
+        tick: Optional[float] = 0.05,
+        quantum: Optional[int] = 1 << 16,
+        mss: Optional[int] = 1460,
+        packet_overhead: Optional[int] = 40
+        ) -> None:
+        self.tick = tick
+        # Largest share one waiter gets per round, so a single fast peer cannot drain the bucket
+        self.quantum = quantum
+        self.mss = mss
+        self.packet_overhead = packet_overhead
+        
+        # Set by acquire once a caller has to wait, so a limiter can be built before the loop runs
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.root: TokenBucket = TokenBucket(rate, None, None, time.monotonic())
+        self.waiters: Deque[_Waiter] = deque()
+        self._handle: Optional[asyncio.TimerHandle] = None
+    
+    def bucket(self: "RateLimiter", rate: Optional[float] = 0, burst: Optional[float] = None, parent: Optional[TokenBucket] = None) -> TokenBucket:
+        # global -> torrent -> peer: torrents hang off the root, peers off their torrent
+        return TokenBucket(rate, burst, parent or self.root, time.monotonic())
+    
+    def set_rate(self: "RateLimiter", bucket: TokenBucket, rate: float, burst: Optional[float] = None) -> None:
+        bucket.refill(time.monotonic())
+        bucket.rate = rate
+        bucket.burst = burst if burst is not None else rate
+        bucket.tokens = min(bucket.tokens, bucket.burst) if rate else bucket.burst
+        self._schedule()
+    
+    def wire_size(self: "RateLimiter", payload: int) -> int:
+        # TCP/IP headers are charged too, so a cap holds on the wire rather than only for payload
+        return payload + math.ceil(payload / self.mss) * self.packet_overhead
+    
+    def available(self: "RateLimiter", bucket: TokenBucket) -> float:
+        now: float = time.monotonic()
+        available: float = math.inf
+        for link in bucket.chain():
+            link.refill(now)
+            if link.rate:
+                available = min(available, link.tokens)
+        return available
+    
+    def consume(self: "RateLimiter", bucket: TokenBucket, amount: int) -> None:
+        # Charged unconditionally, e.g. for traffic already sent; buckets may go into debt
+        now: float = time.monotonic()
+        for link in bucket.chain():
+            link.refill(now)
+            if link.rate:
+                link.tokens -= amount
+    
+    def try_acquire(self: "RateLimiter", bucket: TokenBucket, amount: int) -> int:
+        if self.waiters:
+            # Queued waiters are served first, otherwise a busy caller could starve them
+            return 0
+        
+        granted: int = int(max(0, min(amount, self.available(bucket))))
+        if granted:
+            self.consume(bucket, granted)
+        return granted
+    
+    async def acquire(self: "RateLimiter", bucket: TokenBucket, amount: int, minimum: Optional[int] = None) -> int:
+        # Returns between minimum and amount bytes of quota, so callers send a batch of blocks per wake-up
+        minimum = min(amount, minimum if minimum is not None else amount)
+        if (granted := self.try_acquire(bucket, amount)) >= minimum:
+            return granted
+        
+        self.loop = asyncio.get_running_loop()
+        waiter: _Waiter = _Waiter(bucket, amount, minimum, self.loop.create_future())
+        waiter.granted = granted
+        self.waiters.append(waiter)
+        self._schedule()
+        try:
+            return await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+            # Quota already handed to a cancelled waiter is returned to its buckets
+            if waiter.granted:
+                self.consume(bucket, -waiter.granted)
+            raise
+    
+    def _schedule(self: "RateLimiter") -> None:
+        if self._handle is None and self.waiters:
+            self._handle = self.loop.call_later(self.tick, self._on_tick)
+    
+    def _on_tick(self: "RateLimiter") -> None:
+        self._handle = None
+        
+        # Round robin in quantum-sized shares until nothing more can be handed out this tick
+        progress: bool = True
+        while self.waiters and progress:
+            progress = False
+            for _ in range(len(self.waiters)):
+                waiter: _Waiter = self.waiters.popleft()
+                share: int = int(max(0, min(waiter.amount - waiter.granted, self.quantum, self.available(waiter.bucket))))
+                if share:
+                    self.consume(waiter.bucket, share)
+                    waiter.granted += share
+                    progress = True
+                
+                if waiter.granted >= waiter.minimum:
+                    if not waiter.future.done():
+                        waiter.future.set_result(waiter.granted)
+                else:
+                    self.waiters.append(waiter)
+        
+        self._schedule()
+    
+    def close(self: "RateLimiter") -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        
+        while self.waiters:
+            waiter: _Waiter = self.waiters.popleft()
+            if not waiter.future.done():
+                waiter.future.cancel()
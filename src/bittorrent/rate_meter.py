@@ -0,0 +1,31 @@
+from typing import Optional
+from array import array
+
+class RateMeter:
+    __slots__ = ("window", "buckets", "second", "total")
+    
+    def __init__(self: "RateMeter", window: Optional[int] = 20) -> None:
+        # One counter per second in a ring; adding is O(1) and no timer ever runs
+        self.window = window
+        self.buckets: array = array("Q", [0]) * window
+        self.second: int = 0
+        self.total: int = 0
+    
+    def _advance(self: "RateMeter", now: float) -> None:
+        second: int = int(now)
+        if second - self.second >= self.window:
+            for i in range(self.window):
+                self.buckets[i] = 0
+        else:
+            for elapsed in range(self.second + 1, second + 1):
+                self.buckets[elapsed % self.window] = 0
+        self.second = max(self.second, second)
+    
+    def add(self: "RateMeter", nbytes: int, now: float) -> None:
+        self._advance(now)
+        self.buckets[self.second % self.window] += nbytes
+        self.total += nbytes
+    
+    def rate(self: "RateMeter", now: float) -> float:
+        self._advance(now)
+        return sum(self.buckets) / self.window
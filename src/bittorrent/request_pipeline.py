@@ -0,0 +1,188 @@
+from typing import Hashable, List, Optional, Tuple
+from collections import OrderedDict
+import logging
+import math
+
+from .exceptions import PeerError
+from .messages import Cancel
+from .peer_connection import PeerConnection
+from .piece_picker import BLOCK_SIZE, BlockSpec, PiecePicker
+
+logger = logging.getLogger(__name__)
+
+class RequestPipeline:
+    def __init__(
+        self: "RequestPipeline",
+        connection: PeerConnection,
+        picker: PiecePicker,
+        block_size: Optional[int] = BLOCK_SIZE,
+        min_depth: Optional[int] = 2,
+        max_depth: Optional[int] = 1024,
+        gain: Optional[float] = 1.5,
+        min_timeout: Optional[float] = 4,
+        max_timeout: Optional[float] = 60,
+        min_rtt_window: Optional[float] = 10
+        ) -> None:
+        self.connection = connection
+        self.picker = picker
+        self.block_size = block_size
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        # Headroom over the bandwidth-delay product, so a growing link is always probed
+        self.gain = gain
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_rtt_window = min_rtt_window
+        
+        self.key: Hashable = connection.key
+        # (index, begin) -> (length, sent at); peers answer in order, so the oldest is first
+        self.outstanding: "OrderedDict[Tuple[int, int], Tuple[int, float]]" = OrderedDict()
+        self.depth: float = min_depth
+        self.slow_start: bool = True
+        self._last_answered: float = 0
+        
+        # RFC 6298 estimator over request-to-block latency
+        self.srtt: Optional[float] = None
+        self.rttvar: float = 0
+        # The smallest recent sample approximates the link RTT without the peer's queueing delay
+        self.min_rtt: float = math.inf
+        self._min_rtt_candidate: float = math.inf
+        self._min_rtt_reset: float = connection.loop.time()
+        
+        # Throughput is measured once per round trip
+        self.rate: float = 0
+        self._last_sample: float = 0
+        self._round_start: float = self._min_rtt_reset
+        self._round_bytes: int = 0
+    
+    @property
+    def timeout(self: "RequestPipeline") -> float:
+        if self.srtt is None:
+            return self.max_timeout / 3
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+    
+    @property
+    def bdp(self: "RequestPipeline") -> float:
+        # Bandwidth-delay product in blocks
+        if self.min_rtt == math.inf:
+            return 0
+        return self.rate * self.min_rtt / self.block_size
+    
+    def fill(self: "RequestPipeline") -> int:
+        connection: PeerConnection = self.connection
+        if connection.peer_choking or not connection.am_interested or connection.transport is None:
+            return 0
+        
+        wanted: int = int(self.depth) - len(self.outstanding)
+        if wanted <= 0:
+            return 0
+        
+        blocks: List[BlockSpec] = self.picker.pick_blocks(self.key, wanted)
+        if not blocks:
+            return 0
+        
+        now: float = connection.loop.time()
+        for index, begin, length in blocks:
+            self.outstanding[(index, begin)] = (length, now)
+        connection.send_requests(blocks)
+        return len(blocks)
+    
+    def _sample_rtt(self: "RequestPipeline", rtt: float, now: float) -> None:
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        
+        self.min_rtt = min(self.min_rtt, rtt)
+        self._min_rtt_candidate = min(self._min_rtt_candidate, rtt)
+        if now - self._min_rtt_reset > self.min_rtt_window:
+            # Forget old minimums so a route change is picked up
+            self.min_rtt = self._min_rtt_candidate
+            self._min_rtt_candidate = math.inf
+            self._min_rtt_reset = now
+    
+    def _end_round(self: "RequestPipeline", now: float) -> None:
+        elapsed: float = now - self._round_start
+        if elapsed < max(self.srtt or 0, 0.05):
+            return
+        
+        sample: float = self._round_bytes / elapsed
+        previous, self._last_sample = self._last_sample, sample
+        self.rate = sample if not self.rate else 0.75 * self.rate + 0.25 * sample
+        self._round_start = now
+        self._round_bytes = 0
+        
+        if self.slow_start:
+            # Leave slow start once a round no longer grows throughput by a quarter
+            if previous and sample < previous * 1.25:
+                self.slow_start = False
+        if not self.slow_start:
+            self.depth = min(self.max_depth, max(self.min_depth, self.gain * self.bdp))
+    
+    def on_block(self: "RequestPipeline", index: int, begin: int) -> List[Tuple[Hashable, Cancel]]:
+        now: float = self.connection.loop.time()
+        if (request := self.outstanding.pop((index, begin), None)) is not None:
+            length, sent = request
+            self._last_answered = max(self._last_answered, sent)
+            self._sample_rtt(now - sent, now)
+            self._round_bytes += length
+            if self.slow_start:
+                # One more request per block received doubles the depth every round trip
+                self.depth = min(self.max_depth, self.depth + 1)
+            self._end_round(now)
+        
+        cancels: List[Tuple[Hashable, Cancel]] = self.picker.block_received(self.key, index, begin)
+        if self.outstanding:
+            # Skipped requests would otherwise hold pipeline slots until the next periodic check
+            self.check_timeouts(now)
+        return cancels
+    
+    def on_choke(self: "RequestPipeline") -> None:
+        # A choke discards every pending request (BEP 3), so the blocks go back to the picker
+        self._abort(list(self.outstanding))
+    
+    def on_cancel(self: "RequestPipeline", index: int, begin: int) -> None:
+        # Another peer delivered the block first (endgame)
+        self.outstanding.pop((index, begin), None)
+    
+    def check_timeouts(self: "RequestPipeline", now: float) -> int:
+        timeout: float = self.timeout
+        # Requests overtaken by a later one were most likely dropped, so they only get one RTO;
+        # either way the freed blocks are picked up by other peers' pipelines
+        overtaken: float = self.srtt + 4 * self.rttvar if self.srtt is not None else timeout
+        stalled: List[Tuple[int, int]] = []
+        timed_out: bool = False
+        for key, (_, sent) in self.outstanding.items():
+            age: float = now - sent
+            if age > timeout:
+                timed_out = True
+            elif sent >= self._last_answered or age <= overtaken:
+                break
+            stalled.append(key)
+        
+        if not stalled:
+            return 0
+        
+        logger.debug(f"{len(stalled)} requests to {self.connection.peer} timed out after {timeout:.1f}s")
+        try:
+            self.connection.send_cancels([(index, begin, self.outstanding[(index, begin)][0]) for index, begin in stalled])
+        except PeerError:
+            pass
+        self._abort(stalled)
+        
+        if timed_out:
+            # The peer stopped answering altogether rather than skipping a request: back off
+            self.slow_start = False
+            self.depth = max(self.min_depth, self.depth / 2)
+        return len(stalled)
+    
+    def _abort(self: "RequestPipeline", keys: List[Tuple[int, int]]) -> None:
+        for index, begin in keys:
+            self.outstanding.pop((index, begin), None)
+            self.picker.abort_request(self.key, index, begin)
+    
+    def close(self: "RequestPipeline") -> None:
+        self._abort(list(self.outstanding))
+        self.picker.remove_peer(self.key)
@@ -0,0 +1,135 @@
+from typing import ClassVar, Dict, List, Optional, Tuple, Type
+from dataclasses import dataclass, field
+import logging
+import struct
+import os
+
+from .storage import Storage
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TrackerState:
+    interval: int = 0
+    tracker_id: bytes = b""
+    # Compact IPv4 entries, as the tracker sent them
+    peers: bytes = b""
+
+@dataclass
+class ResumeData:
+    info_hash: bytes
+    pieces: bytes
+    # (size, mtime_ns) per file, in torrent order
+    files: List[Tuple[int, int]] = field(default_factory=list)
+    # announce URL -> state from the tracker's last response
+    trackers: Dict[bytes, TrackerState] = field(default_factory=dict)
+    
+    MAGIC: ClassVar[bytes] = b"BTFR"
+    VERSION: ClassVar[int] = 2
+    HEADER_STRUCT: ClassVar[struct.Struct] = struct.Struct(">4sB20sI")
+    FILE_STRUCT: ClassVar[struct.Struct] = struct.Struct(">qq")
+    TRACKER_STRUCT: ClassVar[struct.Struct] = struct.Struct(">HIHI")
+    COUNT_STRUCT: ClassVar[struct.Struct] = struct.Struct(">I")
+    
+    @staticmethod
+    def file_stats(storage: Storage) -> List[Tuple[int, int]]:
+        stats: List[Tuple[int, int]] = []
+        for file in storage.files:
+            try:
+                stat: os.stat_result = os.stat(file.path)
+            except FileNotFoundError:
+                stats.append((-1, 0))
+            else:
+                stats.append((stat.st_size, stat.st_mtime_ns))
+        
+        return stats
+    
+    @classmethod
+    def from_storage(
+        cls: Type["ResumeData"],
+        storage: Storage,
+        pieces: bytes,
+        trackers: Optional[Dict[bytes, TrackerState]] = None
+        ) -> "ResumeData":
+        # Flush first so the recorded mtimes are not invalidated by pending mmap writes
+        storage.flush()
+        return cls(storage.torrent.info_hash, bytes(pieces), cls.file_stats(storage), dict(trackers or {}))
+    
+    def matches(self: "ResumeData", storage: Storage) -> bool:
+        return self.info_hash == storage.torrent.info_hash and self.files == self.file_stats(storage)
+    
+    def to_bytes(self: "ResumeData") -> bytes:
+        parts: List[bytes] = [self.HEADER_STRUCT.pack(self.MAGIC, self.VERSION, self.info_hash, len(self.pieces)), self.pieces]
+        
+        parts.append(self.COUNT_STRUCT.pack(len(self.files)))
+        parts.extend(self.FILE_STRUCT.pack(size, mtime) for size, mtime in self.files)
+        
+        parts.append(self.COUNT_STRUCT.pack(len(self.trackers)))
+        for url, state in self.trackers.items():
+            parts.append(self.TRACKER_STRUCT.pack(len(url), state.interval, len(state.tracker_id), len(state.peers)))
+            parts.extend((url, state.tracker_id, state.peers))
+        
+        return b"".join(parts)
+    
+    @classmethod
+    def from_bytes(cls: Type["ResumeData"], payload: bytes) -> "ResumeData":
+        view: memoryview = memoryview(payload)
+        magic, version, info_hash, pieces_length = cls.HEADER_STRUCT.unpack_from(view)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("Not a resume record or unsupported version")
+        
+        offset: int = cls.HEADER_STRUCT.size
+        pieces: bytes = bytes(view[offset:offset+pieces_length])
+        offset += pieces_length
+        
+        def read_count() -> int:
+            nonlocal offset
+            count: int = cls.COUNT_STRUCT.unpack_from(view, offset)[0]
+            offset += cls.COUNT_STRUCT.size
+            return count
+        
+        files: List[Tuple[int, int]] = []
+        for _ in range(read_count()):
+            files.append(cls.FILE_STRUCT.unpack_from(view, offset))
+            offset += cls.FILE_STRUCT.size
+        
+        trackers: Dict[bytes, TrackerState] = {}
+        for _ in range(read_count()):
+            url_length, interval, tracker_id_length, peers_length = cls.TRACKER_STRUCT.unpack_from(view, offset)
+            offset += cls.TRACKER_STRUCT.size
+            url: bytes = bytes(view[offset:offset+url_length])
+            offset += url_length
+            tracker_id: bytes = bytes(view[offset:offset+tracker_id_length])
+            offset += tracker_id_length
+            peers: bytes = bytes(view[offset:offset+peers_length])
+            offset += peers_length
+            trackers[url] = TrackerState(interval, tracker_id, peers)
+        
+        if offset != len(view):
+            raise ValueError("Trailing data in resume record")
+        
+        return cls(info_hash, pieces, files, trackers)
+    
+    @staticmethod
+    def path(resume_dir: str, info_hash: bytes) -> str:
+        return os.path.join(resume_dir, f"{info_hash.hex()}.fastresume")
+    
+    def save(self: "ResumeData", resume_dir: str) -> None:
+        os.makedirs(resume_dir, exist_ok=True)
+        path: str = self.path(resume_dir, self.info_hash)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(f"{path}.tmp", path)
+    
+    @classmethod
+    def load(cls: Type["ResumeData"], resume_dir: str, info_hash: bytes) -> Optional["ResumeData"]:
+        try:
+            with open(cls.path(resume_dir, info_hash), "rb") as f:
+                record: ResumeData = cls.from_bytes(f.read())
+        except FileNotFoundError:
+            return None
+        except (ValueError, struct.error) as exc:
+            logger.warning(f"Ignoring corrupt resume record for {info_hash.hex()}: {exc}")
+            return None
+        
+        return record if record.info_hash == info_hash else None
@@ -0,0 +1,2 @@
+from .tracker import SimulatedTracker, TrackerConfig
+from .swarm import SwarmSimulator, SwarmReport
\ No newline at end of file
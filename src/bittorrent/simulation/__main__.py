@@ -0,0 +1,69 @@
+from typing import List
+import argparse
+import logging
+import asyncio
+import json
+import sys
+
+from .swarm import SwarmReport, SwarmSimulator
+from .tracker import TrackerConfig
+
+def main(argv: List[str]) -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(prog="python -m bittorrent.simulation", description="Announce many simulated torrents to local stand-in trackers")
+    parser.add_argument("--torrents", type=int, default=1000, help="torrents announcing (default: %(default)s)")
+    parser.add_argument("--trackers", type=int, default=1, help="simulated tracker hosts (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run (default: %(default)s)")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds over which the first announces are spread (default: %(default)s)")
+    parser.add_argument("--udp-share", type=float, default=0.5, help="fraction of torrents on UDP trackers (default: %(default)s)")
+    parser.add_argument("--interval", type=int, default=30, help="announce interval handed out by the trackers (default: %(default)s)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of tracker latency (default: %(default)s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds (default: %(default)s)")
+    parser.add_argument("--loss", type=float, default=0.0, help="UDP packet loss probability per direction (default: %(default)s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of a tracker failure response (default: %(default)s)")
+    parser.add_argument("--swarm-size", type=int, default=200, help="synthetic peers per torrent (default: %(default)s)")
+    parser.add_argument("--max-peers", type=int, default=50, help="peers returned per announce (default: %(default)s)")
+    parser.add_argument("--udp-timeout", type=int, default=15, help="client UDP tracker timeout (default: %(default)s)")
+    parser.add_argument("--seed", type=int, help="random seed")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="log client errors")
+    args: argparse.Namespace = parser.parse_args(argv)
+    
+    # Failure injection makes the client log every failed announce
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    
+    config: TrackerConfig = TrackerConfig(
+        interval=args.interval,
+        swarm_size=args.swarm_size,
+        max_peers=args.max_peers,
+        latency=args.latency,
+        jitter=args.jitter,
+        loss=args.loss,
+        failure_rate=args.failure_rate,
+        seed=args.seed
+        )
+    simulator: SwarmSimulator = SwarmSimulator(
+        torrents=args.torrents,
+        trackers=args.trackers,
+        udp_share=args.udp_share,
+        config=config,
+        ramp=args.ramp,
+        tracker_udp_timeout=args.udp_timeout
+        )
+    report: SwarmReport = asyncio.run(simulator.run(args.duration))
+    
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+        return 0
+    
+    print(f"torrents            {report.torrents}")
+    print(f"duration            {report.duration:.1f} s")
+    print(f"announces           {report.announces} ({report.failures} failed)")
+    print(f"throughput          {report.throughput:.1f} announces/s")
+    print("latency             " + "  ".join(f"{name} {value * 1000:.1f} ms" for name, value in report.latency.items()))
+    print(f"peak sockets        {report.peak_sockets if report.peak_sockets is not None else 'n/a'} ({report.peak_tracker_connections} tracker-side HTTP connections)")
+    print(f"memory              {report.rss_before / (1 << 20):.1f} MiB -> peak {report.peak_rss / (1 << 20):.1f} MiB")
+    print("tracker             " + "  ".join(f"{name}={count}" for name, count in sorted(report.tracker_stats.items())))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,174 @@
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field, asdict
+import logging
+import asyncio
+import random
+import os
+
+import bencode
+
+from ..client import BitTorrent
+from ..torrent import Torrent
+from ..trackers import TrackerManager
+
+from .tracker import SimulatedTracker, TrackerConfig
+
+logger = logging.getLogger(__name__)
+
+def count_sockets() -> Optional[int]:
+    # Linux only: every socket this process holds, client and simulated tracker alike
+    try:
+        fds: List[str] = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    
+    count: int = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+def resident_memory() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak rather than the current size, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered: List[float] = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+@dataclass
+class SwarmReport:
+    torrents: int
+    duration: float
+    announces: int
+    failures: int
+    # Successful announces per second
+    throughput: float
+    # Seconds per announce round, from AnnounceScheduler
+    latency: Dict[str, float]
+    peak_sockets: Optional[int]
+    peak_tracker_connections: int
+    # Bytes
+    rss_before: int
+    peak_rss: int
+    tracker_stats: Dict[str, int] = field(default_factory=dict)
+    
+    def to_dict(self: "SwarmReport") -> Dict[str, Any]:
+        return asdict(self)
+
+class SwarmSimulator:
+    def __init__(
+        self: "SwarmSimulator",
+        torrents: Optional[int] = 1000,
+        trackers: Optional[int] = 1,
+        udp_share: Optional[float] = 0.5,
+        config: Optional[TrackerConfig] = None,
+        ramp: Optional[float] = 5,
+        sample_interval: Optional[float] = 0.5,
+        port: Optional[int] = 6881,
+        **manager_kwargs
+        ) -> None:
+        self.num_torrents = torrents
+        self.num_trackers = trackers
+        # Fraction of torrents announcing over UDP rather than HTTP
+        self.udp_share = udp_share
+        self.config = config if config is not None else TrackerConfig(interval=30)
+        # Initial announces are spread over this many seconds instead of all firing at once
+        self.ramp = ramp
+        self.sample_interval = sample_interval
+        self.port = port
+        self.manager_kwargs = manager_kwargs
+        
+        self.random: random.Random = random.Random(self.config.seed)
+        self.trackers: List[SimulatedTracker] = []
+        self.client: Optional[BitTorrent] = None
+        self.latencies: List[float] = []
+        self.failures: int = 0
+        self.peak_sockets: Optional[int] = None
+        self.peak_rss: int = 0
+    
+    def metainfo(self: "SwarmSimulator", index: int, announce: str) -> bytes:
+        return bencode.encode({
+            b"announce": announce.encode(),
+            b"info": {
+                b"name": b"simulated-%d" % index,
+                b"piece length": 1 << 18,
+                b"pieces": self.random.randbytes(20),
+                b"length": 1 << 18
+            }
+        })
+    
+    def _on_announce(self: "SwarmSimulator", manager: TrackerManager, elapsed: float, success: bool) -> None:
+        if success:
+            self.latencies.append(elapsed)
+        else:
+            self.failures += 1
+    
+    def _sample(self: "SwarmSimulator") -> None:
+        if (sockets := count_sockets()) is not None:
+            self.peak_sockets = max(self.peak_sockets or 0, sockets)
+        self.peak_rss = max(self.peak_rss, resident_memory())
+    
+    async def run(self: "SwarmSimulator", duration: float) -> SwarmReport:
+        rss_before: int = resident_memory()
+        self.trackers = [SimulatedTracker(self.config) for _ in range(self.num_trackers)]
+        for tracker in self.trackers:
+            await tracker.start()
+        
+        self.client = BitTorrent()
+        self.client.announce_scheduler.on_announce = self._on_announce
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        try:
+            torrents: List[Torrent] = []
+            for index in range(self.num_torrents):
+                tracker: SimulatedTracker = self.trackers[index % len(self.trackers)]
+                announce: str = tracker.udp_url if self.random.random() < self.udp_share else tracker.http_url
+                torrents.append(self.client.add_torrent(self.metainfo(index, announce)))
+            
+            started: float = loop.time()
+            for torrent in torrents:
+                self.client.start_announcing(torrent, self.port, delay=self.random.uniform(0, self.ramp), **self.manager_kwargs)
+            
+            while (remaining := started + duration - loop.time()) > 0:
+                self._sample()
+                await asyncio.sleep(min(self.sample_interval, remaining))
+            self._sample()
+            elapsed: float = loop.time() - started
+        finally:
+            await self.client.close()
+            for tracker in self.trackers:
+                await tracker.close()
+        
+        stats: Dict[str, int] = {}
+        for tracker in self.trackers:
+            for name, count in tracker.stats.items():
+                stats[name] = stats.get(name, 0) + count
+        
+        return SwarmReport(
+            torrents=self.num_torrents,
+            duration=elapsed,
+            announces=len(self.latencies) + self.failures,
+            failures=self.failures,
+            throughput=len(self.latencies) / elapsed if elapsed else 0.0,
+            latency={
+                "p50": percentile(self.latencies, 0.50),
+                "p90": percentile(self.latencies, 0.90),
+                "p99": percentile(self.latencies, 0.99),
+                "max": max(self.latencies, default=0.0)
+            },
+            peak_sockets=self.peak_sockets,
+            peak_tracker_connections=sum(tracker.peak_connections for tracker in self.trackers),
+            rss_before=rss_before,
+            peak_rss=self.peak_rss,
+            tracker_stats=stats
+            )
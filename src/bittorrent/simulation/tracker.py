@@ -0,0 +1,295 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import unquote_to_bytes
+import logging
+import asyncio
+import random
+import struct
+
+import bencode
+
+from ..enums import ActionType, UDPEventType
+from ..utils import encode_compact_peers
+
+logger = logging.getLogger(__name__)
+
+ANNOUNCE_STRUCT: struct.Struct = struct.Struct(">QII20s20sQQQIIIiH")
+MAGIC_PROTOCOL_ID: int = 0x41727101980
+
+@dataclass
+class TrackerConfig:
+    interval: int = 1800
+    min_interval: Optional[int] = None
+    # Synthetic peers in every swarm, and the most peers returned by one announce
+    swarm_size: int = 200
+    max_peers: int = 50
+    # Seconds added before every response, plus up to jitter seconds more
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Probability that a UDP datagram is dropped, in each direction
+    loss: float = 0.0
+    # Probability that a request is answered with a failure reason (HTTP) or an error action (UDP)
+    failure_rate: float = 0.0
+    connection_id_lifetime: float = 120
+    seed: Optional[int] = None
+
+class Swarm:
+    __slots__ = ("peers", "seeders", "downloaded")
+    
+    def __init__(self: "Swarm", peers: List[bytes], seeders: int) -> None:
+        # Compact peer entries; announcing clients are added next to the synthetic ones
+        self.peers = peers
+        self.seeders = seeders
+        self.downloaded: int = 0
+    
+    @property
+    def leechers(self: "Swarm") -> int:
+        return max(0, len(self.peers) - self.seeders)
+
+class SimulatedTracker:
+    def __init__(self: "SimulatedTracker", config: Optional[TrackerConfig] = None, host: Optional[str] = "127.0.0.1", http_port: Optional[int] = 0, udp_port: Optional[int] = 0) -> None:
+        self.config = config if config is not None else TrackerConfig()
+        self.host = host
+        self.http_port = http_port
+        self.udp_port = udp_port
+        
+        self.random: random.Random = random.Random(self.config.seed)
+        self.swarms: Dict[bytes, Swarm] = {}
+        # connection id -> expiry, for BEP 15 connect
+        self.connection_ids: Dict[int, float] = {}
+        self.stats: Counter = Counter()
+        self.connections: int = 0
+        self.peak_connections: int = 0
+        
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._handlers: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+    
+    @property
+    def http_url(self: "SimulatedTracker") -> str:
+        return f"http://{self.host}:{self.http_port}/announce"
+    
+    @property
+    def udp_url(self: "SimulatedTracker") -> str:
+        return f"udp://{self.host}:{self.udp_port}"
+    
+    async def start(self: "SimulatedTracker") -> None:
+        self.loop = asyncio.get_event_loop()
+        self.server = await asyncio.start_server(self._handle_http, self.host, self.http_port)
+        self.http_port = self.server.sockets[0].getsockname()[1]
+        self.transport, _ = await self.loop.create_datagram_endpoint(lambda: _UDPProtocol(self), local_addr=(self.host, self.udp_port))
+        self.udp_port = self.transport.get_extra_info("sockname")[1]
+    
+    async def close(self: "SimulatedTracker") -> None:
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        if self.server is not None:
+            self.server.close()
+            # Keep-alive connections would otherwise hold their handlers open
+            for writer in self._handlers.values():
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+    
+    def _delay(self: "SimulatedTracker") -> float:
+        return self.config.latency + self.random.uniform(0, self.config.jitter) if self.config.jitter else self.config.latency
+    
+    def _fails(self: "SimulatedTracker") -> bool:
+        return self.config.failure_rate > 0 and self.random.random() < self.config.failure_rate
+    
+    def _swarm(self: "SimulatedTracker", info_hash: bytes) -> Swarm:
+        if (swarm := self.swarms.get(info_hash)) is None:
+            peers: List[bytes] = [
+                self.random.randbytes(4) + struct.pack(">H", self.random.randint(1024, 65535))
+                for _ in range(self.config.swarm_size)
+                ]
+            swarm = self.swarms[info_hash] = Swarm(peers, self.config.swarm_size // 4)
+        return swarm
+    
+    @staticmethod
+    def _peer(ip: str, port: int) -> Optional[bytes]:
+        # Swarms hold IPv4 compact entries only; IPv6 announcers get peers but are not listed
+        return None if ":" in ip else encode_compact_peers([(ip, port)])
+    
+    def announce(self: "SimulatedTracker", info_hash: bytes, peer: Optional[bytes], left: int, event: Optional[str], numwant: Optional[int]) -> Tuple[Swarm, bytes]:
+        swarm: Swarm = self._swarm(info_hash)
+        if event == "stopped":
+            if peer is not None and peer in swarm.peers:
+                swarm.peers.remove(peer)
+                if not left:
+                    swarm.seeders = max(0, swarm.seeders - 1)
+            return (swarm, b"")
+        
+        if event == "completed":
+            swarm.downloaded += 1
+            swarm.seeders += 1
+        if peer is not None and peer not in swarm.peers:
+            swarm.peers.append(peer)
+            if not left:
+                swarm.seeders += 1
+        
+        count: int = min(self.config.max_peers, len(swarm.peers) if numwant is None or numwant < 0 else numwant)
+        return (swarm, b"".join(self.random.sample(swarm.peers, min(count, len(swarm.peers)))))
+    
+    def scrape(self: "SimulatedTracker", info_hashes: List[bytes]) -> List[Tuple[int, int, int]]:
+        # (complete, downloaded, incomplete) in request order
+        stats: List[Tuple[int, int, int]] = []
+        for info_hash in info_hashes:
+            swarm: Swarm = self._swarm(info_hash)
+            stats.append((swarm.seeders, swarm.downloaded, swarm.leechers))
+        return stats
+    
+    async def _handle_http(self: "SimulatedTracker", reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._handlers[asyncio.current_task()] = writer
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        try:
+            while True:
+                head: bytes = await reader.readuntil(b"\r\n\r\n")
+                lines: List[bytes] = head.split(b"\r\n")
+                _, target, _ = lines[0].split(b" ", 2)
+                path, _, query = target.partition(b"?")
+                
+                if (delay := self._delay()) > 0:
+                    await asyncio.sleep(delay)
+                status, body = self._respond_http(path, query, writer.get_extra_info("peername"))
+                writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: text/plain\r\nContent-Length: %d\r\n\r\n%s" % (status, b"OK" if status == 200 else b"Not Found", len(body), body))
+                await writer.drain()
+                if b"connection: close" in head.lower():
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
+    
+    def _respond_http(self: "SimulatedTracker", path: bytes, query: bytes, peername: Tuple[str, int]) -> Tuple[int, bytes]:
+        params: Dict[str, List[bytes]] = {}
+        for pair in query.split(b"&"):
+            name, _, value = pair.partition(b"=")
+            params.setdefault(name.decode(errors="replace"), []).append(unquote_to_bytes(value))
+        
+        if path.endswith(b"/announce"):
+            self.stats["http_announce"] += 1
+        elif path.endswith(b"/scrape"):
+            self.stats["http_scrape"] += 1
+        else:
+            return (404, b"")
+        
+        if self._fails():
+            self.stats["failed"] += 1
+            return (200, bencode.encode({b"failure reason": b"simulated failure"}))
+        
+        if path.endswith(b"/scrape"):
+            info_hashes: List[bytes] = params.get("info_hash", [])
+            return (200, bencode.encode({b"files": {
+                info_hash: {b"complete": complete, b"downloaded": downloaded, b"incomplete": incomplete}
+                for info_hash, (complete, downloaded, incomplete) in zip(info_hashes, self.scrape(info_hashes))
+            }}))
+        
+        try:
+            info_hash: bytes = params["info_hash"][0]
+            port: int = int(params["port"][0])
+            left: int = int(params.get("left", [b"0"])[0])
+            numwant: Optional[int] = int(params["numwant"][0]) if "numwant" in params else None
+        except (KeyError, ValueError):
+            return (200, bencode.encode({b"failure reason": b"invalid announce"}))
+        if len(info_hash) != 20:
+            return (200, bencode.encode({b"failure reason": b"invalid info_hash"}))
+        
+        event: Optional[str] = params["event"][0].decode(errors="replace") if "event" in params else None
+        swarm, peers = self.announce(info_hash, self._peer(peername[0], port), left, event, numwant)
+        response: Dict[bytes, Any] = {
+            b"interval": self.config.interval,
+            b"complete": swarm.seeders,
+            b"incomplete": swarm.leechers,
+            b"peers": peers
+        }
+        if self.config.min_interval is not None:
+            response[b"min interval"] = self.config.min_interval
+        return (200, bencode.encode(response))
+    
+    def _respond_udp(self: "SimulatedTracker", data: bytes, addr: Tuple[str, int]) -> Optional[bytes]:
+        if len(data) < 16:
+            return None
+        
+        connection_id, action, transaction_id = struct.unpack_from(">QII", data)
+        now: float = self.loop.time()
+        if action == ActionType.CONNECT:
+            if connection_id != MAGIC_PROTOCOL_ID:
+                return None
+            self.stats["udp_connect"] += 1
+            if len(self.connection_ids) > 65536:
+                self.connection_ids = {key: expiry for key, expiry in self.connection_ids.items() if expiry >= now}
+            connection_id = self.random.getrandbits(64)
+            self.connection_ids[connection_id] = now + self.config.connection_id_lifetime
+            return struct.pack(">IIQ", ActionType.CONNECT, transaction_id, connection_id)
+        
+        if self.connection_ids.get(connection_id, 0) < now:
+            self.connection_ids.pop(connection_id, None)
+            self.stats["udp_bad_connection_id"] += 1
+            return struct.pack(">II", ActionType.ERROR, transaction_id) + b"Invalid connection id"
+        
+        if action == ActionType.ANNOUNCE:
+            self.stats["udp_announce"] += 1
+        elif action == ActionType.SCRAPE:
+            self.stats["udp_scrape"] += 1
+        else:
+            return None
+        
+        if self._fails():
+            self.stats["failed"] += 1
+            return struct.pack(">II", ActionType.ERROR, transaction_id) + b"simulated failure"
+        
+        if action == ActionType.SCRAPE:
+            info_hashes: List[bytes] = [data[i:i+20] for i in range(16, len(data) - 19, 20)]
+            return struct.pack(">II", ActionType.SCRAPE, transaction_id) + b"".join(
+                struct.pack(">III", *stats) for stats in self.scrape(info_hashes)
+                )
+        
+        if len(data) < ANNOUNCE_STRUCT.size:
+            return struct.pack(">II", ActionType.ERROR, transaction_id) + b"invalid announce"
+        _, _, _, info_hash, _, _, left, _, event, _, _, numwant, port = ANNOUNCE_STRUCT.unpack_from(data)
+        swarm, peers = self.announce(
+            info_hash,
+            self._peer(addr[0], port),
+            left,
+            UDPEventType(event).name.lower() if event in UDPEventType._value2member_map_ else None,
+            numwant
+            )
+        return struct.pack(">IIIII", ActionType.ANNOUNCE, transaction_id, self.config.interval, swarm.leechers, swarm.seeders) + peers
+    
+    def _datagram_received(self: "SimulatedTracker", data: bytes, addr: Tuple[str, int]) -> None:
+        if self.config.loss and self.random.random() < self.config.loss:
+            self.stats["udp_dropped"] += 1
+            return
+        
+        if (response := self._respond_udp(data, addr)) is None:
+            return
+        if self.config.loss and self.random.random() < self.config.loss:
+            self.stats["udp_dropped"] += 1
+            return
+        
+        if (delay := self._delay()) > 0:
+            self.loop.call_later(delay, self._sendto, response, addr)
+        else:
+            self._sendto(response, addr)
+    
+    def _sendto(self: "SimulatedTracker", data: bytes, addr: Tuple[str, int]) -> None:
+        if self.transport is not None:
+            self.transport.sendto(data, addr)
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    def __init__(self: "_UDPProtocol", tracker: SimulatedTracker) -> None:
+        self.tracker = tracker
+    
+    def datagram_received(self: "_UDPProtocol", data: bytes, addr: Tuple[str, int]) -> None:
+        self.tracker._datagram_received(data, addr)
+    
+    def error_received(self: "_UDPProtocol", exc: Exception) -> None:
+        logger.debug(f"Simulated tracker UDP error: {exc}")
@@ -0,0 +1,178 @@
+from typing import IO, Dict, List, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass
+from bisect import bisect_right
+import logging
+import mmap
+import os
+
+from .torrent import Torrent
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class FileEntry:
+    path: str
+    length: int
+    offset: int
+
+# (file index, offset within the file, length)
+FileSpan = Tuple[int, int, int]
+
+class Storage:
+    def __init__(self: "Storage", torrent: Torrent, download_dir: str, preallocate: Optional[bool] = True) -> None:
+        self.torrent = torrent
+        self.download_dir = download_dir
+        self.preallocate = preallocate
+        
+        self.files: List[FileEntry] = []
+        offset: int = 0
+        for parts, length in torrent.files:
+            self.files.append(FileEntry(self._safe_path(parts), length, offset))
+            offset += length
+        
+        # Zero-length files never hold piece data, so they are left out of the lookup table
+        self._file_indices: List[int] = [i for i, file in enumerate(self.files) if file.length]
+        self._offsets: List[int] = [self.files[i].offset for i in self._file_indices]
+        
+        self._mmaps: Dict[int, mmap.mmap] = {}
+        self._views: Dict[int, memoryview] = {}
+        self._handles: Dict[int, IO[bytes]] = {}
+        self._fds: Dict[int, int] = {}
+        self._iov_max: int = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+    
+    def _safe_path(self: "Storage", parts: Tuple[str, ...]) -> str:
+        for part in parts:
+            if not part or part in (".", "..") or os.sep in part or (os.altsep and os.altsep in part):
+                raise ValueError(f"Unsafe path in torrent: {parts}")
+        
+        return os.path.join(self.download_dir, *parts)
+    
+    def open(self: "Storage") -> None:
+        for file in self.files:
+            os.makedirs(os.path.dirname(file.path), exist_ok=True)
+            fd: int = os.open(file.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size != file.length:
+                    os.ftruncate(fd, file.length)
+                    if self.preallocate and file.length and hasattr(os, "posix_fallocate"):
+                        try:
+                            os.posix_fallocate(fd, 0, file.length)
+                        except OSError as exc:
+                            logger.debug(f"posix_fallocate failed for {file.path}: {exc}")
+            finally:
+                os.close(fd)
+    
+    def _view(self: "Storage", file_index: int) -> memoryview:
+        if (view := self._views.get(file_index)) is None:
+            file: FileEntry = self.files[file_index]
+            with open(file.path, "r+b") as f:
+                self._mmaps[file_index] = mmap.mmap(f.fileno(), file.length)
+            view = self._views[file_index] = memoryview(self._mmaps[file_index])
+        
+        return view
+    
+    def handle(self: "Storage", file_index: int) -> IO[bytes]:
+        # Read-only file objects for sendfile, which needs a real file rather than a mapping
+        if (handle := self._handles.get(file_index)) is None:
+            handle = self._handles[file_index] = open(self.files[file_index].path, "rb")
+        return handle
+    
+    def _fd(self: "Storage", file_index: int) -> int:
+        if (fd := self._fds.get(file_index)) is None:
+            fd = self._fds[file_index] = os.open(self.files[file_index].path, os.O_RDWR)
+        return fd
+    
+    def spans(self: "Storage", index: int, begin: int, length: int) -> List[FileSpan]:
+        return self._spans(index * self.torrent.piece_length + begin, length)
+    
+    def _spans(self: "Storage", start: int, length: int) -> List[FileSpan]:
+        if start + length > self.torrent.total_length:
+            raise ValueError(f"Range ({start}, {length}) exceeds torrent length")
+        
+        spans: List[FileSpan] = []
+        position: int = bisect_right(self._offsets, start) - 1
+        while length > 0:
+            file_index: int = self._file_indices[position]
+            file: FileEntry = self.files[file_index]
+            file_offset: int = start - file.offset
+            size: int = min(length, file.length - file_offset)
+            spans.append((file_index, file_offset, size))
+            start += size
+            length -= size
+            position += 1
+        
+        return spans
+    
+    def write(self: "Storage", index: int, begin: int, data: Union[bytes, memoryview]) -> None:
+        data = memoryview(data)
+        written: int = 0
+        for file_index, file_offset, size in self.spans(index, begin, len(data)):
+            self._view(file_index)[file_offset:file_offset+size] = data[written:written+size]
+            written += size
+    
+    def pwritev(self: "Storage", start: int, buffers: Sequence[Union[bytes, memoryview]]) -> int:
+        # Blocking; called from the disk thread pool with buffers that are contiguous from
+        # torrent offset start, so each file they touch gets a single vectored write
+        views: List[memoryview] = [memoryview(buffer).cast("B") for buffer in buffers]
+        total: int = sum(len(view) for view in views)
+        position: int = 0
+        for file_index, file_offset, size in self._spans(start, total):
+            batch: List[memoryview] = []
+            remaining: int = size
+            while remaining:
+                view: memoryview = views[position]
+                if len(view) > remaining:
+                    batch.append(view[:remaining])
+                    views[position] = view[remaining:]
+                    remaining = 0
+                else:
+                    batch.append(view)
+                    remaining -= len(view)
+                    position += 1
+            
+            fd: int = self._fd(file_index)
+            first: int = 0
+            while first < len(batch):
+                written: int = os.pwritev(fd, batch[first:first+self._iov_max], file_offset)
+                file_offset += written
+                # Short writes resume from the first buffer that was not fully written
+                while first < len(batch) and written >= len(batch[first]):
+                    written -= len(batch[first])
+                    first += 1
+                if written:
+                    batch[first] = batch[first][written:]
+        
+        return total
+    
+    def read_views(self: "Storage", index: int, begin: int, length: int) -> List[memoryview]:
+        return [
+            self._view(file_index)[file_offset:file_offset+size]
+            for file_index, file_offset, size in self.spans(index, begin, length)
+            ]
+    
+    def read(self: "Storage", index: int, begin: int, length: int) -> Union[bytes, memoryview]:
+        views: List[memoryview] = self.read_views(index, begin, length)
+        # Only ranges crossing a file boundary have to be joined into a copy
+        return views[0] if len(views) == 1 else b"".join(views)
+    
+    def flush(self: "Storage") -> None:
+        for mapping in self._mmaps.values():
+            mapping.flush()
+    
+    def close(self: "Storage") -> None:
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+        
+        for file_index, mapping in list(self._mmaps.items()):
+            self._views.pop(file_index).release()
+            try:
+                mapping.close()
+            except BufferError:
+                # A block view handed out for upload is still alive; the mapping closes with it
+                logger.debug(f"Deferring close of {self.files[file_index].path}")
+        
+        self._mmaps.clear()
@@ -1,40 +1,84 @@
-from typing import Any, List, Dict, Optional, Union, IO
+from typing import Any, List, Dict, Optional, Tuple, Union, IO
 from dataclasses import dataclass, field
+from functools import cached_property
+import hashlib
 
-import bencode
-
-from .utils import generate_info_hash, generate_peer_id
+from .bencoding import BencodeReader, Span
+from .utils import generate_peer_id
 
 @dataclass
 class Torrent:
     data: Union[str, bytes]
-    decoded: bytes = field(init=False)
+    raw: bytes = field(init=False, repr=False)
+    reader: BencodeReader = field(init=False, repr=False)
     peer_id: bytes = field(init=False)
     announce: bytes = field(init=False)
     announce_list: Optional[List[List[bytes]]] = field(init=False)
-    info: Dict[bytes, Any] = field(init=False)
     info_hash: bytes = field(init=False)
-    total_length: int = field(init=False)
+    name: str = field(init=False)
+    piece_length: int = field(init=False)
+    pieces: memoryview = field(init=False, repr=False)
+    pieces_offset: int = field(init=False, repr=False)
+    num_pieces: int = field(init=False)
 
     def __post_init__(self: "Torrent"):
-        self.decoded = self._parse_data(self.data)
+        self.raw = self._read_data(self.data)
+        self.reader = BencodeReader(self.raw)
         self.peer_id = generate_peer_id()
         
-        self.announce = self.decoded[b"announce"]
-        self.announce_list = self.decoded.get(b"announce-list")
+        # Only the top level and the info dictionary are indexed; values are decoded on demand
+        self._spans: Dict[bytes, Span] = self.reader.dict_spans(0)
+        self._info_spans: Dict[bytes, Span] = self.reader.dict_spans(self._spans[b"info"][0])
+        
+        self.announce = self.reader.value(self._spans[b"announce"])
+        self.announce_list = self.reader.value(self._spans[b"announce-list"]) if b"announce-list" in self._spans else None
         
-        self.info = self.decoded[b"info"]
-        self.info_hash = generate_info_hash(self.info)
+        # Hashing the info dictionary's own bytes keeps the hash right for non-canonical encodings
+        self.info_hash = hashlib.sha1(self.reader.raw(self._spans[b"info"])).digest()
         
-        self.total_length = sum((file[b"length"] for file in self.info[b"files"])) if b"files" in self.info else self.info[b"length"]
+        self.name = self._decode_path_part(self.reader.value(self._info_spans.get(b"name.utf-8", self._info_spans[b"name"])))
+        self.piece_length = self.reader.value(self._info_spans[b"piece length"])
+        self.pieces_offset = self.reader.string_bounds(self._info_spans[b"pieces"])[0]
+        self.pieces = self.reader.view(self._info_spans[b"pieces"])
+        self.num_pieces = len(self.pieces) // 20
+    
+    @cached_property
+    def decoded(self: "Torrent") -> Dict[bytes, Any]:
+        return self.reader.value((0, len(self.raw)))
+    
+    @cached_property
+    def info(self: "Torrent") -> Dict[bytes, Any]:
+        return self.reader.value(self._spans[b"info"])
+    
+    @cached_property
+    def files(self: "Torrent") -> List[Tuple[Tuple[str, ...], int]]:
+        if b"files" not in self._info_spans:
+            return [((self.name,), self.reader.value(self._info_spans[b"length"]))]
+        
+        return [
+            (
+                (self.name, *(self._decode_path_part(part) for part in file.get(b"path.utf-8", file[b"path"]))),
+                file[b"length"]
+            ) for file in self.reader.value(self._info_spans[b"files"])
+            ]
+    
+    @cached_property
+    def total_length(self: "Torrent") -> int:
+        if b"files" not in self._info_spans:
+            return self.reader.value(self._info_spans[b"length"])
+        
+        return sum((length for _, length in self.files))
+    
+    def _decode_path_part(self: "Torrent", part: Union[str, bytes]) -> str:
+        return part.decode("utf-8", errors="replace") if isinstance(part, bytes) else part
     
-    def _parse_data(self: "Torrent", data: Union[str, bytes, IO[bytes]]) -> bytes:
+    def _read_data(self: "Torrent", data: Union[str, bytes, IO[bytes]]) -> bytes:
         if isinstance(data, str):
             with open(data, "rb") as f:
-                return bencode.decode(f.read())
+                return f.read()
         elif isinstance(data, bytes):
-            return bencode.decode(data)
+            return data
         elif hasattr(data, "read") and callable(data.read):
-            return bencode.decode(data.read())
+            return data.read()
         else:
             raise ValueError("Unsupported data type. Please provide either a file path (as a string), raw bytes, or a file-like object")
@@ -1,3 +1,8 @@
 from .tracker_manager import TrackerManager
 from .tracker_http import TrackerHTTP
 from .tracker_udp import TrackerUDP
+from .http_client import TrackerHTTPClient
+from .udp_endpoint import UDPTrackerEndpoint
+from .connection_id_cache import ConnectionIDCache
+from .announce_scheduler import AnnounceScheduler
+from .tracker_health import TrackerHealth, TrackerHealthRegistry
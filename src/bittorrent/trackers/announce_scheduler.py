@@ -0,0 +1,131 @@
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+import logging
+import asyncio
+import heapq
+import random
+
+from ..exceptions import TrackerError
+
+from .tracker_manager import TrackerManager
+
+logger = logging.getLogger(__name__)
+
+class AnnounceScheduler:
+    def __init__(
+        self: "AnnounceScheduler",
+        max_concurrent: Optional[int] = 64,
+        max_per_tracker: Optional[int] = 4,
+        jitter: Optional[float] = 0.1,
+        default_interval: Optional[int] = 1800,
+        min_backoff: Optional[float] = 30,
+        max_backoff: Optional[float] = 3600,
+        on_announce: Optional[Callable[[TrackerManager, float, bool], None]] = None
+        ) -> None:
+        self.max_per_tracker = max_per_tracker
+        self.jitter = jitter
+        self.default_interval = default_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        # Called with (manager, seconds spent announcing, success) after every announce round
+        self.on_announce = on_announce
+        
+        # (next announce time, sequence, manager); entries whose sequence is stale are skipped on pop
+        self.queue: List[Tuple[float, int, TrackerManager]] = []
+        self._sequence: Dict[TrackerManager, int] = {}
+        self._next_sequence: int = 0
+        self._running: Set[asyncio.Task] = set()
+        self._concurrency: asyncio.Semaphore = asyncio.Semaphore(max_concurrent)
+        self._tracker_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+    
+    def __len__(self: "AnnounceScheduler") -> int:
+        return len(self._sequence)
+    
+    def tracker_semaphore(self: "AnnounceScheduler", url: bytes) -> asyncio.Semaphore:
+        host: str = urlparse(url.decode(errors="replace") if isinstance(url, bytes) else url).netloc
+        if (semaphore := self._tracker_semaphores.get(host)) is None:
+            semaphore = self._tracker_semaphores[host] = asyncio.Semaphore(self.max_per_tracker)
+        return semaphore
+    
+    def schedule(self: "AnnounceScheduler", manager: TrackerManager, delay: Optional[float] = 0) -> None:
+        sequence: int = self._next_sequence
+        self._next_sequence += 1
+        self._sequence[manager] = sequence
+        
+        when: float = asyncio.get_event_loop().time() + delay
+        heapq.heappush(self.queue, (when, sequence, manager))
+        if self.queue[0][1] == sequence:
+            self._wakeup.set()
+        
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+    
+    def remove(self: "AnnounceScheduler", manager: TrackerManager) -> None:
+        self._sequence.pop(manager, None)
+    
+    def _with_jitter(self: "AnnounceScheduler", delay: float) -> float:
+        # Spreads torrents added together so they do not announce in lockstep forever
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+    
+    def next_delay(self: "AnnounceScheduler", manager: TrackerManager) -> float:
+        if manager.failures:
+            return self._with_jitter(min(self.max_backoff, self.min_backoff * 2 ** (manager.failures - 1)))
+        
+        interval: float = manager.interval or self.default_interval
+        delay: float = self._with_jitter(interval)
+        return max(delay, manager.min_interval or 0)
+    
+    async def _announce(self: "AnnounceScheduler", manager: TrackerManager) -> None:
+        success: bool = False
+        async with self._concurrency:
+            started: float = asyncio.get_event_loop().time()
+            try:
+                await manager.select_trackers()
+                success = True
+            except TrackerError as exc:
+                logger.debug(exc)
+            except Exception as exc:
+                logger.exception(exc)
+        
+        if self.on_announce:
+            # Measured inside the concurrency limit, so time spent queued for a slot is excluded
+            self.on_announce(manager, asyncio.get_event_loop().time() - started, success)
+        
+        if manager in self._sequence:
+            self.schedule(manager, self.next_delay(manager))
+    
+    async def _run(self: "AnnounceScheduler") -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        while True:
+            while self.queue and self._sequence.get(self.queue[0][2]) != self.queue[0][1]:
+                heapq.heappop(self.queue)
+            
+            self._wakeup.clear()
+            if not self.queue:
+                await self._wakeup.wait()
+                continue
+            
+            delay: float = self.queue[0][0] - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            _, sequence, manager = heapq.heappop(self.queue)
+            task: asyncio.Task = asyncio.ensure_future(self._announce(manager))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+    
+    async def close(self: "AnnounceScheduler") -> None:
+        tasks: List[asyncio.Task] = [*self._running, *([self._task] if self._task is not None else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        self._task = None
+        self.queue.clear()
+        self._sequence.clear()
@@ -1,19 +1,23 @@
-from typing import Tuple
+from typing import Callable, Optional, Tuple
 import asyncio
 
 class AsyncIOUDPProtocol(asyncio.DatagramProtocol):
-    def __init__(self: "UDPProtocol") -> None:
+    def __init__(self: "AsyncIOUDPProtocol", on_datagram: Optional[Callable[[bytes, Tuple[str, int]], None]] = None) -> None:
         self.transport: asyncio.transports.DatagramTransport = None
+        self.on_datagram = on_datagram
         self.received_data: asyncio.Queue[Tuple[bytes, Tuple[str, int]]] = asyncio.Queue()
     
-    def connection_made(self: "UDPProtocol", transport: asyncio.transports.DatagramTransport) -> None:
+    def connection_made(self: "AsyncIOUDPProtocol", transport: asyncio.transports.DatagramTransport) -> None:
         self.transport = transport
     
-    def datagram_received(self: "UDPProtocol", data: bytes, addr: Tuple[str, int]) -> None:
-        asyncio.ensure_future(self.received_data.put((data, addr)))
+    def datagram_received(self: "AsyncIOUDPProtocol", data: bytes, addr: Tuple[str, int]) -> None:
+        if self.on_datagram is not None:
+            self.on_datagram(data, addr)
+        else:
+            self.received_data.put_nowait((data, addr))
     
-    def send(self: "UDPProtocol", message: bytes) -> None:
-        self.transport.sendto(message)
+    def send(self: "AsyncIOUDPProtocol", message: bytes, addr: Optional[Tuple[str, int]] = None) -> None:
+        self.transport.sendto(message, addr)
     
-    async def recv(self: "UDPProtocol") -> bytes:
+    async def recv(self: "AsyncIOUDPProtocol") -> bytes:
         return (await self.received_data.get())[0]
\ No newline at end of file
@@ -0,0 +1,53 @@
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import logging
+import asyncio
+
+logger = logging.getLogger(__name__)
+
+class ConnectionIDCache:
+    def __init__(self: "ConnectionIDCache", validity: Optional[float] = 60, refresh_margin: Optional[float] = 15) -> None:
+        self.validity = validity
+        self.refresh_margin = refresh_margin
+        
+        # tracker address -> (connection id, time obtained)
+        self.entries: Dict[Tuple[str, int], Tuple[int, float]] = {}
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+    
+    def __len__(self: "ConnectionIDCache") -> int:
+        return len(self.entries)
+    
+    def lookup(self: "ConnectionIDCache", addr: Tuple[str, int]) -> Optional[Tuple[int, float]]:
+        entry: Optional[Tuple[int, float]] = self.entries.get(addr)
+        if entry is not None and asyncio.get_event_loop().time() - entry[1] < self.validity:
+            return entry
+        return None
+    
+    def invalidate(self: "ConnectionIDCache", addr: Tuple[str, int]) -> None:
+        self.entries.pop(addr, None)
+    
+    def _refresh(self: "ConnectionIDCache", addr: Tuple[str, int], connect: Callable[[], Awaitable[int]]) -> asyncio.Future:
+        # Single flight: every announce to this tracker shares one outstanding connect
+        if (future := self._inflight.get(addr)) is not None:
+            return future
+        
+        async def refresh() -> Tuple[int, float]:
+            try:
+                entry: Tuple[int, float] = (await connect(), asyncio.get_event_loop().time())
+                self.entries[addr] = entry
+                return entry
+            finally:
+                self._inflight.pop(addr, None)
+        
+        future = self._inflight[addr] = asyncio.ensure_future(refresh())
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+    
+    async def get(self: "ConnectionIDCache", addr: Tuple[str, int], connect: Callable[[], Awaitable[int]]) -> Tuple[int, float]:
+        entry: Optional[Tuple[int, float]] = self.lookup(addr)
+        if entry is None:
+            return await asyncio.shield(self._refresh(addr, connect))
+        
+        if asyncio.get_event_loop().time() - entry[1] >= self.validity - self.refresh_margin:
+            # Still usable, but refresh in the background before it lapses
+            self._refresh(addr, connect)
+        return entry
@@ -0,0 +1,53 @@
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import logging
+import asyncio
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE: bool = True
+except ImportError:
+    HTTP2_AVAILABLE: bool = False
+
+class TrackerHTTPClient:
+    def __init__(
+        self: "TrackerHTTPClient",
+        timeout: Optional[float] = 30,
+        max_connections: Optional[int] = 256,
+        max_keepalive_connections: Optional[int] = 64,
+        keepalive_expiry: Optional[float] = 120,
+        max_per_host: Optional[int] = 8,
+        http2: Optional[bool] = None
+        ) -> None:
+        self.max_per_host = max_per_host
+        # httpx pools connections per origin, so announces to one tracker reuse warm connections
+        self.client: httpx.AsyncClient = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+                ),
+            http2=HTTP2_AVAILABLE if http2 is None else http2,
+            headers={"Accept-Encoding": "gzip"}
+            )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+    
+    def _semaphore(self: "TrackerHTTPClient", url: str) -> asyncio.Semaphore:
+        host: str = urlparse(url).netloc
+        if (semaphore := self._host_semaphores.get(host)) is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphore
+    
+    async def get(self: "TrackerHTTPClient", url: str, timeout: Optional[float] = None) -> httpx.Response:
+        async with self._semaphore(url):
+            if timeout is None:
+                return await self.client.get(url)
+            return await self.client.get(url, timeout=timeout)
+    
+    async def aclose(self: "TrackerHTTPClient") -> None:
+        await self.client.aclose()
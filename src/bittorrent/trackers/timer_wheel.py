@@ -0,0 +1,65 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import math
+
+class TimerWheel:
+    def __init__(self: "TimerWheel", resolution: Optional[float] = 0.25, size: Optional[int] = 1024) -> None:
+        self.resolution = resolution
+        self.size = size
+        
+        # slot -> timer id -> (remaining rounds, callback)
+        self.slots: List[Dict[int, Tuple[int, Callable[[], None]]]] = [{} for _ in range(size)]
+        self._slot_of: Dict[int, int] = {}
+        self._tick: int = 0
+        self._next_id: int = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+    
+    def __len__(self: "TimerWheel") -> int:
+        return len(self._slot_of)
+    
+    def schedule(self: "TimerWheel", delay: float, callback: Callable[[], None]) -> int:
+        ticks: int = max(1, math.ceil(delay / self.resolution))
+        slot: int = (self._tick + ticks) % self.size
+        
+        timer_id: int = self._next_id
+        self._next_id += 1
+        self.slots[slot][timer_id] = ((ticks - 1) // self.size, callback)
+        self._slot_of[timer_id] = slot
+        
+        if self._handle is None:
+            self._handle = asyncio.get_event_loop().call_later(self.resolution, self._on_tick)
+        return timer_id
+    
+    def cancel(self: "TimerWheel", timer_id: int) -> None:
+        if (slot := self._slot_of.pop(timer_id, None)) is not None:
+            del self.slots[slot][timer_id]
+    
+    def _on_tick(self: "TimerWheel") -> None:
+        self._tick = (self._tick + 1) % self.size
+        slot: Dict[int, Tuple[int, Callable[[], None]]] = self.slots[self._tick]
+        
+        expired: List[Callable[[], None]] = []
+        for timer_id, (rounds, callback) in list(slot.items()):
+            if rounds:
+                slot[timer_id] = (rounds - 1, callback)
+            else:
+                del slot[timer_id]
+                del self._slot_of[timer_id]
+                expired.append(callback)
+        
+        self._handle = None
+        for callback in expired:
+            callback()
+        
+        # The wheel stops ticking while it is empty, so an idle session costs no wake-ups
+        if self._handle is None and self._slot_of:
+            self._handle = asyncio.get_event_loop().call_later(self.resolution, self._on_tick)
+    
+    def close(self: "TimerWheel") -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        
+        for slot in self.slots:
+            slot.clear()
+        self._slot_of.clear()
@@ -0,0 +1,76 @@
+from typing import Dict, Optional, Tuple, Union
+from dataclasses import dataclass
+from urllib.parse import urlparse
+import asyncio
+
+@dataclass
+class TrackerHealth:
+    # EWMA of successful announce round trips, in seconds
+    response_time: Optional[float] = None
+    failures: int = 0
+    last_success: Optional[float] = None
+    last_failure: Optional[float] = None
+
+class TrackerHealthRegistry:
+    def __init__(
+        self: "TrackerHealthRegistry",
+        alpha: Optional[float] = 0.3,
+        default_response_time: Optional[float] = 1.0,
+        retry_after: Optional[float] = 300,
+        max_retry_after: Optional[float] = 6 * 3600
+        ) -> None:
+        self.alpha = alpha
+        self.default_response_time = default_response_time
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        
+        # tracker host -> health, shared by every torrent announcing to it
+        self.records: Dict[str, TrackerHealth] = {}
+    
+    def __len__(self: "TrackerHealthRegistry") -> int:
+        return len(self.records)
+    
+    @staticmethod
+    def host(url: Union[str, bytes]) -> str:
+        return urlparse(url.decode(errors="replace") if isinstance(url, bytes) else url).netloc
+    
+    def get(self: "TrackerHealthRegistry", url: Union[str, bytes]) -> Optional[TrackerHealth]:
+        return self.records.get(self.host(url))
+    
+    def _record(self: "TrackerHealthRegistry", url: Union[str, bytes]) -> TrackerHealth:
+        host: str = self.host(url)
+        if (health := self.records.get(host)) is None:
+            health = self.records[host] = TrackerHealth()
+        return health
+    
+    def record_success(self: "TrackerHealthRegistry", url: Union[str, bytes], elapsed: float) -> None:
+        health: TrackerHealth = self._record(url)
+        if health.response_time is None:
+            health.response_time = elapsed
+        else:
+            health.response_time += self.alpha * (elapsed - health.response_time)
+        health.failures = 0
+        health.last_success = asyncio.get_event_loop().time()
+    
+    def record_failure(self: "TrackerHealthRegistry", url: Union[str, bytes]) -> None:
+        health: TrackerHealth = self._record(url)
+        health.failures += 1
+        health.last_failure = asyncio.get_event_loop().time()
+    
+    def is_backing_off(self: "TrackerHealthRegistry", url: Union[str, bytes]) -> bool:
+        return self.sort_key(url)[0] > 0
+    
+    def sort_key(self: "TrackerHealthRegistry", url: Union[str, bytes]) -> Tuple[int, float]:
+        health: Optional[TrackerHealth] = self.get(url)
+        if health is None:
+            return (0, self.default_response_time)
+        
+        response_time: float = health.response_time if health.response_time is not None else self.default_response_time
+        if health.failures:
+            # A failing tracker sinks to the end of its tier until its backoff lapses,
+            # after which it is ranked like an unknown tracker and gets another chance
+            backoff: float = min(self.max_retry_after, self.retry_after * 2 ** (health.failures - 1))
+            if asyncio.get_event_loop().time() - health.last_failure < backoff:
+                return (health.failures, response_time)
+        
+        return (0, response_time)
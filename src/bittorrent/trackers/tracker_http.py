@@ -1,26 +1,78 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 import urllib.parse
 import logging
+import asyncio
 
 import bencode
 import httpx
 
 from ..exceptions import TrackerError
-from ..utils import generate_tracker_key, decode_compact_peers
+from ..utils import generate_tracker_key, decode_dict_peers
+
+from .http_client import TrackerHTTPClient
 
 logger = logging.getLogger(__name__)
 
+# bencode.decode turns keys into str; without an encoding every key and string stays bytes
+BENCODE: bencode.Bencode = bencode.Bencode()
+
 class TrackerHTTP:
-    def __init__(self: "Tracker", url: str, timeout: Optional[int] = 30) -> None:
+    def __init__(self: "TrackerHTTP", url: str, timeout: Optional[int] = 30, client: Optional[TrackerHTTPClient] = None) -> None:
         self.url = url
         self.timeout = timeout
+        self.client = client
         
         self.interval: Optional[int] = None
         self.min_interval: Optional[int] = None
         self.tracker_id: Optional[bytes] = None
         self.complete: Optional[int] = None
         self.incomplete: Optional[int] = None
-        self.peers: List[str, int] = []
+        # Compact peer lists are kept as the raw bytes; only the dictionary model is decoded
+        self.peers: Union[bytes, List[Tuple[str, int]]] = b""
+        self.peers6: bytes = b""
+    
+    @staticmethod
+    def _quote(value: Any) -> str:
+        # httpx would str() bytes values; info_hash and peer_id must be percent-encoded raw bytes
+        if isinstance(value, bytes):
+            return urllib.parse.quote_from_bytes(value)
+        return urllib.parse.quote(str(int(value) if isinstance(value, bool) else value))
+    
+    def _build_url(self: "TrackerHTTP", params: Dict[str, Any], url: Optional[str] = None) -> str:
+        url = url or self.url
+        # List values repeat the parameter, as scrape does with info_hash
+        query: str = "&".join(
+            f"{name}={self._quote(item)}"
+            for name, value in params.items() if value is not None
+            for item in (value if isinstance(value, list) else (value,))
+            )
+        return f"{url}{'&' if '?' in url else '?'}{query}"
+    
+    @property
+    def scrape_url(self: "TrackerHTTP") -> Optional[str]:
+        # The scrape convention only applies when the last path segment starts with "announce"
+        parsed: urllib.parse.ParseResult = urllib.parse.urlparse(self.url)
+        head, _, last = parsed.path.rpartition("/")
+        if not last.startswith("announce"):
+            return None
+        return urllib.parse.urlunparse(parsed._replace(path=f"{head}/scrape{last[len('announce'):]}"))
+    
+    @staticmethod
+    def _decode(content: bytes) -> Dict[bytes, Any]:
+        try:
+            decoded: Any = BENCODE.decode(content)
+        except bencode.BencodeDecodeError as exc:
+            raise TrackerError(f"Malformed tracker response: {exc}")
+        if not isinstance(decoded, dict):
+            raise TrackerError("Malformed tracker response: not a dictionary")
+        return decoded
+    
+    async def _get(self: "TrackerHTTP", url: str) -> httpx.Response:
+        if self.client is not None:
+            return await self.client.get(url, timeout=self.timeout)
+        
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            return await client.get(url)
     
     async def announce(
         self: "TrackerHTTP",
@@ -52,31 +104,75 @@ class TrackerHTTP:
             "ip": ip,
             "numwant": numwant,
             "key": key or generate_tracker_key("http"),
-            "trackerid": trackerid or self.trackerid
+            "trackerid": trackerid or self.tracker_id
         }
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response: httpx.Response = await client.get(self.url, params={k: v for k, v in params.items() if v})
-            if not response.content:
-                response.raise_for_status()
-            
-            decoded_response: Dict[bytes, Any] = bencode.decode(response.content)
-            
-            if response.status_code != 200 or (failure_reason := decoded_response.get(b"failure reason")):
-                logger.debug(f"Announce request failed: {decoded_response}")
-                raise TrackerError(f"Announce request failed: {failure_reason}")
-            elif (warning_message := decoded_response.get(b"warning message")):
-                logger.warning(warning_message)
-            
-            self.interval = decoded_response["interval"]
-            self.min_interval = decoded_response.get("min_interval")
-            self.trackerid = decoded_response.get("trackerid")
-            self.complete = decoded_response.get("complete")
-            self.incomplete = decoded_response.get("incomplete")
-            
-            peers = decoded_response["peers"]
-            if isinstance(peers, bytes):
-                decoded_response["peers"] = decode_compact_peers(peers)
-            
-            self.peers.extend((p for p in decoded_response["peers"] if p not in self.peers))
-            return decoded_response
+        response: httpx.Response = await self._get(self._build_url(params))
+        if not response.content:
+            response.raise_for_status()
+        
+        decoded_response: Dict[bytes, Any] = self._decode(response.content)
+        
+        if response.status_code != 200 or (failure_reason := decoded_response.get(b"failure reason")):
+            logger.debug(f"Announce request failed: {decoded_response}")
+            raise TrackerError(f"Announce request failed: {failure_reason}")
+        elif (warning_message := decoded_response.get(b"warning message")):
+            logger.warning(warning_message)
+        
+        self.interval = decoded_response[b"interval"]
+        self.min_interval = decoded_response.get(b"min interval")
+        self.tracker_id = decoded_response.get(b"tracker id", self.tracker_id)
+        self.complete = decoded_response.get(b"complete")
+        self.incomplete = decoded_response.get(b"incomplete")
+        
+        peers: Union[bytes, List[Tuple[str, int]]] = decoded_response.get(b"peers", b"")
+        if not isinstance(peers, bytes):
+            peers = decode_dict_peers(peers)
+        # BEP 7: IPv6 peers arrive separately as 18-byte compact entries
+        if not isinstance(peers6 := decoded_response.get(b"peers6", b""), bytes):
+            peers6 = b""
+        
+        # Deduplication across announces and sources happens in the torrent's PeerStore
+        self.peers = peers
+        self.peers6 = peers6
+        return {
+            "interval": self.interval,
+            "min_interval": self.min_interval,
+            "tracker_id": self.tracker_id,
+            "complete": self.complete,
+            "incomplete": self.incomplete,
+            "peers": peers,
+            "peers6": peers6
+        }
+    
+    async def scrape(self: "TrackerHTTP", info_hashes: Iterable[bytes], chunk_size: Optional[int] = 50) -> Dict[bytes, Dict[str, int]]:
+        if (scrape_url := self.scrape_url) is None:
+            raise TrackerError(f"Tracker does not support scrape: {self.url}")
+        
+        info_hashes = list(info_hashes)
+        chunks: List[List[bytes]] = [info_hashes[i:i+chunk_size] for i in range(0, len(info_hashes), chunk_size)]
+        results: Dict[bytes, Dict[str, int]] = {}
+        for files in await asyncio.gather(*(self._scrape_chunk(scrape_url, chunk) for chunk in chunks)):
+            results.update(files)
+        
+        return results
+    
+    async def _scrape_chunk(self: "TrackerHTTP", scrape_url: str, info_hashes: List[bytes]) -> Dict[bytes, Dict[str, int]]:
+        response: httpx.Response = await self._get(self._build_url({"info_hash": info_hashes}, scrape_url))
+        if not response.content:
+            response.raise_for_status()
+        
+        decoded_response: Dict[bytes, Any] = self._decode(response.content)
+        
+        if response.status_code != 200 or (failure_reason := decoded_response.get(b"failure reason")):
+            logger.debug(f"Scrape request failed: {decoded_response}")
+            raise TrackerError(f"Scrape request failed: {failure_reason}")
+        
+        return {
+            info_hash: {
+                "complete": stats.get(b"complete", 0),
+                "downloaded": stats.get(b"downloaded", 0),
+                "incomplete": stats.get(b"incomplete", 0)
+            }
+            for info_hash, stats in decoded_response.get(b"files", {}).items()
+        }
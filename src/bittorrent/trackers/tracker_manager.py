@@ -1,10 +1,24 @@
-from typing import Any, List, Dict, Optional, Tuple, Union
+from typing import Any, Callable, List, Dict, Optional, Set, Tuple, Union
+import ipaddress
+import logging
+import asyncio
+import random
 
+from ..dns_cache import DNSCache
+from ..exceptions import TrackerError
+from ..enums import PeerSource, UDPEventType
+from ..peer_store import PeerStore
 from ..torrent import Torrent
 from ..utils import parse_url
 
+from .http_client import TrackerHTTPClient
 from .tracker_http import TrackerHTTP
 from .tracker_udp import TrackerUDP
+from .udp_endpoint import UDPTrackerEndpoint
+from .connection_id_cache import ConnectionIDCache
+from .tracker_health import TrackerHealthRegistry
+
+logger = logging.getLogger(__name__)
 
 class TrackerManager:
     def __init__(
@@ -23,7 +37,13 @@ class TrackerManager:
         tracker_http_timeout: Optional[int] = 30,
         tracker_udp_timeout: Optional[int] = 15,
         tracker_udp_retries: Optional[int] = 2,
-        max_concurrent_announce: Optional[int] = 5
+        tracker_semaphore: Optional[Callable[[bytes], asyncio.Semaphore]] = None,
+        http_client: Optional[TrackerHTTPClient] = None,
+        udp_endpoint: Optional[UDPTrackerEndpoint] = None,
+        connection_ids: Optional[ConnectionIDCache] = None,
+        tracker_health: Optional[TrackerHealthRegistry] = None,
+        resolver: Optional[DNSCache] = None,
+        peer_store: Optional[PeerStore] = None
         ) -> None:
         self.torrent = torrent
         self.announce_urls: List[List[bytes]] = self.torrent.announce_list if self.torrent.announce_list else [[self.torrent.announce]]
@@ -31,7 +51,7 @@ class TrackerManager:
         self.port = port
         self.uploaded = uploaded
         self.downloaded = downloaded
-        self.left = left if left else self.torrent.total_length
+        self.left = left if left is not None else self.torrent.total_length
         self.compact = compact
         self.no_peer_id = no_peer_id
         self.event = event
@@ -40,20 +60,28 @@ class TrackerManager:
         self.key = key
         
         self.tracker_http_timeout = tracker_http_timeout
+        self.http_client = http_client
+        self.tracker_udp_timeout = tracker_udp_timeout
         self.tracker_udp_retries = tracker_udp_retries
-        self.max_concurrent_announce = max_concurrent_announce
+        self.udp_endpoint = udp_endpoint
+        self.connection_ids = connection_ids
+        self.tracker_semaphore = tracker_semaphore
+        self.tracker_health = tracker_health
+        self.resolver = resolver
         
-        self.last_tier_idx: int = 0
-        self.last_url_idx: int = 0
-        self.trackers: List[Union[TrackerHTTP, TrackerUDP]] = []
-        self.peers: List[Peer] = []
-    
-    def _shuffle_tier_urls(self: "TrackerManager") -> None:
+        # Copied so BEP 12 promotion never reorders the torrent's own announce-list
+        self.announce_urls = [list(tier) for tier in self.announce_urls]
         for tier in self.announce_urls:
             random.shuffle(tier)
+        self.tracker: Optional[Union[TrackerHTTP, TrackerUDP]] = None
+        self.interval: Optional[int] = None
+        self.min_interval: Optional[int] = None
+        self.failures: int = 0
+        # One tracker object per announce URL, so state such as the HTTP tracker id carries across announces
+        self.trackers: Dict[bytes, Union[TrackerHTTP, TrackerUDP]] = {}
+        self.peers: PeerStore = peer_store if peer_store is not None else PeerStore()
     
-    async def __announce_http(self: "TrackerManager", url: str) -> Optional[Tuple[TrackerHTTP, Dict[str, Any]]]:
-        tracker: TrackerHTTP = TrackerHTTP(url)
+    async def __announce_http(self: "TrackerManager", tracker: TrackerHTTP) -> Optional[Tuple[TrackerHTTP, Dict[str, Any]]]:
         try:
             response = await tracker.announce(
                 info_hash=self.torrent.info_hash,
@@ -77,22 +105,23 @@ class TrackerManager:
         
         return (None, None)
     
-    async def __announce_udp(self: "TrackerManager", address: Tuple[str, int]) -> Optional[Tuple[TrackerUDP, Dict[str, Any]]]:
-        tracker = TrackerUDP(address)
+    async def __announce_udp(self: "TrackerManager", tracker: TrackerUDP) -> Optional[Tuple[TrackerUDP, Dict[str, Any]]]:
         try:
             await tracker.initialize()
-            await tracker.connect()
+            # Expired ids are renewed by the announce itself
+            if self.connection_ids is None and not tracker.connection_id:
+                await tracker.connect()
             response = await tracker.announce(
                 info_hash=self.torrent.info_hash,
                 peer_id=self.torrent.peer_id,
                 port=self.port,
                 downloaded=self.downloaded,
                 left=self.left,
-                uploaded=self.downloaded,
-                event=self.event,
-                ip=self.ip,
-                key=self.key,
-                numwant=self.numwant
+                uploaded=self.uploaded,
+                event=UDPEventType[self.event.upper()].value if self.event else 0,
+                ip=self._udp_ip(),
+                key=self.key if isinstance(self.key, int) else None,
+                numwant=self.numwant if self.numwant is not None else -1
                 )
             return (tracker, response)
         except TrackerError as exc:
@@ -102,45 +131,102 @@ class TrackerManager:
         
         return (None, None)
     
-    def select_trackers(self: "TrackerManager") -> None:
-        self._shuffle_tier_urls()
+    def _udp_ip(self: "TrackerManager") -> int:
+        # BEP 15 carries the address as a 32-bit IPv4 integer, 0 meaning the sender's address
+        try:
+            return int(ipaddress.IPv4Address(self.ip)) if self.ip else 0
+        except ValueError:
+            return 0
+    
+    def get_tracker(self: "TrackerManager", url: bytes) -> Union[TrackerHTTP, TrackerUDP]:
+        if (tracker := self.trackers.get(url)) is None:
+            scheme, endpoint = parse_url(url)
+            if scheme in ("http", "https"):
+                tracker = TrackerHTTP(endpoint, timeout=self.tracker_http_timeout, client=self.http_client)
+            else:
+                tracker = TrackerUDP(endpoint, timeout=self.tracker_udp_timeout, retries=self.tracker_udp_retries, endpoint=self.udp_endpoint, connection_ids=self.connection_ids, resolver=self.resolver)
+            self.trackers[url] = tracker
+        return tracker
+    
+    def restore(self: "TrackerManager", url: bytes, interval: int, tracker_id: Optional[bytes] = None) -> None:
+        # State saved in a resume record from a previous session's responses
+        try:
+            tracker: Union[TrackerHTTP, TrackerUDP] = self.get_tracker(url)
+        except ValueError as exc:
+            logger.debug(exc)
+            return
+        
+        tracker.interval = interval or None
+        if tracker_id and isinstance(tracker, TrackerHTTP):
+            tracker.tracker_id = tracker_id
+        if self.interval is None:
+            self.interval = tracker.interval
+    
+    async def _announce_url(self: "TrackerManager", url: bytes) -> Tuple[Optional[Union[TrackerHTTP, TrackerUDP]], Optional[Dict[str, Any]]]:
+        try:
+            tracker: Union[TrackerHTTP, TrackerUDP] = self.get_tracker(url)
+        except ValueError as exc:
+            logger.debug(exc)
+            return (None, None)
         
-        tier_idx = self.last_tier_idx + 1
-        url_idx = self.last_url_idx + 1
+        if isinstance(tracker, TrackerHTTP):
+            return await self.__announce_http(tracker)
+        return await self.__announce_udp(tracker)
+    
+    def _on_response(self: "TrackerManager", tracker: Union[TrackerHTTP, TrackerUDP], response: Dict[str, Any]) -> None:
+        self.tracker = tracker
         
-        if tier_idx > len(self.announce_urls):
-            self.last_tier_idx, tier_idx = (0, 0)
-        if url_idx > len(self.announce_urls[tier_idx]):
-            self.last_url_idx, url_idx = (0, 0)
+        self.interval = response["interval"]
+        self.min_interval = response.get("min_interval")
+        self.failures = 0
+        if self.event == "started":
+            self.event = None
         
-        announced: int = 0
-        results = []
-        while announced < self.max_concurrent_announce:
-            for tier in self.announce_urls[tier_idx]:
-                for url in tier[url_idx]:
-                    scheme, endpoint = parse_url(url)
-                    if scheme == "http":
-                        results.append(
-                            asyncio.create_task(self.__announce_http(endpoint))
-                            )
-                        announced += 1
-                    elif scheme == "udp":
-                        results.append(
-                            asyncio.create_task(self.__announce_udp(endpoint))
-                            )
-                        announced += 1
-                    
-                    url_idx += 1
-                
-                tier_idx += 1
+        # Compact entries already are PeerStore keys; only dictionary-model peers are packed one by one
+        if isinstance(peers := response["peers"], bytes):
+            self.peers.add_compact(peers, PeerSource.TRACKER)
+        else:
+            self.peers.add_many(peers, PeerSource.TRACKER)
+        self.peers.add_compact(response.get("peers6", b""), PeerSource.TRACKER, ipv6=True)
+    
+    async def select_trackers(self: "TrackerManager") -> Tuple[Union[TrackerHTTP, TrackerUDP], Dict[str, Any]]:
+        # BEP 12: tiers are tried in order, and a tracker that answers moves to the front of its tier
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        if self.tracker_health is not None:
+            for tier in self.announce_urls:
+                # Stable, so trackers with equal health keep their BEP 12 promotion order
+                tier.sort(key=self.tracker_health.sort_key)
         
-        self.last_tier_idx = tier_idx
-        self.last_url_idx = url_idx
+        # Trackers still backing off from failures are only tried once every healthy one has failed.
+        # Decided once per round, so a tracker failing in the first pass is not announced to again in the second
+        backing_off_urls: Set[bytes] = set()
+        if self.tracker_health is not None:
+            backing_off_urls = {url for tier in self.announce_urls for url in tier if self.tracker_health.is_backing_off(url)}
+        
+        for backing_off in ((False, True) if backing_off_urls else (False,)):
+            for tier in self.announce_urls:
+                for idx, url in enumerate(tier):
+                    if (url in backing_off_urls) != backing_off:
+                        continue
+                    
+                    started: float = loop.time()
+                    if self.tracker_semaphore is not None:
+                        async with self.tracker_semaphore(url):
+                            tracker, response = await self._announce_url(url)
+                    else:
+                        tracker, response = await self._announce_url(url)
+                    
+                    if response is None:
+                        if self.tracker_health is not None:
+                            self.tracker_health.record_failure(url)
+                        continue
+                    
+                    if self.tracker_health is not None:
+                        self.tracker_health.record_success(url, loop.time() - started)
+                    
+                    tier.insert(0, tier.pop(idx))
+                    self._on_response(tracker, response)
+                    return (tracker, response)
         
-        for tracker, response in results:
-            if response is None:
-                continue
-            elif len(response["peers"]) == 0:
-                continue
-            
-            self.trackers.append(tracker)
+        self.failures += 1
+        raise TrackerError(f"All trackers failed for {self.torrent.name}")
@@ -1,22 +1,39 @@
-from typing import List, Dict, Tuple, Optional
+from typing import Any, Callable, Iterable, List, Dict, Tuple, Optional
 import logging
 import asyncio
+import socket
 import struct
 
+from ..dns_cache import DNSCache
 from ..exceptions import TrackerError
 from ..enums import ActionType
-from ..utils import generate_transaction_id, generate_tracker_key, decode_compact_peers
+from ..utils import generate_tracker_key
 
-from .asyncio_udp_protocol import AsyncIOUDPProtocol
+from .connection_id_cache import ConnectionIDCache
+from .udp_endpoint import UDPTrackerEndpoint
 
 logger = logging.getLogger(__name__)
 
 class TrackerUDP:
-    def __init__(self: "TrackerUDP", remote_addr: Tuple[str, int], timeout: Optional[int] = 15, retries: Optional[int] = 8) -> None:
+    def __init__(
+        self: "TrackerUDP",
+        remote_addr: Tuple[str, int],
+        timeout: Optional[int] = 15,
+        retries: Optional[int] = 8,
+        endpoint: Optional[UDPTrackerEndpoint] = None,
+        connection_ids: Optional[ConnectionIDCache] = None,
+        resolver: Optional[DNSCache] = None
+        ) -> None:
         self.MAGIC_PROTOCOL_ID: int = 0x41727101980
+        # BEP 15: 74 info-hashes keep a scrape request within a typical MTU
+        self.MAX_SCRAPE_HASHES: int = 74
         
         self.remote_addr = remote_addr
-        self.protocol: Optional[asyncio.DatagramProtocol] = None
+        self.addr: Optional[Tuple[str, int]] = None
+        self.endpoint = endpoint
+        self._owns_endpoint: bool = endpoint is None
+        self.connection_ids = connection_ids
+        self.resolver = resolver
         
         self.timeout = timeout
         self.retries = retries
@@ -27,22 +44,46 @@ class TrackerUDP:
         self.interval: Optional[int] = None
         self.leechers: Optional[int] = None
         self.seeders: Optional[int] = None
-        self.peers: List[Tuple[str, int]] = []
+        # Raw compact entries, handed to the PeerStore without decoding
+        self.peers: bytes = b""
+        self.peers6: bytes = b""
     
     async def initialize(self: "TrackerUDP") -> None:
-        _, self.protocol = await asyncio.get_event_loop().create_datagram_endpoint(
-            protocol_factory=AsyncIOUDPProtocol,
-            remote_addr=self.remote_addr
-            )
+        host, port = self.remote_addr
+        if self.resolver is not None:
+            try:
+                self.addr = await self.resolver.resolve(host, port)
+            except OSError as exc:
+                raise TrackerError(f"Could not resolve {host}: {exc}")
+        else:
+            infos = await asyncio.get_event_loop().getaddrinfo(host, port, type=socket.SOCK_DGRAM)
+            if not infos:
+                raise TrackerError(f"Could not resolve {host}")
+            
+            self.addr = infos[0][4][:2]
+        if self.endpoint is None:
+            self.endpoint = UDPTrackerEndpoint()
+    
+    async def close(self: "TrackerUDP") -> None:
+        if self._owns_endpoint and self.endpoint is not None:
+            self.endpoint.close()
+            self.endpoint = None
     
     def is_connection_id_expired(self: "TrackerUDP") -> bool:
         return asyncio.get_event_loop().time() - self.last_connection_id_time > 60
     
     async def connect(self: "TrackerUDP") -> None:
-        if not self.protocol:
-            raise TrackerError("Protocol not initialized. Call initialize() first")
+        if not self.addr:
+            raise TrackerError("Tracker not initialized. Call initialize() first")
         
-        transaction_id: int = generate_transaction_id()
+        if self.connection_ids is not None:
+            self.connection_id, self.last_connection_id_time = await self.connection_ids.get(self.addr, self._request_connection_id)
+        else:
+            self.connection_id = await self._request_connection_id()
+            self.last_connection_id_time = asyncio.get_event_loop().time()
+    
+    async def _request_connection_id(self: "TrackerUDP") -> int:
+        transaction_id: int = self.endpoint.new_transaction_id()
         
         message: bytes = struct.pack(
             ">QII",
@@ -50,39 +91,63 @@ class TrackerUDP:
             ActionType.CONNECT.value,
             transaction_id
             )
-        try:
-            self.protocol.send(message)
-        except Exception as exc:
-            raise TrackerError(f"Connect request error: {exc}")
-        
-        for retry in range(self.retries):
-            try:
-                response: bytes = await asyncio.wait_for(
-                    self.protocol.recv(),
-                    timeout=self.timeout*(2**retry)
-                    )
-                break
-            except asyncio.TimeoutError:
-                logger.debug(f"Connect timeout. Retrying for {retry+1}")
-        else:
-            logger.debug(f"Connect timeout. All retries failed ({self.retries})")
-            raise TrackerError("Connect timeout")
-        
-        if len(response) < 16:
-            logger.debug(f"Connect response length ({len(response)}) is less than 16.")
-            raise TrackerError("Connect response length is less than 16.")
+        response: bytes = await self.endpoint.request(
+            self.addr,
+            message,
+            transaction_id,
+            timeout=self.timeout,
+            retries=self.retries
+            )
         
-        action, tx_id, connection_id = struct.unpack(">IIQ", response)
+        self._check_response(response, transaction_id, ActionType.CONNECT, 16)
+        _, _, connection_id = struct.unpack(">IIQ", response[:16])
         
+        return connection_id
+    
+    def _check_response(self: "TrackerUDP", response: bytes, transaction_id: int, expected_action: ActionType, min_length: int) -> None:
+        name: str = expected_action.name.capitalize()
+        if len(response) >= 8 and struct.unpack_from(">I", response)[0] == ActionType.ERROR.value:
+            message: str = response[8:].decode("utf-8", errors="replace")
+            logger.debug(f"{name} request failed: {message}")
+            if self.connection_ids is not None:
+                # The usual cause is a connection id the tracker no longer accepts
+                self.connection_ids.invalidate(self.addr)
+            raise TrackerError(f"{name} request failed: {message}")
+        
+        if len(response) < min_length:
+            logger.debug(f"{name} response length ({len(response)}) is less than {min_length}.")
+            raise TrackerError(f"{name} response length is less than {min_length}.")
+        
+        action, tx_id = struct.unpack_from(">II", response)
         if tx_id != transaction_id:
             logger.debug(f"transaction id does not match. Received: {tx_id}, Expected: {transaction_id}.")
             raise TrackerError("transaction id does not match")
-        if action != ActionType.CONNECT.value:
-            logger.debug(f"action does not match. Received: {action}, Expected: {ActionType.CONNECT.value}.")
+        if action != expected_action.value:
+            logger.debug(f"action does not match. Received: {action}, Expected: {expected_action.value}.")
             raise TrackerError("action does not match")
+    
+    async def _request_with_retries(self: "TrackerUDP", build_message: Callable[[int], bytes], name: str) -> Tuple[bytes, int]:
+        for retry in range(self.retries):
+            # A retry may outlive the 60 second connection id, so every attempt is rebuilt
+            if self.is_connection_id_expired():
+                logger.debug("connection id expired. requesting new one.")
+                await self.connect()
+            
+            transaction_id: int = self.endpoint.new_transaction_id()
+            try:
+                response: bytes = await self.endpoint.request(
+                    self.addr,
+                    build_message(transaction_id),
+                    transaction_id,
+                    timeout=self.timeout*(2**retry),
+                    retries=1
+                    )
+                return (response, transaction_id)
+            except TrackerError:
+                logger.debug(f"{name} timeout. Retrying for {retry+1}")
         
-        self.connection_id = connection_id
-        self.last_connection_id_time = asyncio.get_event_loop().time()
+        logger.debug(f"{name} timeout. All retries failed ({self.retries})")
+        raise TrackerError(f"{name} timeout")
     
     async def announce(
         self: "TrackerUDP",
@@ -96,74 +161,81 @@ class TrackerUDP:
         ip: Optional[int] = 0,
         key: Optional[int] = None,
         numwant: Optional[int] = -1,
-        ) -> List[Tuple[str, int]]:
-        if not self.connection_id:
+        ) -> Dict[str, Any]:
+        if self.connection_ids is not None:
+            # Cache hit in the common case; also picks up ids refreshed by other torrents
+            await self.connect()
+        elif not self.connection_id:
             raise TrackerError("connection id not found. Call connect() first")
         
-        transaction_id: int = generate_transaction_id()
-        
-        message: bytes = struct.pack(
-            ">QII20s20sQQQIIIiH",
-            self.connection_id, # Q
-            ActionType.ANNOUNCE.value, # I
-            transaction_id, # I
-            info_hash, # 20s
-            peer_id, # 20s
-            downloaded, # Q
-            left, # Q
-            uploaded, # Q
-            event, # I
-            ip, # I
-            key or generate_tracker_key("udp"), # I
-            numwant, # i
-            port # H
+        response, transaction_id = await self._request_with_retries(
+            lambda transaction_id: struct.pack(
+                ">QII20s20sQQQIIIiH",
+                self.connection_id, # Q
+                ActionType.ANNOUNCE.value, # I
+                transaction_id, # I
+                info_hash, # 20s
+                peer_id, # 20s
+                downloaded, # Q
+                left, # Q
+                uploaded, # Q
+                event, # I
+                ip, # I
+                key or generate_tracker_key("udp"), # I
+                numwant, # i
+                port # H
+                ),
+            "Announce"
             )
         
-        try:
-            self.protocol.send(message)
-        except Exception as exc:
-            raise TrackerError(f"Announce request error: {exc}")
-        
-        for retry in range(self.retries):
-            if self.is_connection_id_expired():
-                logger.debug("connection id expired. requesting new one.")
-                await self.connect()
-            
-            try:
-                response: bytes = await asyncio.wait_for(
-                    self.protocol.recv(),
-                    timeout=self.timeout*(2**retry)
-                    )
-                break
-            except asyncio.TimeoutError:
-                logger.debug(f"Announce timeout. Retrying for {retry+1}")
-        else:
-            logger.debug(f"Announce timeout. All retries failed ({self.retries})")
-            raise TrackerError("Announce timeout")
-        
-        if len(response) < 20:
-            logger.debug(f"Announce response length ({len(response)}) is less than 20.")
-            raise TrackerError("Announce response length is less than 20.")
-        
-        action, tx_id, interval, leechers, seeders, = struct.unpack(
+        self._check_response(response, transaction_id, ActionType.ANNOUNCE, 20)
+        _, _, interval, leechers, seeders, = struct.unpack(
             ">IIIII",
             response[:20]
             )
-        if tx_id != transaction_id:
-            logger.debug(f"transaction id does not match. Received: {tx_id}, Expected: {transaction_id}.")
-            raise TrackerError("transaction id does not match")
-        if action != ActionType.ANNOUNCE.value:
-            logger.debug(f"action does not match. Received: {action}, Expected: {ActionType.ANNOUNCE.value}.")
-            raise TrackerError("action does not match")
         
         self.interval = interval
         self.leechers = leechers
         self.seeders = seeders
-        self.peers = decode_compact_peers(response[20:])
+        # BEP 15: announces sent over IPv6 are answered with 18-byte IPv6 peer entries
+        if ":" in self.addr[0]:
+            self.peers, self.peers6 = b"", bytes(response[20:])
+        else:
+            self.peers, self.peers6 = bytes(response[20:]), b""
         
         return {
             "interval": self.interval,
             "leechers": self.leechers,
             "seeders": self.seeders,
-            "peers": self.peers
-        }
\ No newline at end of file
+            "peers": self.peers,
+            "peers6": self.peers6
+        }
+    
+    async def scrape(self: "TrackerUDP", info_hashes: Iterable[bytes]) -> Dict[bytes, Dict[str, int]]:
+        if self.connection_ids is not None:
+            await self.connect()
+        elif not self.connection_id:
+            raise TrackerError("connection id not found. Call connect() first")
+        
+        info_hashes = list(info_hashes)
+        chunks: List[List[bytes]] = [
+            info_hashes[i:i+self.MAX_SCRAPE_HASHES]
+            for i in range(0, len(info_hashes), self.MAX_SCRAPE_HASHES)
+            ]
+        results: Dict[bytes, Dict[str, int]] = {}
+        for chunk, stats in zip(chunks, await asyncio.gather(*(self._scrape_chunk(chunk) for chunk in chunks))):
+            results.update(zip(chunk, stats))
+        
+        return results
+    
+    async def _scrape_chunk(self: "TrackerUDP", info_hashes: List[bytes]) -> List[Dict[str, int]]:
+        response, transaction_id = await self._request_with_retries(
+            lambda transaction_id: struct.pack(">QII", self.connection_id, ActionType.SCRAPE.value, transaction_id) + b"".join(info_hashes),
+            "Scrape"
+            )
+        
+        self._check_response(response, transaction_id, ActionType.SCRAPE, 8 + 12 * len(info_hashes))
+        return [
+            {"complete": complete, "downloaded": downloaded, "incomplete": incomplete}
+            for complete, downloaded, incomplete in struct.iter_unpack(">III", response[8:8+12*len(info_hashes)])
+            ]
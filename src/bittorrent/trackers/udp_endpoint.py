@@ -0,0 +1,131 @@
+from typing import Dict, Optional, Tuple
+from dataclasses import dataclass
+import logging
+import asyncio
+import socket
+import struct
+
+from ..exceptions import TrackerError
+from ..utils import generate_transaction_id
+
+from .asyncio_udp_protocol import AsyncIOUDPProtocol
+from .timer_wheel import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PendingRequest:
+    addr: Tuple[str, int]
+    message: bytes
+    future: asyncio.Future
+    timeout: float
+    retries: int
+    attempt: int = 0
+    timer_id: Optional[int] = None
+
+class UDPTrackerEndpoint:
+    def __init__(self: "UDPTrackerEndpoint", timer_resolution: Optional[float] = 0.25) -> None:
+        # One socket per address family for every UDP tracker in the session
+        self.protocols: Dict[int, AsyncIOUDPProtocol] = {}
+        self._opening: Dict[int, asyncio.Future] = {}
+        self.pending: Dict[int, PendingRequest] = {}
+        self.wheel: TimerWheel = TimerWheel(resolution=timer_resolution)
+    
+    async def _protocol(self: "UDPTrackerEndpoint", family: int) -> AsyncIOUDPProtocol:
+        if (protocol := self.protocols.get(family)) is not None:
+            return protocol
+        
+        if (opening := self._opening.get(family)) is None:
+            opening = self._opening[family] = asyncio.ensure_future(
+                asyncio.get_event_loop().create_datagram_endpoint(
+                    lambda: AsyncIOUDPProtocol(on_datagram=self._datagram_received),
+                    local_addr=("::" if family == socket.AF_INET6 else "0.0.0.0", 0),
+                    family=family
+                    )
+                )
+        try:
+            _, protocol = await asyncio.shield(opening)
+        finally:
+            self._opening.pop(family, None)
+        
+        self.protocols[family] = protocol
+        return protocol
+    
+    def new_transaction_id(self: "UDPTrackerEndpoint") -> int:
+        while (transaction_id := generate_transaction_id()) in self.pending:
+            pass
+        return transaction_id
+    
+    async def request(
+        self: "UDPTrackerEndpoint",
+        addr: Tuple[str, int],
+        message: bytes,
+        transaction_id: int,
+        timeout: Optional[float] = 15,
+        retries: Optional[int] = 8
+        ) -> bytes:
+        if transaction_id in self.pending:
+            raise TrackerError(f"transaction id {transaction_id} already in flight")
+        
+        protocol: AsyncIOUDPProtocol = await self._protocol(socket.AF_INET6 if ":" in addr[0] else socket.AF_INET)
+        request: PendingRequest = PendingRequest(addr, message, asyncio.get_event_loop().create_future(), timeout, retries)
+        self.pending[transaction_id] = request
+        try:
+            self._send(protocol, transaction_id, request)
+            return await request.future
+        finally:
+            self.pending.pop(transaction_id, None)
+            if request.timer_id is not None:
+                self.wheel.cancel(request.timer_id)
+    
+    def _send(self: "UDPTrackerEndpoint", protocol: AsyncIOUDPProtocol, transaction_id: int, request: PendingRequest) -> None:
+        try:
+            protocol.send(request.message, request.addr)
+        except Exception as exc:
+            request.future.set_exception(TrackerError(f"UDP send error: {exc}"))
+            return
+        
+        request.timer_id = self.wheel.schedule(
+            request.timeout * (2 ** request.attempt),
+            lambda: self._on_timeout(protocol, transaction_id)
+            )
+    
+    def _on_timeout(self: "UDPTrackerEndpoint", protocol: AsyncIOUDPProtocol, transaction_id: int) -> None:
+        request: Optional[PendingRequest] = self.pending.get(transaction_id)
+        if request is None or request.future.done():
+            return
+        
+        request.timer_id = None
+        request.attempt += 1
+        if request.attempt >= request.retries:
+            logger.debug(f"Request to {request.addr} timed out. All retries failed ({request.retries})")
+            request.future.set_exception(TrackerError("Request timeout"))
+            return
+        
+        logger.debug(f"Request to {request.addr} timed out. Retrying for {request.attempt}")
+        self._send(protocol, transaction_id, request)
+    
+    def _datagram_received(self: "UDPTrackerEndpoint", data: bytes, addr: Tuple[str, int]) -> None:
+        if len(data) < 8:
+            logger.debug(f"Dropping short datagram from {addr}")
+            return
+        
+        transaction_id: int = struct.unpack_from(">I", data, 4)[0]
+        request: Optional[PendingRequest] = self.pending.get(transaction_id)
+        # Late replies to finished requests and spoofed sources are dropped instead of being
+        # mistaken for the reply to whatever request is currently waiting
+        if request is None or request.future.done() or tuple(addr[:2]) != tuple(request.addr[:2]):
+            logger.debug(f"Dropping unexpected datagram from {addr} (transaction id {transaction_id})")
+            return
+        
+        request.future.set_result(data)
+    
+    def close(self: "UDPTrackerEndpoint") -> None:
+        self.wheel.close()
+        for request in self.pending.values():
+            if not request.future.done():
+                request.future.set_exception(TrackerError("UDP endpoint closed"))
+        for protocol in self.protocols.values():
+            protocol.transport.close()
+        
+        self.protocols.clear()
@@ -0,0 +1,203 @@
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import asyncio
+
+from .exceptions import PeerError
+from .messages import Request, Cancel, Piece
+from .peer_connection import PeerConnection
+from .storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# (info hash, piece index)
+CacheKey = Tuple[bytes, int]
+
+class BlockCache:
+    def __init__(self: "BlockCache", budget: Optional[int] = 64 << 20) -> None:
+        # Whole pieces, least recently used first; shared by every torrent in the session
+        self.budget = budget
+        self.size: int = 0
+        self.pieces: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+    
+    def __len__(self: "BlockCache") -> int:
+        return len(self.pieces)
+    
+    def __contains__(self: "BlockCache", key: CacheKey) -> bool:
+        return key in self.pieces
+    
+    def get(self: "BlockCache", key: CacheKey) -> Optional[bytes]:
+        if (piece := self.pieces.get(key)) is None:
+            self.misses += 1
+            return None
+        
+        self.pieces.move_to_end(key)
+        self.hits += 1
+        return piece
+    
+    def put(self: "BlockCache", key: CacheKey, piece: bytes) -> None:
+        if len(piece) > self.budget:
+            return
+        
+        self.discard(key)
+        while self.size + len(piece) > self.budget:
+            _, evicted = self.pieces.popitem(last=False)
+            self.size -= len(evicted)
+        
+        self.pieces[key] = piece
+        self.size += len(piece)
+    
+    def discard(self: "BlockCache", key: CacheKey) -> None:
+        if (piece := self.pieces.pop(key, None)) is not None:
+            self.size -= len(piece)
+    
+    def discard_torrent(self: "BlockCache", info_hash: bytes) -> None:
+        for key in [key for key in self.pieces if key[0] == info_hash]:
+            self.discard(key)
+
+class Uploader:
+    def __init__(
+        self: "Uploader",
+        storage: Storage,
+        cache: BlockCache,
+        has_piece: Callable[[int], bool],
+        executor: Optional[ThreadPoolExecutor] = None,
+        read_ahead: Optional[bool] = True,
+        use_sendfile: Optional[bool] = True,
+        max_queue: Optional[int] = 256,
+        max_block_size: Optional[int] = 1 << 17,
+        batch_size: Optional[int] = 4
+        ) -> None:
+        self.storage = storage
+        self.cache = cache
+        self.has_piece = has_piece
+        self.executor = executor
+        self.read_ahead = read_ahead
+        self.use_sendfile = use_sendfile
+        self.max_queue = max_queue
+        self.max_block_size = max_block_size
+        # Blocks served per rate-limiter grant
+        self.batch_size = batch_size
+        
+        self.info_hash: bytes = storage.torrent.info_hash
+        self.queues: Dict[PeerConnection, Deque[Tuple[int, int, int]]] = {}
+        self._serving: Dict[PeerConnection, asyncio.Task] = {}
+        self._reading: Set[int] = set()
+    
+    def piece_size(self: "Uploader", index: int) -> int:
+        torrent = self.storage.torrent
+        return min(torrent.piece_length, torrent.total_length - index * torrent.piece_length)
+    
+    def handle(self: "Uploader", connection: PeerConnection, message: object) -> None:
+        message_type: type = type(message)
+        if message_type is Request:
+            self.request(connection, message.index, message.begin, message.length)
+        elif message_type is Cancel:
+            if (queue := self.queues.get(connection)) is not None:
+                try:
+                    queue.remove((message.index, message.begin, message.length))
+                except ValueError:
+                    pass
+    
+    def request(self: "Uploader", connection: PeerConnection, index: int, begin: int, length: int) -> None:
+        # Checked against the real piece size: the last piece is usually shorter than piece_length
+        if not 0 <= index < self.storage.torrent.num_pieces or not 0 < length <= self.max_block_size or begin + length > self.piece_size(index):
+            connection.close(PeerError(f"Invalid request ({index}, {begin}, {length})"))
+            return
+        if connection.am_choking or not self.has_piece(index):
+            return
+        
+        queue: Deque[Tuple[int, int, int]] = self.queues.setdefault(connection, deque())
+        if len(queue) >= self.max_queue:
+            logger.debug(f"Dropping request from {connection.peer}: queue full")
+            return
+        
+        queue.append((index, begin, length))
+        if connection not in self._serving:
+            task: asyncio.Task = asyncio.ensure_future(self._serve(connection))
+            self._serving[connection] = task
+    
+    def remove(self: "Uploader", connection: PeerConnection) -> None:
+        self.queues.pop(connection, None)
+        if (task := self._serving.pop(connection, None)) is not None:
+            task.cancel()
+    
+    async def _serve(self: "Uploader", connection: PeerConnection) -> None:
+        queue: Deque[Tuple[int, int, int]] = self.queues[connection]
+        try:
+            while queue and connection.transport is not None and not connection.transport.is_closing():
+                if connection.am_choking:
+                    # Choking discards every pending request (BEP 3)
+                    queue.clear()
+                    break
+                
+                batch: List[Tuple[int, int, int]] = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                if connection.upload_limiter is not None:
+                    wanted: int = sum(connection.upload_limiter.wire_size(length + Piece.HEADER_STRUCT.size) for _, _, length in batch)
+                    granted: int = await connection.upload_limiter.acquire(connection.upload_bucket, wanted)
+                    if granted < wanted:
+                        queue.extendleft(reversed(batch))
+                        continue
+                
+                for index, begin, length in batch:
+                    await self._send_block(connection, index, begin, length)
+        except (PeerError, OSError) as exc:
+            logger.debug(f"Upload to {connection.peer} failed: {exc!r}")
+        finally:
+            self._serving.pop(connection, None)
+            if not queue:
+                self.queues.pop(connection, None)
+    
+    async def _send_block(self: "Uploader", connection: PeerConnection, index: int, begin: int, length: int) -> None:
+        header: bytes = Piece.HEADER_STRUCT.pack(9 + length, Piece.message_id, index, begin)
+        if (piece := self.cache.get((self.info_hash, index))) is not None:
+            connection.writelines([header, memoryview(piece)[begin:begin+length]])
+            return
+        
+        if self.read_ahead:
+            self._read_ahead(index)
+        
+        if self.use_sendfile:
+            try:
+                spans = self.storage.spans(index, begin, length)
+                connection.write(header)
+                for file_index, file_offset, size in spans:
+                    await connection.sendfile(self.storage.handle(file_index), file_offset, size)
+                return
+            except asyncio.SendfileNotAvailableError:
+                # TLS or a platform without sendfile; mapped views are still written without a copy
+                self.use_sendfile = False
+                connection.writelines(self.storage.read_views(index, begin, length))
+                return
+        
+        connection.writelines([header, *self.storage.read_views(index, begin, length)])
+    
+    def _read_ahead(self: "Uploader", index: int) -> None:
+        if index in self._reading:
+            return
+        self._reading.add(index)
+        
+        size: int = self.piece_size(index)
+        
+        def read() -> bytes:
+            # Whole pieces are cached since peers tend to request a piece's blocks back to back
+            return b"".join(self.storage.read_views(index, 0, size))
+        
+        def done(future: asyncio.Future) -> None:
+            self._reading.discard(index)
+            if not future.cancelled() and future.exception() is None:
+                self.cache.put((self.info_hash, index), future.result())
+        
+        future: asyncio.Future = asyncio.get_event_loop().run_in_executor(self.executor, read)
+        future.add_done_callback(done)
+    
+    async def close(self: "Uploader") -> None:
+        tasks: List[asyncio.Task] = list(self._serving.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.queues.clear()
+        self.cache.discard_torrent(self.info_hash)
@@ -12,13 +12,14 @@ import bencode
 def generate_transaction_id() -> int:
     return int.from_bytes(os.urandom(4), byteorder="big")
 
-def generate_tracker_key(protocol: str) -> bytes:
+def generate_tracker_key(protocol: str) -> Union[str, int]:
     if protocol == "http":
         return secrets.token_urlsafe(20)
     elif protocol == "udp":
-        return os.urandom(20)
+        # BEP 15 announces carry the key as a 32-bit integer
+        return int.from_bytes(os.urandom(4), byteorder="big")
     else:
-        ValueError(f"Unknown protocol: {protocol}. Expected 'http' or 'udp'")
+        raise ValueError(f"Unknown protocol: {protocol}. Expected 'http' or 'udp'")
 
 def generate_info_hash(info: Dict[bytes, Any]) -> bytes:
     return hashlib.sha1(bencode.encode(info)).digest()
@@ -38,21 +39,58 @@ def parse_url(url: Union[bytes, str]) -> Union[Tuple[str, Union[str, Tuple[str,
     if isinstance(url, bytes):
         url = url.decode()
     
-    parsed: ParsedResult = urlparse(url)
+    parsed: ParseResult = urlparse(url)
     if parsed.scheme in ("http", "https"):
-        return (parsed.scheme, url.decode())
+        return (parsed.scheme, url)
     elif parsed.scheme == "udp":
         return (parsed.scheme, (parsed.hostname, parsed.port))
     else:
-        raise ValueError(f"Unknown tracker scheme: {scheme}")
+        raise ValueError(f"Unknown tracker scheme: {parsed.scheme}")
 
-def decode_compact_peers(data: bytes) -> List[Tuple[str, int]]:
-    return [
-        (
-            socket.inet_ntoa(data[i:i+4]), # IP
-            struct.unpack(">H", data[i+4:i+6])[0] # PORT
-        ) for i in range(0, len(data), 6)
-        ]
+COMPACT_PEER_STRUCT: struct.Struct = struct.Struct(">4sH")
+COMPACT_PEER6_STRUCT: struct.Struct = struct.Struct(">16sH")
+
+def compact_peer_keys(data: bytes, ipv6: Optional[bool] = False) -> List[bytes]:
+    # The raw entries double as PeerStore keys, so no address strings are built at all
+    size: int = COMPACT_PEER6_STRUCT.size if ipv6 else COMPACT_PEER_STRUCT.size
+    return [bytes(data[i:i+size]) for i in range(0, len(data) - size + 1, size)]
+
+def decode_compact_peers(data: bytes, ipv6: Optional[bool] = False) -> List[Tuple[str, int]]:
+    peer_struct: struct.Struct = COMPACT_PEER6_STRUCT if ipv6 else COMPACT_PEER_STRUCT
+    # iter_unpack rejects a trailing partial entry, which some trackers send
+    data = data[:len(data) - len(data) % peer_struct.size]
+    if ipv6:
+        return [(socket.inet_ntop(socket.AF_INET6, ip), port) for ip, port in peer_struct.iter_unpack(data)]
+    
+    inet_ntoa = socket.inet_ntoa
+    return [(inet_ntoa(ip), port) for ip, port in peer_struct.iter_unpack(data)]
+
+def decode_dict_peers(peers: List[Dict[bytes, Any]]) -> List[Tuple[str, int]]:
+    decoded: List[Tuple[str, int]] = []
+    for peer in peers:
+        ip: Union[str, bytes] = peer.get(b"ip", b"")
+        port: Optional[int] = peer.get(b"port")
+        if ip and isinstance(port, int):
+            decoded.append((ip.decode("utf-8", errors="replace") if isinstance(ip, bytes) else ip, port))
+    
+    return decoded
+
+def encode_compact_peers(peers: List[Tuple[str, int]], ipv6: Optional[bool] = False) -> bytes:
+    # Peers of the other address family are skipped; they belong in the peers/peers6 counterpart
+    family: int = socket.AF_INET6 if ipv6 else socket.AF_INET
+    peer_struct: struct.Struct = COMPACT_PEER6_STRUCT if ipv6 else COMPACT_PEER_STRUCT
+    
+    buffer: bytearray = bytearray(peer_struct.size * len(peers))
+    offset: int = 0
+    for ip, port in peers:
+        try:
+            peer_struct.pack_into(buffer, offset, socket.inet_pton(family, ip), port)
+        except OSError:
+            continue
+        offset += peer_struct.size
+    
+    del buffer[offset:]
+    return bytes(buffer)
 
 async def get_random_port() -> int:
     for port in range(6881, 6889+1):
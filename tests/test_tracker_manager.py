@@ -0,0 +1,52 @@
+from typing import List, Optional
+import asyncio
+
+import bencode
+import pytest
+
+from bittorrent.exceptions import TrackerError
+from bittorrent.torrent import Torrent
+from bittorrent.trackers import TrackerHealthRegistry, TrackerManager
+
+class FailingResponse:
+    status_code: int = 200
+    content: bytes = bencode.encode({b"failure reason": b"unavailable"})
+    
+    def raise_for_status(self: "FailingResponse") -> None:
+        pass
+
+class FailingClient:
+    def __init__(self: "FailingClient") -> None:
+        self.hosts: List[str] = []
+    
+    async def get(self: "FailingClient", url: str, timeout: Optional[int] = None) -> FailingResponse:
+        self.hosts.append(url.split("/")[2])
+        return FailingResponse()
+
+def make_torrent(announce_list: List[List[bytes]]) -> Torrent:
+    return Torrent(bencode.encode({
+        b"announce": announce_list[0][0],
+        b"announce-list": announce_list,
+        b"info": {b"name": b"a", b"piece length": 1 << 14, b"pieces": b"\0" * 20, b"length": 1}
+    }))
+
+def test_failing_trackers_are_announced_once_per_round() -> None:
+    client: FailingClient = FailingClient()
+    manager: TrackerManager = TrackerManager(
+        make_torrent([[b"http://a.example/announce", b"http://b.example/announce"]]),
+        6881,
+        http_client=client,
+        tracker_health=TrackerHealthRegistry()
+        )
+    
+    async def announce_round() -> None:
+        with pytest.raises(TrackerError):
+            await manager.select_trackers()
+    
+    asyncio.run(announce_round())
+    assert sorted(client.hosts) == ["a.example", "b.example"]
+    
+    # Both are backing off now; the next round still tries each of them exactly once
+    client.hosts.clear()
+    asyncio.run(announce_round())
+    assert sorted(client.hosts) == ["a.example", "b.example"]